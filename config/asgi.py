@@ -13,4 +13,17 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from django.urls import reverse  # noqa: E402
+
+from habits.async_views import telegram_webhook_application  # noqa: E402
+
+TELEGRAM_WEBHOOK_PATH = reverse("habits:telegram-webhook")
+
+
+async def application(scope, receive, send):
+    # Вебхук Telegram обрабатывается без middleware Django
+    if scope["type"] == "http" and scope["path"] == TELEGRAM_WEBHOOK_PATH:
+        return await telegram_webhook_application(scope, receive, send)
+    return await django_application(scope, receive, send)
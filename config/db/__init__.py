@@ -0,0 +1,24 @@
+import time
+
+from config import metrics
+
+DB_CONNECTIONS = metrics.counter("db.connections")
+DB_CONNECT_TIME = metrics.counter("db.connect_time_us")
+
+
+class TimedConnectionMixin:
+    """
+    Замеряет время установки соединения с БД и публикует его в метриках.
+
+    При постоянных соединениях (CONN_MAX_AGE) новое соединение открывается
+    только в начале работы процесса, по истечении CONN_MAX_AGE или после
+    неудачной проверки (CONN_HEALTH_CHECKS), поэтому рост счётчиков показывает,
+    сколько времени запросы тратят на получение соединения.
+    """
+
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        elapsed = time.perf_counter() - started
+        metrics.incr(DB_CONNECTIONS)
+        metrics.incr(DB_CONNECT_TIME, round(elapsed * 1_000_000))
@@ -0,0 +1,67 @@
+from django.contrib.postgres.operations import (AddIndexConcurrently,
+                                                RemoveIndexConcurrently)
+from django.db.migrations import AddIndex, RemoveIndex
+
+
+class AddPostgreSQLIndexConcurrently(AddIndexConcurrently):
+    """
+    Создаёт индекс без блокировки записи (CREATE INDEX CONCURRENTLY) только
+    в PostgreSQL. На других СУБД (SQLite в тестах) индексы PostgreSQL
+    (GIN, полнотекстовые, триграммные) не создаются, состояние моделей
+    при этом обновляется как обычно.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class AddIndexConcurrentlyIfSupported(AddIndexConcurrently):
+    """
+    Создаёт обычный индекс без блокировки записи в таблицу: в PostgreSQL -
+    CREATE INDEX CONCURRENTLY, на других СУБД (SQLite в тестах) -
+    обычным CREATE INDEX.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            AddIndex.database_forwards(
+                self, app_label, schema_editor, from_state, to_state
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            AddIndex.database_backwards(
+                self, app_label, schema_editor, from_state, to_state
+            )
+
+
+class RemoveIndexConcurrentlyIfSupported(RemoveIndexConcurrently):
+    """
+    Удаляет индекс без блокировки таблицы: в PostgreSQL -
+    DROP INDEX CONCURRENTLY, на других СУБД - обычным DROP INDEX.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            RemoveIndex.database_forwards(
+                self, app_label, schema_editor, from_state, to_state
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            RemoveIndex.database_backwards(
+                self, app_label, schema_editor, from_state, to_state
+            )
@@ -0,0 +1,9 @@
+from django.db.backends.postgresql import base
+
+from config.db import TimedConnectionMixin
+
+
+class DatabaseWrapper(TimedConnectionMixin, base.DatabaseWrapper):
+    """
+    Бэкенд PostgreSQL с замером времени установки соединения.
+    """
@@ -0,0 +1,109 @@
+import atexit
+import os
+import threading
+
+from django.core.cache import cache
+
+from config.settings import METRICS_FLUSH_INTERVAL
+
+# Имена счётчиков, о которых знает эндпоинт метрик
+COUNTERS = set()
+
+# Приращения счётчиков, ещё не отправленные в общий кеш
+_pending = {}
+_lock = threading.Lock()
+_flusher_pid = None
+
+
+def counter(name):
+    """
+    Регистрирует счётчик и возвращает его имя.
+    """
+    COUNTERS.add(name)
+    return name
+
+
+def incr(name, delta=1):
+    """
+    Увеличивает счётчик. Приращение копится в памяти процесса и отправляется
+    в общий кеш (Redis) фоновым потоком раз в METRICS_FLUSH_INTERVAL секунд,
+    поэтому вызов не обращается к сети, не блокирует цикл событий
+    и не падает при недоступности кеша.
+    """
+    with _lock:
+        _pending[name] = _pending.get(name, 0) + delta
+    if _flusher_pid != os.getpid():
+        start_flusher()
+
+
+def start_flusher():
+    """
+    Запускает фоновую отправку счётчиков в текущем процессе
+    (после fork поток родительского процесса в дочернем не работает).
+    """
+    global _flusher_pid
+    with _lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+    threading.Thread(target=run_flusher, name="metrics-flusher", daemon=True).start()
+
+
+def run_flusher():
+    event = threading.Event()
+    while not event.wait(METRICS_FLUSH_INTERVAL):
+        flush()
+
+
+def flush():
+    """
+    Отправляет накопленные приращения в общий кеш, где счётчики суммируются
+    по всем процессам. Приращения, которые не удалось отправить, остаются
+    до следующей отправки.
+    """
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+    for name, delta in pending.items():
+        try:
+            add(f"metrics:{name}", delta)
+        except Exception:
+            # Метрики не должны ломать работу приложения при сбое кеша
+            with _lock:
+                _pending[name] = _pending.get(name, 0) + delta
+
+
+def add(key, delta):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, timeout=None):
+            cache.incr(key, delta)
+
+
+atexit.register(flush)
+
+
+def get_counters():
+    """
+    Возвращает значения всех зарегистрированных счётчиков
+    с учётом неотправленных приращений текущего процесса.
+    """
+    flush()
+    values = cache.get_many([f"metrics:{name}" for name in COUNTERS])
+    return {name: values.get(f"metrics:{name}", 0) for name in sorted(COUNTERS)}
+
+
+def ratio(hits, misses):
+    """
+    Возвращает долю попаданий или None, если обращений не было.
+    """
+    total = hits + misses
+    return round(hits / total, 4) if total else None
+
+
+def average(total, count):
+    """
+    Возвращает среднее значение или None, если событий не было.
+    """
+    return round(total / count, 4) if count else None
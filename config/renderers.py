@@ -0,0 +1,35 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON-рендерер на orjson.
+
+    Значения, которые orjson не сериализует сам (даты, время, интервалы,
+    Decimal, ленивые строки), передаются энкодеру DRF, поэтому ответ совпадает
+    с ответом стандартного JSONRenderer. Форматы "%H:%M" и "%d/%m/%y" полей
+    привычки применяет сериализатор до рендеринга. Без orjson, а также
+    для форматированного вывода (indent) используется стандартный модуль json.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if orjson is None or indent is not None or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+        # Как и JSONRenderer, экранируем разделители строк для совместимости с JS
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
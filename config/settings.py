@@ -1,6 +1,9 @@
+import math
 import os
 from datetime import timedelta
 
+from django.core.exceptions import ImproperlyConfigured
+
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -20,6 +23,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     "rest_framework",
     "rest_framework_simplejwt",
     "drf_yasg",
@@ -60,25 +64,45 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
+
+# Асинхронные контроллеры списков и просмотра привычек (режим ASGI)
+API_ASYNC_VIEWS = os.getenv("API_ASYNC_VIEWS", "False") == "True"
 
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "config.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "config.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "config.db.postgresql",
         "NAME": os.getenv("POSTGRES_DB"),
         "USER": os.getenv("POSTGRES_USER"),
         "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
         "HOST": os.getenv("POSTGRES_HOST"),
         "PORT": os.getenv("POSTGRES_PORT"),
+        # Постоянные соединения: время жизни соединения в секундах
+        # (0 - закрывать после каждого запроса) и проверка перед повторным
+        # использованием
+        "CONN_MAX_AGE": int(os.getenv("POSTGRES_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": os.getenv("POSTGRES_CONN_HEALTH_CHECKS") != "False",
+        # За PgBouncer в режиме transaction серверные курсоры не работают
+        "DISABLE_SERVER_SIDE_CURSORS": os.getenv("POSTGRES_PGBOUNCER") == "True",
     }
 }
 
@@ -114,19 +138,112 @@ AUTH_USER_MODEL = "users.User"
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
+# Задача подтверждается после выполнения: шард упавшего воркера получит другой воркер
+CELERY_TASK_ACKS_LATE = True
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND")
 
+# Опрос БД остаётся сверкой на случай, если планировщик напоминаний что-то пропустил
 CELERY_BEAT_SCHEDULE = {
     "task-name": {
-        "task": "habit.tasks.send_habit_reminder",
-        "schedule": timedelta(minutes=1),
+        "task": "habits.tasks.send_habit_reminder",
+        "schedule": timedelta(minutes=int(os.getenv("REMINDER_POLL_MINUTES", 5))),
+    },
+    "drain-reminder-outbox": {
+        "task": "habits.tasks.drain_reminder_outbox",
+        "schedule": timedelta(seconds=int(os.getenv("OUTBOX_POLL_SECONDS", 15))),
+    },
+    "purge-reminder-outbox": {
+        "task": "habits.tasks.purge_reminder_outbox",
+        "schedule": timedelta(days=1),
     },
 }
 
-TELEGRAM_URL = "https://api.telegram.org/bot"
+# Outbox напоминаний: размер пачки, которую забирает обработчик
+# (срок аренды записей - OUTBOX_LEASE, см. ниже настройки Telegram)
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 500))
+# Повторы недоставленных напоминаний: задержка растёт вдвое с каждой попыткой
+# от OUTBOX_RETRY_DELAY до OUTBOX_RETRY_MAX_DELAY секунд, после
+# OUTBOX_MAX_ATTEMPTS попыток напоминание переносится в недоставленные
+OUTBOX_RETRY_DELAY = int(os.getenv("OUTBOX_RETRY_DELAY", 30))
+OUTBOX_RETRY_MAX_DELAY = int(os.getenv("OUTBOX_RETRY_MAX_DELAY", 60 * 60))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 8))
+# Сколько дней хранятся доставленные напоминания
+OUTBOX_RETENTION_DAYS = int(os.getenv("OUTBOX_RETENTION_DAYS", 7))
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+
+# Кеш пользователей JWT-аутентификации: время жизни в Redis (в секундах),
+# размер и время жизни (в секундах) кеша в памяти процесса
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", 60))
+AUTH_USER_LRU_SIZE = int(os.getenv("AUTH_USER_LRU_SIZE", 1024))
+AUTH_USER_LRU_TTL = float(os.getenv("AUTH_USER_LRU_TTL", 5))
+
+# Размер пачки строк, читаемых из БД при потоковой выгрузке привычек
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 2000))
+
+# Импорт привычек: размер пачки строк, проверяемых и вставляемых за раз,
+# и максимальное количество ошибок в отчёте
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 2000))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", 1000))
+
+# Время жизни закешированных страниц публичных привычек в секундах
+PUBLIC_HABITS_CACHE_TTL = int(os.getenv("PUBLIC_HABITS_CACHE_TTL", 60))
+
+# Как часто (в секундах) процесс отправляет накопленные счётчики метрик в Redis
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 5))
+
+# Планировщик напоминаний: канал Redis с изменениями привычек
+# и горизонт (в секундах), на который расписание держится в памяти
+REMINDER_SCHEDULER_CHANNEL = "habits:schedule"
+REMINDER_SCHEDULER_HORIZON = int(os.getenv("REMINDER_SCHEDULER_HORIZON", 3600))
+
+TELEGRAM_URL = os.getenv("TELEGRAM_URL", "https://api.telegram.org/bot")
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
+# Лимиты Telegram: не более 30 сообщений в секунду всего и 1 сообщения в секунду в один чат.
+# С Redis общий лимит соблюдается суммарно всеми процессами
+TELEGRAM_RATE_LIMIT = float(os.getenv("TELEGRAM_RATE_LIMIT", 30))
+TELEGRAM_CHAT_RATE_LIMIT = float(os.getenv("TELEGRAM_CHAT_RATE_LIMIT", 1))
+TELEGRAM_SENDER_WORKERS = int(os.getenv("TELEGRAM_SENDER_WORKERS", 8))
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", 3))
+TELEGRAM_TIMEOUT = float(os.getenv("TELEGRAM_TIMEOUT", 10))
+# Пачка outbox отправляется порциями примерно на секунду общего лимита:
+# после каждой порции доставленные записи отмечаются, а аренда остальных
+# продлевается. Срок аренды (в секундах) с двукратным запасом на нескольких
+# обработчиков покрывает отправку порции, в которой сообщение с повторами
+# отправляется не дольше TELEGRAM_SEND_MAX_TIME секунд
+OUTBOX_SEND_CHUNK_SIZE = max(1, int(TELEGRAM_RATE_LIMIT))
+TELEGRAM_SEND_MAX_TIME = (TELEGRAM_MAX_RETRIES + 1) * TELEGRAM_TIMEOUT + 0.5 * (
+    2**TELEGRAM_MAX_RETRIES - 1
+)
+OUTBOX_MIN_LEASE = math.ceil(
+    2 * (TELEGRAM_SEND_MAX_TIME + OUTBOX_SEND_CHUNK_SIZE / TELEGRAM_RATE_LIMIT)
+)
+OUTBOX_LEASE = int(os.getenv("OUTBOX_LEASE", OUTBOX_MIN_LEASE))
+if OUTBOX_LEASE < OUTBOX_MIN_LEASE:
+    raise ImproperlyConfigured(
+        f"OUTBOX_LEASE должен быть не меньше {OUTBOX_MIN_LEASE} с: иначе запись "
+        "может быть забрана повторно до окончания отправки."
+    )
+# Бот: имя для ссылок привязки чата, секрет вебхука, время жизни ссылки
+# привязки и срок хранения обработанных обновлений (в секундах)
+TELEGRAM_BOT_NAME = os.getenv("TELEGRAM_BOT_NAME")
+TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET")
+TELEGRAM_LINK_TTL = int(os.getenv("TELEGRAM_LINK_TTL", 900))
+TELEGRAM_UPDATE_TTL = int(os.getenv("TELEGRAM_UPDATE_TTL", 24 * 60 * 60))
+# На сколько минут откладывается напоминание кнопкой «Отложить»
+REMINDER_SNOOZE_MINUTES = int(os.getenv("REMINDER_SNOOZE_MINUTES", 15))
 
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:8000",
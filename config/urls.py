@@ -4,6 +4,8 @@ from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 
+from config.views import MetricsAPIView
+
 schema_view = get_schema_view(
     openapi.Info(
         title="Snippets API",
@@ -22,4 +24,5 @@ urlpatterns = [
     path("habits/", include("habits.urls", namespace="habits")),
     path("users/", include("users.urls", namespace="users")),
     path("redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"),
+    path("metrics/", MetricsAPIView.as_view(), name="metrics"),
 ]
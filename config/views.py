@@ -0,0 +1,41 @@
+from django.utils import timezone
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from config import metrics
+from config.db import DB_CONNECT_TIME, DB_CONNECTIONS
+from habits.tasks import REMINDER_HABITS, REMINDER_MESSAGES, get_outbox_stats
+
+
+class MetricsAPIView(APIView):
+    """
+    Контроллер получения метрик приложения.
+    """
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        counters = metrics.get_counters()
+        ratios = {
+            name.removesuffix(".hits"): metrics.ratio(
+                value, counters.get(name.replace(".hits", ".misses"), 0)
+            )
+            for name, value in counters.items()
+            if name.endswith(".hits")
+        }
+        connect_time = metrics.average(
+            counters.get(DB_CONNECT_TIME, 0) / 1000, counters.get(DB_CONNECTIONS, 0)
+        )
+        habits_per_message = metrics.average(
+            counters.get(REMINDER_HABITS, 0), counters.get(REMINDER_MESSAGES, 0)
+        )
+        return Response(
+            {
+                "counters": counters,
+                "hit_ratio": ratios,
+                "db_connect_ms_avg": connect_time,
+                "reminder_habits_per_message": habits_per_message,
+                "reminder_outbox": get_outbox_stats(timezone.now()),
+            }
+        )
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from habits.models import Habit
+from habits.models import (Habit, HabitEvent, HabitStats, HabitSummary,
+                           ReminderOutbox)
 
 
 @admin.register(Habit)
@@ -11,8 +12,56 @@ class HabitAdmin(admin.ModelAdmin):
         "action",
         "start_at",
         "execute_at",
+        "next_run_at",
         "periodicity",
         "is_public",
         "is_pleasure",
     )
 
+
+@admin.register(ReminderOutbox)
+class ReminderOutboxAdmin(admin.ModelAdmin):
+    list_display = (
+        "pk",
+        "habit",
+        "chat_id",
+        "created_at",
+        "available_at",
+        "attempts",
+        "delivered_at",
+        "failed_at",
+    )
+
+
+@admin.register(HabitEvent)
+class HabitEventAdmin(admin.ModelAdmin):
+    list_display = (
+        "pk",
+        "habit",
+        "kind",
+        "date",
+        "created_at",
+    )
+    list_filter = ("kind",)
+
+
+@admin.register(HabitStats)
+class HabitStatsAdmin(admin.ModelAdmin):
+    list_display = (
+        "habit",
+        "due_count",
+        "done_count",
+        "current_streak",
+        "best_streak",
+        "last_done_on",
+    )
+
+
+@admin.register(HabitSummary)
+class HabitSummaryAdmin(admin.ModelAdmin):
+    list_display = (
+        "user",
+        "useful_count",
+        "pleasant_count",
+        "public_count",
+    )
@@ -6,3 +6,5 @@ class HabitsConfig(AppConfig):
     name = "habits"
     verbose_name = "Привычки"
 
+    def ready(self):
+        import habits.signals  # noqa: F401
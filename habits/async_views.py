@@ -0,0 +1,224 @@
+import orjson
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.paginator import InvalidPage
+from django.http import HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import (APIException, AuthenticationFailed,
+                                       NotAuthenticated, NotFound)
+from rest_framework.request import Request
+
+from config import metrics
+from config.renderers import ORJSONRenderer
+from config.settings import PUBLIC_HABITS_CACHE_TTL, REDIS_URL
+from habits.bot import handle_webhook
+from habits.caching import (PUBLIC_HABITS_HITS, PUBLIC_HABITS_MISSES,
+                            aget_public_habits_key, get_etag)
+from habits.filters import PublicHabitFilter
+from habits.models import Habit
+from habits.paginators import CustomPagination
+from habits.serializers import get_habit_values_fields, serialize_habit_rows
+from habits.services import get_async_redis
+from habits.views import get_page_params, is_not_modified
+from users.authentication import AsyncJWTAuthentication
+
+
+class AsyncHabitAPIView(View):
+    """
+    Основа асинхронных контроллеров чтения привычек для работы под ASGI.
+
+    Пользователь и привычки загружаются асинхронным ORM Django, ответ
+    рендерится ORJSONRenderer, синхронный код в цикле событий не выполняется.
+    Ответы и ошибки совпадают с ответами синхронных контроллеров.
+    """
+
+    http_method_names = ["get", "options"]
+    authentication = AsyncJWTAuthentication()
+    renderer = ORJSONRenderer()
+    permission_required = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            request.user = await self.authentication.aauthenticate(request)
+            if self.permission_required and not request.user.is_authenticated:
+                raise NotAuthenticated()
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            return self.handle_exception(request, exc)
+
+    def handle_exception(self, request, exc):
+        if isinstance(exc.detail, (list, dict)):
+            data = exc.detail
+        else:
+            data = {"detail": exc.detail}
+        response = self.render(data, exc.status_code)
+        if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+            response["WWW-Authenticate"] = self.authentication.authenticate_header(
+                request
+            )
+        return response
+
+    def render(self, data, status_code=status.HTTP_200_OK, headers=None):
+        return HttpResponse(
+            self.renderer.render(data),
+            status=status_code,
+            content_type=self.renderer.media_type,
+            headers=headers,
+        )
+
+    def get_values(self, queryset):
+        return queryset.values(*get_habit_values_fields())
+
+    async def paginate(self, request, queryset):
+        """
+        Возвращает данные страницы списка в формате CustomPagination.
+        Постраничный режим выполняется асинхронным ORM, курсорный -
+        синхронной CursorPagination в потоке, где асинхронный ORM Django
+        выполняет запросы к БД.
+        """
+        request = Request(request)
+        paginator = CustomPagination()
+        queryset = self.get_values(queryset)
+        if paginator.is_cursor_mode(request):
+            rows = await sync_to_async(paginator.paginate_queryset)(queryset, request)
+        else:
+            rows = await self.paginate_pages(paginator, queryset, request)
+        return paginator.get_paginated_response(serialize_habit_rows(rows)).data
+
+    @staticmethod
+    async def paginate_pages(paginator, queryset, request):
+        page_size = paginator.get_page_size(request)
+        django_paginator = paginator.django_paginator_class((), page_size)
+        django_paginator.count = await queryset.acount()
+        page_number = request.query_params.get(paginator.page_query_param) or 1
+        if page_number in paginator.last_page_strings:
+            page_number = django_paginator.num_pages
+        try:
+            page = django_paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(
+                paginator.invalid_page_message.format(
+                    page_number=page_number, message=str(exc)
+                )
+            )
+        offset = (page.number - 1) * page_size
+        page.object_list = [row async for row in queryset[offset : offset + page_size]]
+        paginator.page = page
+        paginator.request = request
+        return page.object_list
+
+
+class HabitListAsyncAPIView(AsyncHabitAPIView):
+    """
+    Асинхронный контроллер получения списка привычек пользователя.
+    """
+
+    async def get(self, request):
+        user = request.user
+        queryset = Habit.objects.order_by("-id")
+        if not user.is_superuser:
+            queryset = queryset.filter(user=user)
+        return self.render(await self.paginate(request, queryset))
+
+
+class HabitRetrieveAsyncAPIView(AsyncHabitAPIView):
+    """
+    Асинхронный контроллер получения информации о привычке.
+    """
+
+    async def get(self, request, pk):
+        queryset = Habit.objects.filter(pk=pk, user_id=request.user.pk)
+        row = await self.get_values(queryset).afirst()
+        if row is None:
+            raise NotFound(f"No {Habit._meta.object_name} matches the given query.")
+        return self.render(serialize_habit_rows([row])[0])
+
+
+class PublicHabitListAsyncAPIView(AsyncHabitAPIView):
+    """
+    Асинхронный контроллер получения списка публичных привычек.
+    Фильтры и кеширование страниц - как в PublicHabitListAPIView
+    (значения фильтров проверяются при построении ключа кеша).
+    """
+
+    permission_required = False
+
+    async def get(self, request):
+        params = get_page_params(Request(request), CustomPagination())
+        key = await aget_public_habits_key(**params)
+        cached = await cache.aget(key)
+        if cached is None:
+            metrics.incr(PUBLIC_HABITS_MISSES)
+            queryset = Habit.objects.filter(is_public=True).order_by("-id")
+            queryset = PublicHabitFilter(request.GET, queryset=queryset).qs
+            data = await self.paginate(request, queryset)
+            cached = (data, get_etag(data))
+            await cache.aset(key, cached, PUBLIC_HABITS_CACHE_TTL)
+        else:
+            metrics.incr(PUBLIC_HABITS_HITS)
+
+        data, etag = cached
+        if is_not_modified(request, etag):
+            return HttpResponse(
+                status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+            )
+        return self.render(data, headers={"ETag": etag})
+
+
+class TelegramWebhookView(View):
+    """
+    Асинхронный контроллер вебхука Telegram: привязка чата по ссылке
+    и кнопки под напоминаниями (habits.bot). Ответ бота возвращается в теле
+    ответа вебхука, поэтому обработка обновления не ждёт запросов к Telegram.
+    Под ASGI запросы вебхука минуют middleware Django
+    (telegram_webhook_application).
+    """
+
+    http_method_names = ["post"]
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def post(self, request):
+        status_code, reply = await handle_webhook(
+            request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), request.body
+        )
+        if reply is None:
+            return HttpResponse(status=status_code)
+        return HttpResponse(orjson.dumps(reply), content_type="application/json")
+
+
+async def telegram_webhook_application(scope, receive, send):
+    """
+    ASGI-приложение вебхука Telegram. Обновления приходят пиками, а каждая
+    синхронная middleware Django выполняется в отдельном потоке, поэтому
+    запросы обрабатываются напрямую: без middleware, сессий и аутентификации
+    (запрос проверяется по секрету вебхука). Повторы отбрасываются
+    асинхронным клиентом Redis: цикл событий воркера живёт весь процесс,
+    поэтому клиент и его пул соединений создаются один раз.
+    """
+    if scope["method"] != "POST":
+        status_code, reply = status.HTTP_405_METHOD_NOT_ALLOWED, None
+    else:
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+        headers = dict(scope["headers"])
+        secret = headers.get(b"x-telegram-bot-api-secret-token", b"")
+        redis = get_async_redis() if REDIS_URL else None
+        status_code, reply = await handle_webhook(secret.decode("latin-1"), body, redis)
+
+    content = b"" if reply is None else orjson.dumps(reply)
+    headers = [(b"content-length", str(len(content)).encode())]
+    if reply is not None:
+        headers.append((b"content-type", b"application/json"))
+    await send(
+        {"type": "http.response.start", "status": status_code, "headers": headers}
+    )
+    await send({"type": "http.response.body", "body": content})
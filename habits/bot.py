@@ -0,0 +1,213 @@
+from datetime import timedelta
+from functools import wraps
+
+import orjson
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+
+from config import metrics
+from config.settings import (REMINDER_SNOOZE_MINUTES, TELEGRAM_UPDATE_TTL,
+                             TELEGRAM_WEBHOOK_SECRET)
+from habits.models import Habit, ReminderOutbox
+from habits.stats import mark_done
+from users.telegram import link_chat
+
+# Действия кнопок под напоминанием
+DONE = "done"
+SNOOZE = "snooze"
+
+TELEGRAM_UPDATES = metrics.counter("telegram.updates")
+TELEGRAM_DUPLICATES = metrics.counter("telegram.duplicates")
+
+
+def get_reminder_markup(habit_id):
+    """
+    Возвращает кнопки «Выполнено» и «Отложить» для напоминания о привычке.
+    """
+    return {
+        "inline_keyboard": [
+            [
+                {"text": "Выполнено", "callback_data": f"{DONE}:{habit_id}"},
+                {
+                    "text": f"Отложить на {REMINDER_SNOOZE_MINUTES} мин",
+                    "callback_data": f"{SNOOZE}:{habit_id}",
+                },
+            ]
+        ]
+    }
+
+
+def get_update_key(update_id):
+    return f"telegram:updates:{update_id}"
+
+
+async def acquire_update(update_id, redis=None):
+    """
+    Отмечает обновление Telegram как принятое в обработку. Возвращает False,
+    если обновление уже обрабатывалось: Telegram повторяет доставку
+    обновлений, на которые не получил ответа. С асинхронным клиентом
+    Redis отметка ставится командой SET NX без перехода в поток.
+    """
+    key = get_update_key(update_id)
+    if redis is not None:
+        return bool(await redis.set(key, 1, nx=True, ex=TELEGRAM_UPDATE_TTL))
+    return await cache.aadd(key, 1, TELEGRAM_UPDATE_TTL)
+
+
+async def release_update(update_id, redis=None):
+    """
+    Снимает отметку с обновления, обработка которого не удалась,
+    чтобы повторная доставка обработала его снова.
+    """
+    key = get_update_key(update_id)
+    if redis is not None:
+        await redis.delete(key)
+    else:
+        await cache.adelete(key)
+
+
+def database_sync_to_async(func):
+    """
+    Выполняет синхронную работу с БД в потоке пула, не дожидаясь
+    других обновлений (thread_sensitive=False). Соединения потока
+    проверяются до и после вызова, как в начале и в конце запроса Django.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(wrapper, thread_sensitive=False)
+
+
+def get_chat_habit(habit_id, chat_id):
+    """
+    Возвращает привычку пользователя, к которому привязан чат, или None.
+    """
+    return (
+        Habit.objects.select_related("user")
+        .filter(pk=habit_id, user__tg_chat_id=chat_id)
+        .first()
+    )
+
+
+@database_sync_to_async
+def complete_habit(habit_id, chat_id):
+    """
+    Отмечает выполнение привычки сегодня в часовом поясе пользователя.
+    Возвращает текст ответа на нажатие кнопки.
+    """
+    habit = get_chat_habit(habit_id, chat_id)
+    if habit is None:
+        return "Привычка не найдена."
+    _, created = mark_done(habit, timezone.localdate(timezone=habit.user.tzinfo))
+    return "Выполнение отмечено." if created else "Выполнение уже отмечено."
+
+
+@database_sync_to_async
+def snooze_reminder(habit_id, chat_id, text):
+    """
+    Повторно ставит напоминание в outbox через REMINDER_SNOOZE_MINUTES минут.
+    Возвращает текст ответа на нажатие кнопки.
+    """
+    habit = get_chat_habit(habit_id, chat_id)
+    if habit is None:
+        return "Привычка не найдена."
+    ReminderOutbox.objects.create(
+        habit=habit,
+        chat_id=chat_id,
+        text=text or habit.get_reminder_message(),
+        available_at=timezone.now() + timedelta(minutes=REMINDER_SNOOZE_MINUTES),
+    )
+    return f"Напомню через {REMINDER_SNOOZE_MINUTES} мин."
+
+
+async def handle_message(message):
+    """
+    Обрабатывает команду /start <токен привязки>: привязывает чат к пользователю.
+    """
+    command, _, token = message.get("text", "").partition(" ")
+    if command != "/start":
+        return None
+    chat_id = str(message["chat"]["id"])
+    user = None
+    if token:
+        user = await database_sync_to_async(link_chat)(token.strip(), chat_id)
+    if user is None:
+        text = "Ссылка для привязки недействительна. Получите новую в приложении."
+    else:
+        text = "Чат привязан. Сюда будут приходить напоминания о привычках."
+    return {"method": "sendMessage", "chat_id": chat_id, "text": text}
+
+
+async def handle_callback(callback):
+    """
+    Обрабатывает нажатие кнопки под напоминанием.
+    """
+    action, _, habit_id = callback.get("data", "").partition(":")
+    message = callback.get("message") or {}
+    chat_id = str(message.get("chat", {}).get("id", ""))
+    if not habit_id.isdigit() or not chat_id:
+        text = "Неизвестное действие."
+    elif action == DONE:
+        text = await complete_habit(int(habit_id), chat_id)
+    elif action == SNOOZE:
+        text = await snooze_reminder(int(habit_id), chat_id, message.get("text"))
+    else:
+        text = "Неизвестное действие."
+    return {
+        "method": "answerCallbackQuery",
+        "callback_query_id": callback["id"],
+        "text": text,
+    }
+
+
+async def handle_update(update):
+    """
+    Обрабатывает обновление Telegram. Возвращает вызов метода Bot API,
+    который отправляется ответом на запрос вебхука (без отдельного запроса
+    к Telegram), или None.
+    """
+    if "message" in update:
+        return await handle_message(update["message"])
+    if "callback_query" in update:
+        return await handle_callback(update["callback_query"])
+    return None
+
+
+async def handle_webhook(secret, body, redis=None):
+    """
+    Обрабатывает запрос вебхука Telegram. Запрос принимается, только если
+    секрет из заголовка X-Telegram-Bot-Api-Secret-Token совпадает
+    с TELEGRAM_WEBHOOK_SECRET. Повторно доставленные обновления
+    отбрасываются по update_id (redis - асинхронный клиент Redis,
+    без него используется кеш Django). Возвращает код ответа и вызов
+    метода Bot API для тела ответа (или None).
+    """
+    if not TELEGRAM_WEBHOOK_SECRET or not constant_time_compare(
+        secret, TELEGRAM_WEBHOOK_SECRET
+    ):
+        return 403, None
+    try:
+        update = orjson.loads(body)
+        update_id = int(update["update_id"])
+    except (orjson.JSONDecodeError, TypeError, KeyError, ValueError):
+        return 400, None
+
+    metrics.incr(TELEGRAM_UPDATES)
+    if not await acquire_update(update_id, redis):
+        metrics.incr(TELEGRAM_DUPLICATES)
+        return 200, None
+    try:
+        reply = await handle_update(update)
+    except Exception:
+        await release_update(update_id, redis)
+        raise
+    return 200, reply
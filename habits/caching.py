@@ -0,0 +1,92 @@
+import hashlib
+import json
+import logging
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+from config import metrics
+
+logger = logging.getLogger(__name__)
+
+PUBLIC_HABITS_VERSION_KEY = "public_habits:version"
+PUBLIC_HABITS_HITS = metrics.counter("public_habits_cache.hits")
+PUBLIC_HABITS_MISSES = metrics.counter("public_habits_cache.misses")
+PUBLIC_HABITS_NOT_MODIFIED = metrics.counter("public_habits_cache.not_modified")
+
+
+def get_public_habits_version():
+    """
+    Возвращает текущую версию кеша публичных привычек.
+    """
+    version = cache.get(PUBLIC_HABITS_VERSION_KEY)
+    if version is None:
+        cache.add(PUBLIC_HABITS_VERSION_KEY, 1, timeout=None)
+        version = cache.get(PUBLIC_HABITS_VERSION_KEY, 1)
+    return version
+
+
+async def aget_public_habits_version():
+    """
+    Асинхронная версия get_public_habits_version().
+    """
+    version = await cache.aget(PUBLIC_HABITS_VERSION_KEY)
+    if version is None:
+        await cache.aadd(PUBLIC_HABITS_VERSION_KEY, 1, timeout=None)
+        version = await cache.aget(PUBLIC_HABITS_VERSION_KEY, 1)
+    return version
+
+
+def invalidate_public_habits():
+    """
+    Сбрасывает кеш публичных привычек сменой версии:
+    старые ключи больше не читаются и истекают сами.
+    Вызывается после фиксации транзакции, поэтому при сбое кеша
+    ошибка только записывается в журнал: устаревшие страницы
+    истекут через PUBLIC_HABITS_CACHE_TTL.
+    """
+    try:
+        cache.incr(PUBLIC_HABITS_VERSION_KEY)
+    except ValueError:
+        cache.add(PUBLIC_HABITS_VERSION_KEY, 1, timeout=None)
+    except Exception:
+        # Исключения недоступного кеша зависят от бэкенда
+        logger.warning("Не удалось сбросить кеш публичных привычек", exc_info=True)
+
+
+def affects_public_habits(habit):
+    """
+    Проверяет, влияет ли изменение привычки на список публичных привычек:
+    привычка публичная сейчас или была публичной при загрузке.
+    Для отложенного поля is_public кеш сбрасывается на всякий случай.
+    """
+    is_public = habit.flags[1]
+    was_public = (habit._loaded_flags or (None, None))[1]
+    return is_public is not False or was_public is True
+
+
+def get_public_habits_key(**params):
+    """
+    Возвращает ключ кеша страницы публичных привычек.
+    """
+    return make_public_habits_key(get_public_habits_version(), params)
+
+
+async def aget_public_habits_key(**params):
+    """
+    Асинхронная версия get_public_habits_key().
+    """
+    return make_public_habits_key(await aget_public_habits_version(), params)
+
+
+def make_public_habits_key(version, params):
+    parts = ":".join(f"{name}={params[name]}" for name in sorted(params))
+    return f"public_habits:v{version}:{parts}"
+
+
+def get_etag(data):
+    """
+    Возвращает ETag ответа по его содержимому.
+    """
+    content = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+    return f'"{hashlib.md5(content.encode()).hexdigest()}"'
@@ -0,0 +1,81 @@
+import csv
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+
+from config.renderers import ORJSONRenderer
+from config.settings import EXPORT_CHUNK_SIZE
+from habits.serializers import (get_habit_values_fields, serialize_habit_row,
+                                serialize_habit_rows)
+
+
+def iter_habit_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Перебирает привычки в представлении HabitSerializer, держа в памяти
+    не более chunk_size строк: через серверный курсор (iterator), а если
+    серверные курсоры отключены (PgBouncer) - пачками по первичному ключу.
+    """
+    queryset = queryset.values(*get_habit_values_fields()).order_by("pk")
+    settings_dict = connections[queryset.db].settings_dict
+    if not settings_dict.get("DISABLE_SERVER_SIDE_CURSORS"):
+        for row in queryset.iterator(chunk_size=chunk_size):
+            yield serialize_habit_row(row)
+        return
+
+    last_pk = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+        yield from serialize_habit_rows(rows)
+        if len(rows) < chunk_size:
+            return
+        last_pk = rows[-1]["id"]
+
+
+def render_ndjson(rows):
+    """
+    Выдаёт привычки построчно в формате NDJSON.
+    """
+    renderer = ORJSONRenderer()
+    for row in rows:
+        yield renderer.render(row) + b"\n"
+
+
+class Echo:
+    """
+    Псевдобуфер для csv.writer: возвращает записанную строку вместо хранения.
+    """
+
+    def write(self, value):
+        return value
+
+
+def render_csv(rows):
+    """
+    Выдаёт привычки построчно в формате CSV с заголовком.
+    """
+    fields = get_habit_values_fields()
+    writer = csv.DictWriter(Echo(), fieldnames=fields)
+    yield writer.writerow(dict(zip(fields, fields))).encode()
+    for row in rows:
+        yield writer.writerow(row).encode()
+
+
+async def aiter_chunks(content, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Асинхронно выдаёт синхронный поток выгрузки кусками по chunk_size строк.
+    Под ASGI Django читает синхронный StreamingHttpResponse целиком
+    в память, поэтому строки вытягиваются через sync_to_async: в одном
+    потоке, где открыт курсор БД, и по куску за переход между потоками.
+    """
+    content = iter(content)
+    next_chunk = sync_to_async(lambda: list(islice(content, chunk_size)))
+    while chunk := await next_chunk():
+        yield b"".join(chunk)
+
+
+# Форматы выгрузки: функция рендеринга, тип содержимого и имя файла
+EXPORT_FORMATS = {
+    "ndjson": (render_ndjson, "application/x-ndjson", "habits.ndjson"),
+    "csv": (render_csv, "text/csv; charset=utf-8", "habits.csv"),
+}
@@ -0,0 +1,141 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+
+class FakeTelegramHandler(BaseHTTPRequestHandler):
+    """
+    Обработчик запросов к Bot API: запоминает сообщения и отвечает как Telegram.
+    """
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.handle_method(dict(parse_qsl(urlsplit(self.path).query)))
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            params = json.loads(body or b"{}")
+        else:
+            params = dict(parse_qsl(body.decode()))
+        self.handle_method(params)
+
+    def handle_method(self, params):
+        method = urlsplit(self.path).path.rsplit("/", 1)[-1]
+        status, payload = self.server.handle_call(method, params)
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeTelegramServer(ThreadingHTTPServer):
+    """
+    Локальный сервер, имитирующий Telegram Bot API, для тестов и замеров без сети.
+    Первые fail_first вызовов получают ответ fail_status,
+    latency задаёт задержку ответа в секундах (имитация сетевой задержки).
+    Методы *_update строят обновления, которые Telegram отправляет на вебхук.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self, host="127.0.0.1", port=0, fail_first=0, fail_status=429, latency=0
+    ):
+        super().__init__((host, port), FakeTelegramHandler)
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.latency = latency
+        self.calls = []
+        self.lock = threading.Lock()
+        self.thread = None
+        self.update_id = 0
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/bot"
+
+    @property
+    def messages(self):
+        return [params for method, params in self.calls if method == "sendMessage"]
+
+    def handle_call(self, method, params):
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            if self.fail_first > 0:
+                self.fail_first -= 1
+                return self.fail_status, {
+                    "ok": False,
+                    "error_code": self.fail_status,
+                    "parameters": {"retry_after": 0},
+                }
+            self.calls.append((method, params))
+            message_id = len(self.calls)
+        return 200, {"ok": True, "result": {"message_id": message_id}}
+
+    def next_update_id(self):
+        with self.lock:
+            self.update_id += 1
+            return self.update_id
+
+    def message_update(self, chat_id, text):
+        """
+        Обновление с текстовым сообщением пользователя в чате chat_id.
+        """
+        return {
+            "update_id": self.next_update_id(),
+            "message": {
+                "message_id": 1,
+                "date": int(time.time()),
+                "chat": {"id": int(chat_id), "type": "private"},
+                "text": text,
+            },
+        }
+
+    def callback_update(self, chat_id, data, text=""):
+        """
+        Обновление с нажатием кнопки с данными data под сообщением text.
+        """
+        update_id = self.next_update_id()
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "data": data,
+                "message": {
+                    "message_id": 1,
+                    "date": int(time.time()),
+                    "chat": {"id": int(chat_id), "type": "private"},
+                    "text": text,
+                },
+            },
+        }
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,66 @@
+import hashlib
+
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            TrigramWordSimilarity)
+from django.db import connections
+from django.db.models import Q
+from django_filters import rest_framework as filters
+from django_filters import utils
+
+from habits.models import HABIT_SEARCH_CONFIG, HABIT_SEARCH_VECTOR, Habit
+
+
+class PublicHabitFilter(filters.FilterSet):
+    """
+    Фильтры и поиск по публичным привычкам.
+
+    Поиск (search) в PostgreSQL - полнотекстовый по действию, месту
+    и вознаграждению и триграммный (с опечатками) по действию, результаты
+    упорядочены по релевантности. На других СУБД - поиск подстроки.
+    Время начала фильтруется диапазоном start_at_after / start_at_before.
+    """
+
+    search = filters.CharFilter(method="filter_search", label="Поиск")
+    start_at = filters.TimeRangeFilter(label="Время начала")
+
+    class Meta:
+        model = Habit
+        fields = {
+            "is_pleasure": ["exact"],
+            "periodicity": ["exact", "lte", "gte"],
+        }
+
+    def filter_search(self, queryset, name, value):
+        if connections[queryset.db].vendor != "postgresql":
+            return queryset.filter(
+                Q(action__icontains=value)
+                | Q(place__icontains=value)
+                | Q(reward__icontains=value)
+            )
+        query = SearchQuery(value, config=HABIT_SEARCH_CONFIG, search_type="websearch")
+        return (
+            queryset.annotate(search=HABIT_SEARCH_VECTOR)
+            .filter(Q(search=query) | Q(action__trigram_word_similar=value))
+            .annotate(
+                rank=SearchRank(HABIT_SEARCH_VECTOR, query)
+                + TrigramWordSimilarity(value, "action")
+            )
+            .order_by("-rank", "-id")
+        )
+
+
+def get_filters_key(query_params):
+    """
+    Возвращает хеш значений фильтров публичных привычек для ключа кеша
+    страницы. Некорректные значения фильтров - ошибка 400,
+    как у DjangoFilterBackend.
+    """
+    filterset = PublicHabitFilter(query_params, queryset=Habit.objects.none())
+    if not filterset.is_valid():
+        raise utils.translate_validation(filterset.errors)
+    values = sorted(
+        (name, str(value))
+        for name, value in filterset.form.cleaned_data.items()
+        if value not in (None, "")
+    )
+    return hashlib.md5(repr(values).encode()).hexdigest()
@@ -0,0 +1,220 @@
+import codecs
+import csv
+import json
+from datetime import timedelta
+from itertools import compress, islice
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+
+from config.renderers import orjson
+from config.settings import (IMPORT_CHUNK_SIZE, IMPORT_MAX_ERRORS,
+                             REMINDER_SCHEDULER_HORIZON)
+from habits.models import Habit
+from habits.serializers import HabitImportSerializer, get_related_habits
+from habits.signals import notify_habits_changed
+from habits.summary import change_summary
+from habits.validators import (PeriodicityValidator, PleasantHabitValidator,
+                               RewardValidator, RuntimeValidator)
+
+loads = orjson.loads if orjson is not None else json.loads
+
+RELATED_HABIT_OWNER_MESSAGE = "Связанная привычка должна принадлежать пользователю."
+
+
+def parse_ndjson(stream):
+    """
+    Построчно разбирает NDJSON из бинарного потока.
+    Выдаёт пары (номер строки, данные или None, если строка не разобрана).
+    """
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, loads(line)
+        except ValueError:
+            yield line_number, None
+
+
+def parse_csv(stream):
+    """
+    Построчно разбирает CSV с заголовком из бинарного потока.
+    Выдаёт пары (номер строки, данные). Пустые ячейки пропускаются,
+    чтобы применились значения полей по умолчанию.
+    """
+    reader = csv.DictReader(codecs.iterdecode(stream, "utf-8-sig"))
+    for row in reader:
+        yield reader.line_num, {key: value for key, value in row.items() if value}
+
+
+IMPORT_FORMATS = {
+    "ndjson": parse_ndjson,
+    "csv": parse_csv,
+}
+
+
+def get_import_format(content_type):
+    """
+    Определяет формат импорта по типу содержимого, по умолчанию - NDJSON.
+    """
+    return "csv" if content_type.startswith("text/csv") else "ndjson"
+
+
+def validate_batch(rows, user):
+    """
+    Применяет правила habits.validators ко всей пачке разобранных строк.
+    Значения полей собираются в столбцы, каждое правило проверяется одним
+    проходом по ним. Связанные привычки уже загружены для пачки, поэтому их
+    владелец проверяется без запросов. Возвращает ошибки по индексам строк.
+    """
+    runtimes = [attrs.get("runtime") for attrs in rows]
+    periodicities = [attrs.get("periodicity") for attrs in rows]
+    related_habits = [attrs.get("related_habit") for attrs in rows]
+    rewards = [bool(attrs.get("reward")) for attrs in rows]
+    pleasures = [bool(attrs.get("is_pleasure")) for attrs in rows]
+    with_reward = [
+        related is not None and reward
+        for related, reward in zip(related_habits, rewards)
+    ]
+    checks = [
+        (
+            RuntimeValidator.message,
+            [
+                runtime is not None and runtime > RuntimeValidator.max_runtime
+                for runtime in runtimes
+            ],
+        ),
+        (
+            PeriodicityValidator.message,
+            [
+                periodicity is not None
+                and periodicity > PeriodicityValidator.max_periodicity
+                for periodicity in periodicities
+            ],
+        ),
+        (RewardValidator.reward_message, with_reward),
+        (
+            RewardValidator.pleasure_message,
+            [
+                related is not None and not failed and not related.is_pleasure
+                for related, failed in zip(related_habits, with_reward)
+            ],
+        ),
+        (
+            RELATED_HABIT_OWNER_MESSAGE,
+            [
+                related is not None and related.user_id != user.pk
+                for related in related_habits
+            ],
+        ),
+        (
+            PleasantHabitValidator.message,
+            [
+                pleasure and (related is not None or reward)
+                for pleasure, related, reward in zip(pleasures, related_habits, rewards)
+            ],
+        ),
+    ]
+    errors = {}
+    for message, failed in checks:
+        for index in compress(range(len(rows)), failed):
+            errors.setdefault(index, []).append(message)
+    return errors
+
+
+class HabitImporter:
+    """
+    Потоковый импорт привычек пользователя пачками по chunk_size строк.
+
+    Поля каждой строки разбираются сериализатором импорта, связанные
+    привычки пачки загружаются одним запросом, правила habits.validators
+    и владелец связанной привычки проверяются по столбцам всей пачки,
+    корректные строки вставляются через bulk_create в отдельной транзакции
+    на пачку. Ошибки собираются по номерам строк исходного файла, в отчёт
+    попадают первые max_errors из них.
+    """
+
+    def __init__(
+        self, user, chunk_size=IMPORT_CHUNK_SIZE, max_errors=IMPORT_MAX_ERRORS
+    ):
+        self.user = user
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.tz = user.tzinfo
+        self.today = timezone.localdate(timezone=self.tz)
+        self.created = 0
+        self.errors = []
+        self.error_count = 0
+
+    def run(self, rows):
+        """
+        Импортирует строки вида (номер строки, данные).
+        """
+        rows = iter(rows)
+        while chunk := list(islice(rows, self.chunk_size)):
+            self.import_chunk(chunk)
+        return self
+
+    @property
+    def report(self):
+        return {
+            "created": self.created,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
+
+    def import_chunk(self, chunk):
+        items = [data for _, data in chunk]
+        serializer = HabitImportSerializer(
+            context={"related_habits": get_related_habits(items)}
+        )
+        parsed = []
+        errors = {}
+        for line_number, data in chunk:
+            if not isinstance(data, dict):
+                errors[line_number] = "Строка не является объектом привычки."
+                continue
+            try:
+                parsed.append((line_number, serializer.run_validation(data)))
+            except ValidationError as exc:
+                errors[line_number] = exc.detail
+
+        batch_errors = validate_batch([attrs for _, attrs in parsed], self.user)
+        habits = []
+        for index, (line_number, attrs) in enumerate(parsed):
+            if index in batch_errors:
+                errors[line_number] = batch_errors[index]
+                continue
+            habit = Habit(**attrs, user=self.user)
+            habit.schedule(self.today, self.tz)
+            habit.render_reminder()
+            habits.append(habit)
+        for line_number in sorted(errors):
+            self.add_error(line_number, errors[line_number])
+
+        with transaction.atomic():
+            Habit.objects.bulk_create(habits)
+            change_summary(self.user.pk, added=[habit.flags for habit in habits])
+            # Планировщику нужны только напоминания в пределах его горизонта
+            horizon = timezone.now() + timedelta(seconds=REMINDER_SCHEDULER_HORIZON)
+            notify_habits_changed(
+                [
+                    habit
+                    for habit in habits
+                    if not habit.is_pleasure and habit.next_run_at < horizon
+                ],
+                public=any(habit.is_public for habit in habits),
+            )
+        self.created += len(habits)
+
+    def add_error(self, line_number, errors):
+        self.error_count += 1
+        if len(self.errors) >= self.max_errors:
+            return
+        if not isinstance(errors, (list, dict)):
+            errors = [errors]
+        if isinstance(errors, list):
+            errors = {api_settings.NON_FIELD_ERRORS_KEY: errors}
+        self.errors.append({"line": line_number, "errors": errors})
@@ -0,0 +1,69 @@
+import time
+from datetime import timedelta
+
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from habits.models import Habit
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Сравнение создания привычек по одной и одним пакетным запросом.
+    Тестовые данные создаются в транзакции и откатываются после замера.
+    """
+
+    help = "Замер пакетного создания привычек против поштучного."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=200)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = User.objects.create(email=f"bench-{time.time_ns()}@example.com")
+            pleasant_habit = Habit.objects.create(
+                user=user,
+                place="дома",
+                start_at=timezone.now().time(),
+                action="выпить чай",
+                runtime=timedelta(minutes=1),
+                is_pleasure=True,
+            )
+            client = APIClient()
+            client.force_authenticate(user=user)
+            items = [
+                {
+                    "place": "дома",
+                    "start_at": "08:00",
+                    "action": f"сделать зарядку {i}",
+                    "runtime": "00:01:00",
+                    "related_habit": pleasant_habit.pk,
+                }
+                for i in range(options["items"])
+            ]
+
+            def single():
+                url = reverse("habits:habit-create")
+                for item in items:
+                    client.post(url, data=item, format="json")
+
+            def bulk():
+                url = reverse("habits:habit-bulk-create")
+                client.post(url, data=items, format="json")
+
+            for name, run in (("по одной", single), ("пакетом", bulk)):
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    run()
+                    elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{len(items)} привычек {name}: {len(queries)} запросов, "
+                    f"{elapsed * 1000:.1f} мс"
+                )
+
+            transaction.set_rollback(True)
@@ -0,0 +1,89 @@
+import time
+from datetime import timedelta
+from wsgiref.util import setup_testing_defaults
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import BaseCommand
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from habits.models import Habit
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Замер задержки запроса к API с постоянными соединениями с БД и без них.
+    Запросы проходят через WSGI-обработчик Django с полным циклом запроса,
+    в котором соединение закрывается по CONN_MAX_AGE. Тестовые данные
+    удаляются после замера.
+    """
+
+    help = "Замер задержки запросов с постоянными соединениями с БД и без них."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="/habits/")
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--max-age", type=int, default=600)
+
+    def handle(self, *args, **options):
+        user = User.objects.create(email=f"bench-{time.time_ns()}@example.com")
+        try:
+            Habit.objects.bulk_create(self.make_habit(user, i) for i in range(10))
+            token = AccessToken.for_user(user)
+            for name, max_age in (
+                ("без постоянных соединений", 0),
+                (f"CONN_MAX_AGE={options['max_age']}", options["max_age"]),
+            ):
+                self.report(name, max_age, token, options)
+        finally:
+            connection.close()
+            user.delete()
+
+    @staticmethod
+    def make_habit(user, i):
+        habit = Habit(
+            user=user,
+            place="дома",
+            start_at=timezone.now().time(),
+            action=f"сделать зарядку {i}",
+            runtime=timedelta(minutes=1),
+        )
+        habit.schedule(timezone.localdate())
+        return habit
+
+    def report(self, name, max_age, token, options):
+        connection.close()
+        connection.settings_dict["CONN_MAX_AGE"] = max_age
+        handler = WSGIHandler()
+        opened = []
+
+        def on_connection_created(**kwargs):
+            opened.append(kwargs["connection"])
+
+        connection_created.connect(on_connection_created)
+        timings = []
+        try:
+            for _ in range(options["requests"]):
+                environ = {
+                    "PATH_INFO": options["path"],
+                    "HTTP_AUTHORIZATION": f"Bearer {token}",
+                }
+                setup_testing_defaults(environ)
+                started = time.perf_counter()
+                response = handler(environ, lambda status, headers: None)
+                b"".join(response)
+                response.close()
+                timings.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise RuntimeError(f"Ответ {response.status_code}: {response}")
+        finally:
+            connection_created.disconnect(on_connection_created)
+        timings.sort()
+        self.stdout.write(
+            f"{name}: {len(opened)} соединений на {len(timings)} запросов, "
+            f"p50 {timings[len(timings) // 2] * 1000:.2f} мс, "
+            f"p99 {timings[int(len(timings) * 0.99)] * 1000:.2f} мс"
+        )
@@ -0,0 +1,84 @@
+import random
+import time
+from datetime import timedelta
+from itertools import islice
+
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from habits.models import Habit
+from habits.tasks import REMINDER_CHUNK_SIZE, get_due_habits
+from users.models import User
+from users.validators import get_timezones
+
+
+class Command(BaseCommand):
+    """
+    Замер отбора наступивших напоминаний на большом числе привычек
+    пользователей из разных часовых поясов. Тестовые данные создаются
+    в транзакции и откатываются после замера.
+    """
+
+    help = "Замер запроса наступивших напоминаний с учётом часовых поясов."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--habits", type=int, default=1_000_000)
+        parser.add_argument("--zones", type=int, default=400)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        zones = sorted(get_timezones())[: options["zones"]]
+
+        with transaction.atomic():
+            users = User.objects.bulk_create(
+                User(email=f"bench-{i}-{time.time_ns()}@example.com", timezone=zone)
+                for i, zone in enumerate(zones)
+            )
+            habits = (
+                self.make_habit(random.choice(users), now)
+                for _ in range(options["habits"])
+            )
+            while batch := list(islice(habits, REMINDER_CHUNK_SIZE)):
+                Habit.objects.bulk_create(batch)
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE habits_habit")
+
+            query = get_due_habits(now).values_list("pk", flat=True)
+            self.stdout.write(query.explain())
+
+            timings = []
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                due = len(query.all())
+                timings.append(time.perf_counter() - started)
+            timings.sort()
+            self.stdout.write(
+                f"{options['habits']} привычек, {len(zones)} часовых поясов: "
+                f"наступило {due}, медиана {timings[len(timings) // 2] * 1000:.1f} мс, "
+                f"максимум {timings[-1] * 1000:.1f} мс"
+            )
+
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def make_habit(user, now):
+        """
+        Создаёт привычку, напоминание о которой наступит в ближайшую неделю
+        (или наступило в последнюю минуту), как в рабочей базе между запусками.
+        """
+        run_at = timezone.localtime(
+            now + timedelta(seconds=random.randrange(-60, 7 * 24 * 3600)),
+            user.tzinfo,
+        )
+        habit = Habit(
+            user=user,
+            place="дома",
+            start_at=run_at.time(),
+            action="сделать зарядку",
+            runtime=timedelta(minutes=1),
+        )
+        habit.schedule(run_at.date(), user.tzinfo)
+        return habit
@@ -0,0 +1,150 @@
+import threading
+import time
+from datetime import timedelta
+from itertools import islice
+
+from asgiref.sync import async_to_sync
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.test import AsyncClient
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+
+from habits.models import Habit
+from habits.tasks import REMINDER_CHUNK_SIZE
+from habits.views import HabitExportAPIView
+from users.models import User
+
+
+def get_rss():
+    """
+    Возвращает текущий размер резидентной памяти процесса в байтах (Linux).
+    """
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * 4096
+
+
+class PeakRSS:
+    """
+    Отслеживает пиковую резидентную память процесса внутри блока with.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = self.start = 0
+        self.stopped = threading.Event()
+
+    def sample(self):
+        while not self.stopped.wait(self.interval):
+            self.peak = max(self.peak, get_rss())
+
+    def __enter__(self):
+        self.start = self.peak = get_rss()
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+        self.peak = max(self.peak, get_rss())
+
+    @property
+    def growth(self):
+        return (self.peak - self.start) / 1024 / 1024
+
+
+class Command(BaseCommand):
+    """
+    Замер потоковой выгрузки привычек под WSGI и ASGI: строк в секунду
+    и прирост пиковой резидентной памяти. Для сравнения те же строки
+    загружаются целиком.
+    Тестовые данные создаются в транзакции и откатываются после замера.
+    """
+
+    help = "Замер потоковой выгрузки привычек в NDJSON и CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--habits", type=int, default=200_000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = User.objects.create(
+                email=f"bench-{time.time_ns()}@example.com", is_superuser=True
+            )
+            habits = (self.make_habit(user, i) for i in range(options["habits"]))
+            while batch := list(islice(habits, REMINDER_CHUNK_SIZE)):
+                Habit.objects.bulk_create(batch)
+
+            for export_format in ("ndjson", "csv"):
+                for server, export in (("wsgi", self.export), ("asgi", export_asgi)):
+                    with PeakRSS() as rss:
+                        started = time.perf_counter()
+                        size, rows = export(user, export_format)
+                        elapsed = time.perf_counter() - started
+                    self.stdout.write(
+                        f"{export_format} ({server}): {rows} строк, "
+                        f"{size / 1024 / 1024:.1f} МБ, {rows / elapsed:.0f} строк/с, "
+                        f"прирост пиковой памяти {rss.growth:.1f} МБ"
+                    )
+
+            with PeakRSS() as rss:
+                started = time.perf_counter()
+                rows = list(Habit.objects.values())
+                elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"загрузка целиком: {len(rows)} строк, {len(rows) / elapsed:.0f} "
+                f"строк/с, прирост пиковой памяти {rss.growth:.1f} МБ"
+            )
+            del rows
+
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def export(user, export_format):
+        """
+        Выгружает привычки синхронным контроллером (WSGI).
+        Возвращает размер выгрузки в байтах и количество строк.
+        """
+        request = APIRequestFactory().get(
+            "/habits/export/", {"export_format": export_format}
+        )
+        force_authenticate(request, user=user)
+        response = HabitExportAPIView.as_view()(request)
+        size = rows = 0
+        for chunk in response.streaming_content:
+            size += len(chunk)
+            rows += chunk.count(b"\n")
+        return size, rows
+
+    @staticmethod
+    def make_habit(user, i):
+        habit = Habit(
+            user=user,
+            place="дома",
+            start_at=timezone.now().time(),
+            action=f"сделать зарядку {i}",
+            runtime=timedelta(minutes=1),
+        )
+        habit.schedule(timezone.localdate())
+        return habit
+
+
+@async_to_sync
+async def export_asgi(user, export_format):
+    """
+    Выгружает привычки через ASGI-обработчик Django.
+    Возвращает размер выгрузки в байтах и количество строк.
+    """
+    response = await AsyncClient().get(
+        reverse("habits:habit-export"),
+        {"export_format": export_format},
+        AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}",
+    )
+    size = rows = 0
+    async for chunk in response.streaming_content:
+        size += len(chunk)
+        rows += chunk.count(b"\n")
+    return size, rows
@@ -0,0 +1,213 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.core.management import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from habits.models import Habit
+from users.models import User
+
+SERVERS = {
+    "wsgi": ["config.wsgi:application", "--worker-class", "gthread"],
+    "asgi": [
+        "config.asgi:application",
+        "--worker-class",
+        "uvicorn_worker.UvicornWorker",
+    ],
+}
+
+
+class Command(BaseCommand):
+    """
+    Нагрузочный тест списков привычек: сравнивает число запросов в секунду
+    и задержки синхронного режима (gunicorn, WSGI) и асинхронного режима
+    (gunicorn с воркерами uvicorn, ASGI и асинхронные контроллеры)
+    при одновременных клиентах. Серверы запускаются с текущими настройками,
+    тестовые данные удаляются после замера. С --url нагружается
+    уже запущенный сервер.
+    """
+
+    help = "Нагрузочный тест API привычек в режимах WSGI и ASGI."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--mode", choices=["wsgi", "asgi", "both"], default="both")
+        parser.add_argument("--url", help="Адрес уже запущенного сервера")
+        parser.add_argument("--path", default="/habits/?page_size=10")
+        parser.add_argument("--habits", type=int, default=1000)
+        parser.add_argument("--clients", type=int, default=50)
+        parser.add_argument("--requests", type=int, default=5000)
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument("--threads", type=int, default=8)
+
+    def handle(self, *args, **options):
+        user = User.objects.create(email=f"bench-{time.time_ns()}@example.com")
+        try:
+            Habit.objects.bulk_create(
+                self.make_habit(user, i) for i in range(options["habits"])
+            )
+            headers = {"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+            if options["url"]:
+                self.report(options["url"], options["url"], headers, options)
+                return
+            modes = ["wsgi", "asgi"] if options["mode"] == "both" else [options["mode"]]
+            for mode in modes:
+                with self.serve(mode, options) as url:
+                    self.report(mode, url, headers, options)
+        finally:
+            user.delete()
+
+    @staticmethod
+    def make_habit(user, i):
+        habit = Habit(
+            user=user,
+            place="дома",
+            start_at=timezone.now().time(),
+            action=f"сделать зарядку {i}",
+            runtime=timedelta(minutes=1),
+            is_public=True,
+        )
+        habit.schedule(timezone.localdate())
+        return habit
+
+    def serve(self, mode, options):
+        """
+        Запускает сервер приложения в отдельном процессе.
+        """
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        env = {
+            **os.environ,
+            "API_ASYNC_VIEWS": str(mode == "asgi"),
+            "PYTHONPATH": os.pathsep.join(sys.path),
+        }
+        command = [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            *SERVERS[mode],
+            "--bind",
+            f"127.0.0.1:{port}",
+            "--workers",
+            str(options["workers"]),
+            "--threads",
+            str(options["threads"]),
+            "--log-level",
+            "warning",
+        ]
+        return Server(command, env, f"http://127.0.0.1:{port}")
+
+    def report(self, name, url, headers, options):
+        url = f"{url.rstrip('/')}{options['path']}"
+        started = time.perf_counter()
+        timings, errors = asyncio.run(
+            load(url, headers, options["clients"], options["requests"])
+        )
+        elapsed = time.perf_counter() - started
+        timings.sort()
+        p50 = timings[len(timings) // 2] * 1000 if timings else 0
+        p99 = timings[int(len(timings) * 0.99)] * 1000 if timings else 0
+        self.stdout.write(
+            f"{name}: {len(timings) / elapsed:.0f} запросов/с, "
+            f"p50 {p50:.1f} мс, p99 {p99:.1f} мс, ошибок {errors} "
+            f"({options['clients']} клиентов, {options['requests']} запросов)"
+        )
+
+
+class Server:
+    """
+    Процесс сервера приложения, доступный как контекстный менеджер.
+    """
+
+    def __init__(self, command, env, url):
+        self.command = command
+        self.env = env
+        self.url = url
+        self.process = None
+
+    def __enter__(self):
+        self.process = subprocess.Popen(self.command, env=self.env)
+        address = urlsplit(self.url)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection((address.hostname, address.port), 1).close()
+                return self.url
+            except OSError:
+                time.sleep(0.1)
+        self.__exit__()
+        raise RuntimeError(f"Сервер {self.url} не запустился.")
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        self.process.wait()
+
+
+async def load(url, headers, clients, total):
+    """
+    Выполняет total GET-запросов из clients одновременных соединений
+    с keep-alive. Возвращает времена ответов и число ошибок.
+    """
+    address = urlsplit(url)
+    path = f"{address.path}?{address.query}" if address.query else address.path
+    request = "".join(
+        [
+            f"GET {path} HTTP/1.1\r\nHost: {address.netloc}\r\n",
+            *(f"{name}: {value}\r\n" for name, value in headers.items()),
+            "\r\n",
+        ]
+    ).encode()
+    timings = []
+    errors = 0
+    remaining = total
+
+    async def client():
+        nonlocal remaining, errors
+        reader, writer = await asyncio.open_connection(address.hostname, address.port)
+        try:
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                writer.write(request)
+                status, close = await read_response(reader)
+                timings.append(time.perf_counter() - started)
+                if status != 200:
+                    errors += 1
+                if close:
+                    writer.close()
+                    reader, writer = await asyncio.open_connection(
+                        address.hostname, address.port
+                    )
+        finally:
+            writer.close()
+
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return timings, errors
+
+
+async def read_response(reader):
+    """
+    Читает HTTP-ответ. Возвращает код ответа и признак закрытия соединения.
+    """
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    elif headers.get("transfer-encoding") == "chunked":
+        while size := int((await reader.readline()).strip(), 16):
+            await reader.readexactly(size + 2)
+        await reader.readline()
+    return status, headers.get("connection", "").lower() == "close"
@@ -0,0 +1,73 @@
+import io
+import json
+import time
+
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from config.settings import IMPORT_CHUNK_SIZE
+from habits.imports import HabitImporter, parse_csv, parse_ndjson
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Замер импорта привычек из NDJSON и CSV: привычек в минуту на одном ядре.
+    Каждая сотая строка содержит ошибку и попадает в отчёт.
+    Тестовые данные создаются в транзакции и откатываются после замера.
+    """
+
+    help = "Замер потокового импорта привычек."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--habits", type=int, default=100_000)
+        parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        rows = [self.make_row(i) for i in range(options["habits"])]
+        files = {
+            "ndjson": (parse_ndjson, self.make_ndjson(rows)),
+            "csv": (parse_csv, self.make_csv(rows)),
+        }
+        for import_format, (parse, content) in files.items():
+            with transaction.atomic():
+                user = User.objects.create(email=f"bench-{time.time_ns()}@example.com")
+                importer = HabitImporter(
+                    user, chunk_size=options["chunk_size"], max_errors=0
+                )
+                started = time.perf_counter()
+                importer.run(parse(io.BytesIO(content)))
+                elapsed = time.perf_counter() - started
+                transaction.set_rollback(True)
+            self.stdout.write(
+                f"{import_format}: создано {importer.created}, "
+                f"ошибок {importer.error_count}, {elapsed:.2f} с, "
+                f"{importer.created / elapsed * 60:.0f} привычек/мин"
+            )
+
+    @staticmethod
+    def make_row(i):
+        return {
+            "place": "дома",
+            "start_at": "08:30",
+            "action": f"сделать зарядку {i}",
+            # Время выполнения больше 120 секунд не проходит проверку
+            "runtime": "00:05:00" if i % 100 == 0 else "00:01:00",
+            "periodicity": 1,
+            "reward": "чай",
+            "is_public": i % 2 == 0,
+        }
+
+    @staticmethod
+    def make_ndjson(rows):
+        return b"".join(
+            json.dumps(row, ensure_ascii=False).encode() + b"\n" for row in rows
+        )
+
+    @staticmethod
+    def make_csv(rows):
+        fields = list(rows[0])
+        lines = [",".join(fields)]
+        for row in rows:
+            lines.append(",".join(str(row[field]) for field in fields))
+        return "\n".join(lines).encode()
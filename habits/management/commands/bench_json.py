@@ -0,0 +1,78 @@
+import io
+import time
+from datetime import date
+from datetime import time as dt_time
+from datetime import timedelta
+
+from django.core.management import BaseCommand
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from config.parsers import ORJSONParser
+from config.renderers import ORJSONRenderer
+from habits.serializers import serialize_habit_rows
+
+
+class Command(BaseCommand):
+    """
+    Сравнение скорости рендеринга и разбора JSON стандартным модулем json
+    и orjson на списке привычек. База данных не используется.
+    """
+
+    help = "Замер JSON-рендерера и парсера на списке привычек."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--habits", type=int, default=10_000)
+        parser.add_argument("--repeat", type=int, default=10)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        rows = [
+            {
+                "id": i,
+                "user": i % 100 + 1,
+                "place": "дома",
+                "start_at": dt_time(8, i % 60),
+                "action": f"сделать зарядку {i}",
+                "periodicity": 1,
+                "is_pleasure": False,
+                "related_habit": None,
+                "reward": "выпить кофе",
+                "runtime": timedelta(seconds=90),
+                "is_public": True,
+                "execute_at": date.today(),
+                "next_run_at": now,
+            }
+            for i in range(1, options["habits"] + 1)
+        ]
+        data = {"count": len(rows), "results": serialize_habit_rows(rows)}
+
+        for name, renderer, parser in (
+            ("json", JSONRenderer(), JSONParser()),
+            ("orjson", ORJSONRenderer(), ORJSONParser()),
+        ):
+            content = renderer.render(data)
+            render = self.measure(lambda: renderer.render(data), options["repeat"])
+            parse = self.measure(
+                lambda: parser.parse(io.BytesIO(content)), options["repeat"]
+            )
+            size = len(content) / 1024 / 1024
+            self.stdout.write(
+                f"{name}: {len(rows)} привычек, {size:.1f} МБ; "
+                f"рендеринг {render * 1000:.1f} мс ({size / render:.0f} МБ/с), "
+                f"разбор {parse * 1000:.1f} мс ({size / parse:.0f} МБ/с)"
+            )
+
+    @staticmethod
+    def measure(func, repeat):
+        """
+        Возвращает медианное время вызова функции в секундах.
+        """
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        return timings[len(timings) // 2]
@@ -0,0 +1,85 @@
+import time
+from datetime import datetime, timedelta
+
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from habits.models import Habit
+from habits.services import SendResult
+from habits.tasks import (REMINDER_CHUNK_SIZE, chunked, drain_outbox,
+                          enqueue_reminders, get_due_habits)
+from users.models import User
+
+
+class NullSender:
+    """
+    Отправитель, который ничего не отправляет: замеряется только работа с БД.
+    """
+
+    def send_many(self, messages):
+        return [SendResult.SENT for _ in messages]
+
+
+class Command(BaseCommand):
+    """
+    Замер количества запросов и времени рассылки напоминаний
+    (постановка в outbox и его разбор).
+    Тестовые данные создаются в транзакции и откатываются после замера,
+    сообщения в Telegram не отправляются.
+    """
+
+    help = "Замер пакетной рассылки напоминаний на N просроченных привычках."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, nargs="+", default=[10_000, 100_000])
+
+    def handle(self, *args, **options):
+        for count in options["count"]:
+            queries, elapsed = self.run_once(count)
+            self.stdout.write(
+                f"{count} привычек: {queries} запросов, {elapsed:.2f} с "
+                f"({count / elapsed:.0f} привычек/с)"
+            )
+
+    def run_once(self, count):
+        with transaction.atomic():
+            now = timezone.now()
+            user = User.objects.create(
+                email=f"bench-{time.time_ns()}@example.com", tg_chat_id="0"
+            )
+            pleasant = Habit.objects.create(
+                user=user,
+                place="дома",
+                start_at=now.time(),
+                action="выпить чай",
+                runtime=timedelta(minutes=1),
+                is_pleasure=True,
+            )
+            habits = [
+                Habit(
+                    user=user,
+                    place="дома",
+                    start_at=datetime.min.time(),
+                    action=f"сделать зарядку {i}",
+                    runtime=timedelta(minutes=1),
+                    related_habit=pleasant if i % 2 else None,
+                    reward=None if i % 2 else "отдохнуть",
+                )
+                for i in range(count)
+            ]
+            for habit in habits:
+                habit.schedule(now.date(), user.tzinfo)
+            Habit.objects.bulk_create(habits, batch_size=REMINDER_CHUNK_SIZE)
+
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as ctx:
+                habits = get_due_habits(now).iterator(chunk_size=REMINDER_CHUNK_SIZE)
+                for chunk in chunked(habits, REMINDER_CHUNK_SIZE):
+                    enqueue_reminders(chunk, now)
+                drain_outbox(sender=NullSender())
+            elapsed = time.perf_counter() - started
+
+            transaction.set_rollback(True)
+        return len(ctx.captured_queries), elapsed
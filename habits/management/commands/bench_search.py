@@ -0,0 +1,115 @@
+import random
+import statistics
+import time
+from datetime import time as dt_time
+from datetime import timedelta
+from itertools import islice
+
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+from django.http import QueryDict
+from django.utils import timezone
+
+from habits.filters import PublicHabitFilter
+from habits.models import Habit
+from habits.paginators import CustomPagination
+from habits.tasks import REMINDER_CHUNK_SIZE
+from users.models import User
+
+ACTIONS = (
+    "делать зарядку",
+    "бегать",
+    "читать книгу",
+    "медитировать",
+    "пить воду",
+    "учить английский",
+    "гулять с собакой",
+    "планировать день",
+)
+PLACES = ("дома", "в парке", "в офисе", "на кухне", "в спортзале")
+REWARDS = (None, "съесть шоколадку", "посмотреть сериал", "выпить кофе")
+
+QUERIES = (
+    "search=зарядку",
+    "search=английский&is_pleasure=false",
+    "search=зарятка",
+    "search=шоколадку&periodicity__lte=3",
+    "is_pleasure=false&periodicity=2&start_at_after=08:00&start_at_before=09:00",
+    "start_at_after=21:00",
+)
+
+
+class Command(BaseCommand):
+    """
+    Замер поиска и фильтров публичных привычек: первая страница и количество
+    результатов на каждый запрос. Полнотекстовый и триграммный поиск
+    с индексами GIN работают только в PostgreSQL.
+    Тестовые данные создаются в транзакции и откатываются после замера.
+    """
+
+    help = "Замер поиска и фильтров публичных привычек."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--habits", type=int, default=1_000_000)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument(
+            "--explain", action="store_true", help="Вывести планы запросов."
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            self.stderr.write(
+                "Поиск без PostgreSQL выполняется полным перебором, "
+                "индексы GIN не используются."
+            )
+        random.seed(0)
+        with transaction.atomic():
+            user = User.objects.create(email=f"bench-{time.time_ns()}@example.com")
+            habits = (self.make_habit(user, i) for i in range(options["habits"]))
+            while batch := list(islice(habits, REMINDER_CHUNK_SIZE)):
+                Habit.objects.bulk_create(batch)
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE habits_habit")
+
+            for query in QUERIES:
+                queryset = self.get_queryset(query)
+                timings = []
+                for _ in range(options["repeat"]):
+                    started = time.perf_counter()
+                    count = queryset.count()
+                    list(queryset[: CustomPagination.page_size])
+                    timings.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(
+                    f"{query}: {count} привычек, "
+                    f"p50 {statistics.median(timings):.2f} мс, "
+                    f"max {max(timings):.2f} мс"
+                )
+                if options["explain"]:
+                    self.stdout.write(
+                        queryset[: CustomPagination.page_size].explain(analyze=True)
+                    )
+
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def get_queryset(query):
+        queryset = Habit.objects.filter(is_public=True).order_by("-id")
+        return PublicHabitFilter(QueryDict(query), queryset=queryset).qs
+
+    @staticmethod
+    def make_habit(user, i):
+        is_pleasure = i % 10 == 0
+        habit = Habit(
+            user=user,
+            place=random.choice(PLACES),
+            start_at=dt_time(random.randrange(6, 23), random.choice((0, 15, 30, 45))),
+            action=f"{random.choice(ACTIONS)} {i}",
+            runtime=timedelta(minutes=1),
+            periodicity=random.randint(1, 7),
+            is_pleasure=is_pleasure,
+            reward=None if is_pleasure else random.choice(REWARDS),
+            is_public=i % 4 != 0,
+        )
+        habit.schedule(timezone.localdate())
+        return habit
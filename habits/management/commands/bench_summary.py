@@ -0,0 +1,73 @@
+import statistics
+import time
+from datetime import timedelta
+from itertools import islice
+
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from habits.models import Habit
+from habits.summary import rebuild_summary
+from habits.tasks import REMINDER_CHUNK_SIZE
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Замер сводки привычек пользователя при разном количестве привычек
+    против сборки той же сводки клиентом по страницам списка.
+    Тестовые данные создаются в транзакции и откатываются после замера.
+    """
+
+    help = "Замер сводки привычек пользователя."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100_000])
+        parser.add_argument("--requests", type=int, default=200)
+
+    def handle(self, *args, **options):
+        for size in options["sizes"]:
+            with transaction.atomic():
+                user = User.objects.create(email=f"bench-{time.time_ns()}@example.com")
+                habits = (self.make_habit(user, i) for i in range(size))
+                while batch := list(islice(habits, REMINDER_CHUNK_SIZE)):
+                    Habit.objects.bulk_create(batch)
+                rebuild_summary(user.pk)
+
+                client = APIClient()
+                client.force_authenticate(user=user)
+                url = reverse("habits:habit-summary")
+                timings = []
+                for _ in range(options["requests"]):
+                    started = time.perf_counter()
+                    client.get(url)
+                    timings.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(
+                    f"{size} привычек: сводка p50 {statistics.median(timings):.2f} мс, "
+                    f"p95 {statistics.quantiles(timings, n=20)[-1]:.2f} мс"
+                )
+                if size <= 1000:
+                    started = time.perf_counter()
+                    next_url = f"{reverse('habits:habits')}?page_size=10"
+                    while next_url:
+                        next_url = client.get(next_url).json()["next"]
+                    elapsed = (time.perf_counter() - started) * 1000
+                    self.stdout.write(f"  обход списка клиентом: {elapsed:.1f} мс")
+                transaction.set_rollback(True)
+
+    @staticmethod
+    def make_habit(user, i):
+        habit = Habit(
+            user=user,
+            place="дома",
+            start_at=timezone.now().time(),
+            action=f"сделать зарядку {i}",
+            runtime=timedelta(minutes=1),
+            is_pleasure=i % 5 == 0,
+            is_public=i % 2 == 0,
+        )
+        habit.schedule(timezone.localdate() + timedelta(days=i % 7))
+        return habit
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management import BaseCommand
+
+from habits.fake_telegram import FakeTelegramServer
+from habits.services import TelegramSender
+
+
+class Command(BaseCommand):
+    """
+    Замер пропускной способности отправителя сообщений на локальном
+    имитаторе Telegram (сеть не используется).
+    """
+
+    help = "Замер пропускной способности отправки сообщений в Telegram."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=5000)
+        parser.add_argument("--chats", type=int, default=1000)
+        parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 32])
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.05,
+            help="Задержка ответа имитатора в секундах.",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=1_000_000,
+            help="Общий лимит сообщений в секунду (по умолчанию не ограничивает).",
+        )
+
+    def handle(self, *args, **options):
+        count = options["count"]
+        chats = options["chats"]
+        messages = [(str(i % chats), f"Сообщение {i}") for i in range(count)]
+
+        with FakeTelegramServer(latency=options["latency"]) as server:
+            for workers in options["workers"]:
+                sender = TelegramSender(
+                    base_url=server.url,
+                    token="bench",
+                    workers=workers,
+                    rate=options["rate"],
+                    chat_rate=1_000_000,
+                )
+                started = time.perf_counter()
+                sent = sum(map(bool, sender.send_many(messages)))
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"потоков: {workers}, отправлено {sent}/{count} "
+                    f"за {elapsed:.2f} с ({sent / elapsed:.0f} сообщений/с)"
+                )
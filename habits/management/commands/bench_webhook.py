@@ -0,0 +1,172 @@
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import time
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.core.management import BaseCommand
+from django.utils import timezone
+
+from habits.fake_telegram import FakeTelegramServer
+from habits.management.commands.bench_http import SERVERS, Server, read_response
+from habits.models import Habit
+from users.models import User
+
+WEBHOOK_PATH = "/habits/telegram/webhook/"
+WEBHOOK_SECRET = "bench-secret"
+
+
+class Command(BaseCommand):
+    """
+    Нагрузочный тест вебхука Telegram: поток нажатий кнопки «Выполнено»
+    с долей повторно доставленных обновлений отправляется на сервер
+    (gunicorn с воркерами uvicorn) из одновременных соединений.
+    Обновления строит локальный имитатор Telegram. Чтобы повторы
+    отбрасывались всеми воркерами, нужен общий кеш (REDIS_URL).
+    Тестовые данные удаляются после замера.
+    """
+
+    help = "Нагрузочный тест вебхука Telegram."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", help="Адрес уже запущенного сервера")
+        parser.add_argument("--habits", type=int, default=1000)
+        parser.add_argument("--updates", type=int, default=10000)
+        parser.add_argument(
+            "--duplicates",
+            type=float,
+            default=0.1,
+            help="Доля повторно доставленных обновлений.",
+        )
+        parser.add_argument("--clients", type=int, default=100)
+        parser.add_argument("--workers", type=int, default=2)
+
+    def handle(self, *args, **options):
+        chat_id = str(time.time_ns() % 10**9)
+        user = User.objects.create(
+            email=f"bench-{time.time_ns()}@example.com", tg_chat_id=chat_id
+        )
+        try:
+            habits = Habit.objects.bulk_create(
+                self.make_habit(user, i) for i in range(options["habits"])
+            )
+            bodies = self.make_updates(chat_id, habits, options)
+            if options["url"]:
+                self.report(options["url"], bodies, options)
+                return
+            with self.serve(options) as url:
+                self.report(url, bodies, options)
+        finally:
+            user.delete()
+
+    @staticmethod
+    def make_habit(user, i):
+        habit = Habit(
+            user=user,
+            place="дома",
+            start_at=timezone.now().time(),
+            action=f"сделать зарядку {i}",
+            runtime=timedelta(minutes=1),
+        )
+        habit.schedule(timezone.localdate())
+        return habit
+
+    @staticmethod
+    def make_updates(chat_id, habits, options):
+        """
+        Возвращает тела запросов вебхука: нажатия кнопки «Выполнено»
+        и повторы уже отправленных обновлений.
+        """
+        telegram = FakeTelegramServer()
+        try:
+            bodies = []
+            for i in range(options["updates"]):
+                if bodies and random.random() < options["duplicates"]:
+                    bodies.append(random.choice(bodies))
+                else:
+                    habit = habits[i % len(habits)]
+                    update = telegram.callback_update(chat_id, f"done:{habit.pk}")
+                    bodies.append(json.dumps(update).encode())
+            return bodies
+        finally:
+            telegram.server_close()
+
+    def serve(self, options):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        env = {
+            **os.environ,
+            "TELEGRAM_WEBHOOK_SECRET": WEBHOOK_SECRET,
+            "PYTHONPATH": os.pathsep.join(sys.path),
+        }
+        command = [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            *SERVERS["asgi"],
+            "--bind",
+            f"127.0.0.1:{port}",
+            "--workers",
+            str(options["workers"]),
+            "--log-level",
+            "warning",
+        ]
+        return Server(command, env, f"http://127.0.0.1:{port}")
+
+    def report(self, url, bodies, options):
+        started = time.perf_counter()
+        timings, errors = asyncio.run(load(url, bodies, options["clients"]))
+        elapsed = time.perf_counter() - started
+        timings.sort()
+        p50 = timings[len(timings) // 2] * 1000 if timings else 0
+        p99 = timings[int(len(timings) * 0.99)] * 1000 if timings else 0
+        self.stdout.write(
+            f"{len(timings) / elapsed:.0f} обновлений/с, "
+            f"p50 {p50:.1f} мс, p99 {p99:.1f} мс, ошибок {errors} "
+            f"({options['clients']} клиентов, {len(bodies)} обновлений)"
+        )
+
+
+async def load(url, bodies, clients):
+    """
+    Отправляет обновления POST-запросами на вебхук из clients одновременных
+    соединений с keep-alive. Возвращает времена ответов и число ошибок.
+    """
+    address = urlsplit(url)
+    head = (
+        f"POST {WEBHOOK_PATH} HTTP/1.1\r\nHost: {address.netloc}\r\n"
+        "Content-Type: application/json\r\n"
+        f"X-Telegram-Bot-Api-Secret-Token: {WEBHOOK_SECRET}\r\n"
+    )
+    queue = iter(bodies)
+    timings = []
+    errors = 0
+
+    async def client():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(address.hostname, address.port)
+        try:
+            for body in queue:
+                started = time.perf_counter()
+                writer.write(
+                    f"{head}Content-Length: {len(body)}\r\n\r\n".encode() + body
+                )
+                status, close = await read_response(reader)
+                timings.append(time.perf_counter() - started)
+                if status != 200:
+                    errors += 1
+                if close:
+                    writer.close()
+                    reader, writer = await asyncio.open_connection(
+                        address.hostname, address.port
+                    )
+        finally:
+            writer.close()
+
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return timings, errors
@@ -0,0 +1,60 @@
+import json
+import time
+from pathlib import Path
+
+from django.core.management import BaseCommand, CommandError
+
+from config.settings import IMPORT_CHUNK_SIZE
+from habits.imports import IMPORT_FORMATS, HabitImporter
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Импорт привычек пользователя из файла NDJSON или CSV.
+    Файл читается потоково, корректные строки вставляются пачками,
+    ошибки по номерам строк выводятся или записываются в файл NDJSON.
+    """
+
+    help = "Импорт привычек пользователя из файла NDJSON или CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", type=Path)
+        parser.add_argument("--user", required=True, help="Email пользователя.")
+        parser.add_argument(
+            "--format",
+            choices=IMPORT_FORMATS,
+            help="Формат файла, по умолчанию определяется по расширению.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+        parser.add_argument("--errors", type=Path, help="Файл для отчёта об ошибках.")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        import_format = options["format"] or path.suffix.lstrip(".").lower()
+        if import_format not in IMPORT_FORMATS:
+            raise CommandError(f"Не удалось определить формат файла {path}.")
+        try:
+            user = User.objects.get(email=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"Пользователь {options['user']} не найден.")
+
+        importer = HabitImporter(
+            user, chunk_size=options["chunk_size"], max_errors=float("inf")
+        )
+        started = time.perf_counter()
+        with path.open("rb") as stream:
+            importer.run(IMPORT_FORMATS[import_format](stream))
+        elapsed = time.perf_counter() - started
+
+        if options["errors"]:
+            with options["errors"].open("w") as report:
+                for error in importer.errors:
+                    report.write(json.dumps(error, ensure_ascii=False) + "\n")
+        else:
+            for error in importer.errors:
+                self.stderr.write(f"строка {error['line']}: {error['errors']}")
+        self.stdout.write(
+            f"Создано привычек: {importer.created}, ошибок: {importer.error_count}, "
+            f"{importer.created / elapsed * 60:.0f} привычек/мин"
+        )
@@ -0,0 +1,27 @@
+from django.core.management import BaseCommand
+from django.utils import timezone
+
+from habits.models import ReminderOutbox
+
+
+class Command(BaseCommand):
+    """
+    Возвращает недоставленные напоминания (исчерпавшие попытки отправки)
+    в очередь: счётчик попыток сбрасывается, напоминание доступно сразу.
+    """
+
+    help = "Повторная отправка недоставленных напоминаний."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "ids", type=int, nargs="*", help="ID напоминаний, по умолчанию - все."
+        )
+
+    def handle(self, *args, **options):
+        reminders = ReminderOutbox.objects.filter(failed_at__isnull=False)
+        if options["ids"]:
+            reminders = reminders.filter(pk__in=options["ids"])
+        count = reminders.update(
+            failed_at=None, attempts=0, available_at=timezone.now()
+        )
+        self.stdout.write(f"Возвращено в очередь напоминаний: {count}.")
@@ -0,0 +1,33 @@
+import threading
+
+from django.core.management import BaseCommand
+
+from config.settings import REDIS_URL
+from habits.scheduler import ReminderScheduler
+from habits.tasks import REMINDER_CHUNK_SIZE, chunked, send_habit_reminders
+
+
+class Command(BaseCommand):
+    """
+    Запуск планировщика напоминаний.
+    Ставит задачу отправки напоминаний в Celery точно ко времени начала привычки.
+    """
+
+    help = "Запуск планировщика напоминаний о привычках."
+
+    def handle(self, *args, **options):
+        scheduler = ReminderScheduler(dispatch=self.dispatch)
+        if REDIS_URL:
+            threading.Thread(target=scheduler.listen, daemon=True).start()
+        else:
+            self.stderr.write(
+                "REDIS_URL не задан: изменения привычек подхватываются только при сверке."
+            )
+        try:
+            scheduler.run()
+        except KeyboardInterrupt:
+            scheduler.stop()
+
+    def dispatch(self, habit_ids):
+        for chunk in chunked(habit_ids, REMINDER_CHUNK_SIZE):
+            send_habit_reminders.delay(chunk)
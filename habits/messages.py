@@ -0,0 +1,33 @@
+from functools import cache
+
+from django.conf import settings
+from django.utils import translation
+from django.utils.translation import gettext, gettext_noop
+
+# Шаблоны текста напоминания (исходные строки для переводов)
+HABIT_TEMPLATE = gettext_noop("Я буду {action} в {start_at} {place}.")
+REWARD_TEMPLATE = gettext_noop(" А сразу после этого могу {reward}.")
+
+
+@cache
+def get_reminder_templates():
+    """
+    Возвращает шаблоны напоминания (привычка, вознаграждение) на языке
+    проекта. Перевод выполняется один раз на процесс.
+    """
+    with translation.override(settings.LANGUAGE_CODE):
+        return gettext(HABIT_TEMPLATE).format, gettext(REWARD_TEMPLATE).format
+
+
+def render_reminder_text(habit):
+    """
+    Формирует собственный текст напоминания о привычке: действие, время,
+    место и вознаграждение. Текст связанной привычки не включается.
+    """
+    habit_template, reward_template = get_reminder_templates()
+    text = habit_template(
+        action=habit.action, start_at=habit.start_at, place=habit.place
+    )
+    if habit.reward:
+        text += reward_template(reward=habit.reward)
+    return text
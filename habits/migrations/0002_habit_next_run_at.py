@@ -0,0 +1,65 @@
+# Generated by Django 5.0.7 on 2026-10-18 13:17
+
+from datetime import datetime, timezone
+
+from django.db import migrations, models, transaction
+
+from config.db.operations import AddIndexConcurrentlyIfSupported
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_next_run_at(apps, schema_editor):
+    """
+    Заполняет время следующего напоминания у существующих привычек пачками,
+    каждая пачка - в отдельной транзакции.
+    """
+    Habit = apps.get_model("habits", "Habit")
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            habits = list(
+                Habit.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .only("pk", "start_at", "execute_at")[:BACKFILL_BATCH_SIZE]
+            )
+            if not habits:
+                break
+            for habit in habits:
+                habit.next_run_at = datetime.combine(
+                    habit.execute_at, habit.start_at, tzinfo=timezone.utc
+                )
+            Habit.objects.bulk_update(habits, ["next_run_at"])
+        last_pk = habits[-1].pk
+
+
+class Migration(migrations.Migration):
+    # Заполнение пачками в отдельных транзакциях, индекс строится CONCURRENTLY
+    atomic = False
+
+    dependencies = [
+        ("habits", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="habit",
+            name="next_run_at",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                help_text="Вычисляется из даты выполнения и времени начала.",
+                null=True,
+                verbose_name="Время следующего напоминания",
+            ),
+        ),
+        migrations.RunPython(backfill_next_run_at, migrations.RunPython.noop),
+        AddIndexConcurrentlyIfSupported(
+            model_name="habit",
+            index=models.Index(
+                condition=models.Q(("is_pleasure", False)),
+                fields=["next_run_at"],
+                name="habit_due_idx",
+            ),
+        ),
+    ]
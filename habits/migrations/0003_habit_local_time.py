@@ -0,0 +1,29 @@
+# Generated by Django 5.0.7 on 2026-10-18 13:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0002_habit_next_run_at"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="habit",
+            name="execute_at",
+            field=models.DateField(editable=False, verbose_name="Дата выполнения"),
+        ),
+        migrations.AlterField(
+            model_name="habit",
+            name="next_run_at",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                help_text="Вычисляется из даты выполнения и времени начала в часовом поясе пользователя.",
+                null=True,
+                verbose_name="Время следующего напоминания",
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.7 on 2026-10-18 13:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+from config.db.operations import AddIndexConcurrentlyIfSupported
+
+
+class Migration(migrations.Migration):
+    # Индексы строятся CONCURRENTLY, вне транзакции
+    atomic = False
+
+    dependencies = [
+        ("habits", "0004_reminder_outbox"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfSupported(
+            model_name="habit",
+            index=models.Index(fields=["user", "-id"], name="habit_user_idx"),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name="habit",
+            index=models.Index(
+                condition=models.Q(("is_public", True)),
+                fields=["-id"],
+                name="habit_public_idx",
+            ),
+        ),
+    ]
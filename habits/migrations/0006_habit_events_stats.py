@@ -0,0 +1,114 @@
+# Generated by Django 5.0.7 on 2026-10-18 13:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0005_habit_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HabitStats",
+            fields=[
+                (
+                    "habit",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to="habits.habit",
+                        verbose_name="Привычка",
+                    ),
+                ),
+                (
+                    "due_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Наступивших сроков выполнения"
+                    ),
+                ),
+                (
+                    "done_count",
+                    models.PositiveIntegerField(default=0, verbose_name="Выполнений"),
+                ),
+                (
+                    "current_streak",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Выполнения подряд без пропуска срока выполнения.",
+                        verbose_name="Текущая серия",
+                    ),
+                ),
+                (
+                    "best_streak",
+                    models.PositiveIntegerField(default=0, verbose_name="Лучшая серия"),
+                ),
+                (
+                    "last_done_on",
+                    models.DateField(
+                        blank=True, null=True, verbose_name="Последнее выполнение"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Статистика привычки",
+                "verbose_name_plural": "Статистика привычек",
+            },
+        ),
+        migrations.CreateModel(
+            name="HabitEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("due", "Срок выполнения"), ("done", "Выполнение")],
+                        max_length=10,
+                        verbose_name="Тип события",
+                    ),
+                ),
+                (
+                    "date",
+                    models.DateField(
+                        help_text="Дата выполнения привычки в часовом поясе пользователя.",
+                        verbose_name="Дата выполнения",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Создано"),
+                ),
+                (
+                    "habit",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="events",
+                        to="habits.habit",
+                        verbose_name="Привычка",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Событие привычки",
+                "verbose_name_plural": "События привычек",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="habitevent",
+            constraint=models.UniqueConstraint(
+                fields=("habit", "date", "kind"), name="habit_event_unique"
+            ),
+        ),
+    ]
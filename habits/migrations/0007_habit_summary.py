@@ -0,0 +1,61 @@
+# Generated by Django 5.0.7 on 2026-10-18 13:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from config.db.operations import AddIndexConcurrentlyIfSupported
+
+
+class Migration(migrations.Migration):
+    # Индексы строятся CONCURRENTLY, вне транзакции
+    atomic = False
+
+    dependencies = [
+        ("habits", "0006_habit_events_stats"),
+        ("users", "0002_user_timezone"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HabitSummary",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="habit_summary",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+                (
+                    "useful_count",
+                    models.IntegerField(default=0, verbose_name="Полезных привычек"),
+                ),
+                (
+                    "pleasant_count",
+                    models.IntegerField(default=0, verbose_name="Приятных привычек"),
+                ),
+                (
+                    "public_count",
+                    models.IntegerField(default=0, verbose_name="Публичных привычек"),
+                ),
+            ],
+            options={
+                "verbose_name": "Сводка привычек",
+                "verbose_name_plural": "Сводки привычек",
+            },
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name="habit",
+            index=models.Index(
+                condition=models.Q(("is_pleasure", False)),
+                fields=["user", "next_run_at"],
+                name="habit_user_due_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.7 on 2026-10-18 13:55
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+from config.db.operations import (AddIndexConcurrentlyIfSupported,
+                                  AddPostgreSQLIndexConcurrently)
+
+
+class Migration(migrations.Migration):
+    # Индексы строятся CONCURRENTLY, вне транзакции
+    atomic = False
+
+    dependencies = [
+        ("habits", "0007_habit_summary"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrentlyIfSupported(
+            model_name="habit",
+            index=models.Index(
+                condition=models.Q(("is_public", True)),
+                fields=["is_pleasure", "periodicity", "start_at"],
+                name="habit_public_filter_idx",
+            ),
+        ),
+        AddPostgreSQLIndexConcurrently(
+            model_name="habit",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.search.SearchVector(
+                    "action", "place", "reward", config="russian"
+                ),
+                condition=models.Q(("is_public", True)),
+                name="habit_search_idx",
+            ),
+        ),
+        AddPostgreSQLIndexConcurrently(
+            model_name="habit",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass("action", name="gin_trgm_ops"),
+                condition=models.Q(("is_public", True)),
+                name="habit_action_trgm_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.7 on 2026-10-18 13:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0008_public_habit_search"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="reminderoutbox",
+            name="habit",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Не заполняется у сводного напоминания о нескольких привычках.",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="habits.habit",
+                verbose_name="Привычка",
+            ),
+        ),
+    ]
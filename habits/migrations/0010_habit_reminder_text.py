@@ -0,0 +1,67 @@
+# Generated by Django 5.0.7 on 2026-10-18 14:01
+
+from django.db import migrations, models, transaction
+
+BACKFILL_BATCH_SIZE = 1000
+
+# Копия шаблонов habits.messages на момент миграции: миграция не должна
+# зависеть от текущего кода приложения
+HABIT_TEMPLATE = "Я буду {action} в {start_at} {place}."
+REWARD_TEMPLATE = " А сразу после этого могу {reward}."
+
+
+def render_reminder_text(habit):
+    text = HABIT_TEMPLATE.format(
+        action=habit.action, start_at=habit.start_at, place=habit.place
+    )
+    if habit.reward:
+        text += REWARD_TEMPLATE.format(reward=habit.reward)
+    return text
+
+
+def backfill_reminder_text(apps, schema_editor):
+    """
+    Заполняет текст напоминания у существующих привычек пачками,
+    каждая пачка - в отдельной транзакции.
+    """
+    Habit = apps.get_model("habits", "Habit")
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            habits = list(
+                Habit.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .only("pk", "action", "start_at", "place", "reward")[
+                    :BACKFILL_BATCH_SIZE
+                ]
+            )
+            if not habits:
+                break
+            for habit in habits:
+                habit.reminder_text = render_reminder_text(habit)
+            Habit.objects.bulk_update(habits, ["reminder_text"])
+        last_pk = habits[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("habits", "0009_reminder_outbox_digest"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="habit",
+            name="reminder_text",
+            field=models.TextField(
+                blank=True,
+                null=True,
+                editable=False,
+                help_text="Собственный текст напоминания без связанной привычки. Пересчитывается при сохранении привычки.",
+                verbose_name="Текст напоминания",
+            ),
+        ),
+        migrations.RunPython(backfill_reminder_text, migrations.RunPython.noop),
+    ]
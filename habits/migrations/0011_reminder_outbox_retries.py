@@ -0,0 +1,50 @@
+# Generated by Django 5.0.7 on 2026-10-18 14:16
+
+from django.db import migrations, models
+
+from config.db.operations import (AddIndexConcurrentlyIfSupported,
+                                  RemoveIndexConcurrentlyIfSupported)
+
+
+class Migration(migrations.Migration):
+    # Индексы пересоздаются CONCURRENTLY, вне транзакции
+    atomic = False
+
+    dependencies = [
+        ("habits", "0010_habit_reminder_text"),
+    ]
+
+    operations = [
+        RemoveIndexConcurrentlyIfSupported(
+            model_name="reminderoutbox",
+            name="outbox_pending_idx",
+        ),
+        migrations.AddField(
+            model_name="reminderoutbox",
+            name="failed_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Время переноса в недоставленные после исчерпания попыток отправки.",
+                null=True,
+                verbose_name="Не доставлено",
+            ),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name="reminderoutbox",
+            index=models.Index(
+                condition=models.Q(
+                    ("delivered_at__isnull", True), ("failed_at__isnull", True)
+                ),
+                fields=["available_at"],
+                name="outbox_pending_idx",
+            ),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name="reminderoutbox",
+            index=models.Index(
+                condition=models.Q(("failed_at__isnull", False)),
+                fields=["failed_at"],
+                name="outbox_failed_idx",
+            ),
+        ),
+    ]
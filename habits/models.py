@@ -1,7 +1,20 @@
+from datetime import datetime, timedelta
+
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector
 from django.db import models
+from django.utils import timezone
 
+from habits.messages import render_reminder_text
 from users.models import NULLABLE
 
+# Конфигурация полнотекстового поиска PostgreSQL и поисковый вектор привычки.
+# Запрос поиска использует то же выражение, что и индекс habit_search_idx
+HABIT_SEARCH_CONFIG = "russian"
+HABIT_SEARCH_VECTOR = SearchVector(
+    "action", "place", "reward", config=HABIT_SEARCH_CONFIG
+)
+
 
 class Habit(models.Model):
     """
@@ -28,12 +41,323 @@ class Habit(models.Model):
     reward = models.CharField(max_length=250, **NULLABLE, verbose_name="Вознаграждение")
     runtime = models.DurationField(verbose_name="Время на выполнение")
     is_public = models.BooleanField(default=False, verbose_name="Признак публичности")
-    execute_at = models.DateField(auto_now_add=True, verbose_name="Дата выполнения")
+    execute_at = models.DateField(editable=False, verbose_name="Дата выполнения")
+    next_run_at = models.DateTimeField(
+        **NULLABLE,
+        editable=False,
+        verbose_name="Время следующего напоминания",
+        help_text="Вычисляется из даты выполнения и времени начала "
+        "в часовом поясе пользователя.",
+    )
+    reminder_text = models.TextField(
+        **NULLABLE,
+        editable=False,
+        verbose_name="Текст напоминания",
+        help_text="Собственный текст напоминания без связанной привычки. "
+        "Пересчитывается при сохранении привычки.",
+    )
 
     class Meta:
         verbose_name = "Привычка"
         verbose_name_plural = "Привычки"
+        indexes = [
+            # Очередь напоминаний: отбор наступивших полезных привычек по индексу
+            models.Index(
+                fields=["next_run_at"],
+                condition=models.Q(is_pleasure=False),
+                name="habit_due_idx",
+            ),
+            # Курсорная пагинация списков привычек пользователя и публичных привычек
+            models.Index(fields=["user", "-id"], name="habit_user_idx"),
+            # Сводка пользователя: ближайшее напоминание и привычки на сегодня
+            models.Index(
+                fields=["user", "next_run_at"],
+                condition=models.Q(is_pleasure=False),
+                name="habit_user_due_idx",
+            ),
+            models.Index(
+                fields=["-id"],
+                condition=models.Q(is_public=True),
+                name="habit_public_idx",
+            ),
+            # Фильтры публичных привычек: признак приятной привычки,
+            # периодичность и диапазон времени начала
+            models.Index(
+                fields=["is_pleasure", "periodicity", "start_at"],
+                condition=models.Q(is_public=True),
+                name="habit_public_filter_idx",
+            ),
+            # Поиск по публичным привычкам (только PostgreSQL): полнотекстовый
+            # по действию, месту и вознаграждению и триграммный по действию
+            GinIndex(
+                HABIT_SEARCH_VECTOR,
+                condition=models.Q(is_public=True),
+                name="habit_search_idx",
+            ),
+            GinIndex(
+                OpClass("action", name="gin_trgm_ops"),
+                condition=models.Q(is_public=True),
+                name="habit_action_trgm_idx",
+            ),
+        ]
+
+    _loaded_flags = None
 
     def __str__(self):
         return f"Я буду {self.action} в {self.start_at} {self.place}."
-    
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запоминаем загруженные признаки, чтобы пересчитать сводку пользователя
+        instance._loaded_flags = instance.flags
+        return instance
+
+    @property
+    def flags(self):
+        """
+        Признаки привычки, по которым считается сводка пользователя:
+        (приятная, публичная). Для незагруженного (отложенного) поля - None.
+        """
+        return self.__dict__.get("is_pleasure"), self.__dict__.get("is_public")
+
+    def get_next_run_at(self, tz=None):
+        """
+        Возвращает время следующего напоминания о привычке: дата выполнения
+        и время начала в часовом поясе tz (по умолчанию - пользователя).
+        """
+        tz = tz or self.user.tzinfo
+        return datetime.combine(self.execute_at, self.start_at, tzinfo=tz)
+
+    def schedule(self, execute_at, tz=None):
+        """
+        Назначает дату следующего выполнения и пересчитывает время напоминания.
+        """
+        self.execute_at = execute_at
+        self.next_run_at = self.get_next_run_at(tz)
+
+    def render_reminder(self):
+        """
+        Пересчитывает закешированный текст напоминания о привычке.
+        """
+        self.reminder_text = render_reminder_text(self)
+
+    def get_reminder_message(self):
+        """
+        Возвращает текст напоминания о привычке: собственный текст и,
+        если нет вознаграждения, текст связанной привычки. Текст связанной
+        привычки берётся из её строки, поэтому изменение связанной привычки
+        не требует пересчёта зависящих от неё привычек.
+        """
+        message = self.reminder_text or render_reminder_text(self)
+        if not self.reward and self.related_habit:
+            related_habit = self.related_habit
+            related_text = related_habit.reminder_text or render_reminder_text(
+                related_habit
+            )
+            message += f" {related_text}"
+        return message
+
+    def save(self, *args, **kwargs):
+        tz = self.user.tzinfo
+        if self.execute_at is None:
+            self.execute_at = timezone.localdate(timezone=tz)
+        self.schedule(self.execute_at, tz)
+        self.render_reminder()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if {"start_at", "execute_at"} & update_fields:
+                update_fields.add("next_run_at")
+            if {"action", "start_at", "place", "reward"} & update_fields:
+                update_fields.add("reminder_text")
+            kwargs["update_fields"] = update_fields
+        super().save(*args, **kwargs)
+
+
+class HabitEvent(models.Model):
+    """
+    Модель события привычки: наступление срока выполнения (записывается
+    при постановке напоминания) или отметка о выполнении.
+    """
+
+    DUE = "due"
+    DONE = "done"
+    KINDS = [
+        (DUE, "Срок выполнения"),
+        (DONE, "Выполнение"),
+    ]
+
+    habit = models.ForeignKey(
+        Habit, on_delete=models.CASCADE, related_name="events", verbose_name="Привычка"
+    )
+    kind = models.CharField(max_length=10, choices=KINDS, verbose_name="Тип события")
+    date = models.DateField(
+        verbose_name="Дата выполнения",
+        help_text="Дата выполнения привычки в часовом поясе пользователя.",
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создано")
+
+    class Meta:
+        verbose_name = "Событие привычки"
+        verbose_name_plural = "События привычек"
+        constraints = [
+            # Одно событие каждого типа на дату выполнения привычки
+            models.UniqueConstraint(
+                fields=["habit", "date", "kind"], name="habit_event_unique"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.habit_id}: {self.get_kind_display()} {self.date}"
+
+
+class HabitStats(models.Model):
+    """
+    Модель статистики привычки. Обновляется инкрементально при записи
+    событий, поэтому чтение не зависит от длины истории выполнений.
+    """
+
+    habit = models.OneToOneField(
+        Habit,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+        verbose_name="Привычка",
+    )
+    due_count = models.PositiveIntegerField(
+        default=0, verbose_name="Наступивших сроков выполнения"
+    )
+    done_count = models.PositiveIntegerField(default=0, verbose_name="Выполнений")
+    current_streak = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Текущая серия",
+        help_text="Выполнения подряд без пропуска срока выполнения.",
+    )
+    best_streak = models.PositiveIntegerField(default=0, verbose_name="Лучшая серия")
+    last_done_on = models.DateField(**NULLABLE, verbose_name="Последнее выполнение")
+
+    class Meta:
+        verbose_name = "Статистика привычки"
+        verbose_name_plural = "Статистика привычек"
+
+    def __str__(self):
+        return f"{self.habit_id}: {self.done_count}/{self.due_count}"
+
+    def add_done(self, done_on, periodicity):
+        """
+        Учитывает выполнение привычки в дату done_on: серия продолжается,
+        если с предыдущего выполнения прошло не больше periodicity дней.
+        Выполнения задним числом не меняют серию.
+        """
+        self.done_count += 1
+        if self.last_done_on is None:
+            self.current_streak = 1
+        elif done_on <= self.last_done_on:
+            return
+        elif done_on - self.last_done_on <= timedelta(days=periodicity):
+            self.current_streak += 1
+        else:
+            self.current_streak = 1
+        self.best_streak = max(self.best_streak, self.current_streak)
+        self.last_done_on = done_on
+
+    def get_current_streak(self, today):
+        """
+        Возвращает текущую серию на дату today: серия прерывается,
+        если следующий срок выполнения после последнего выполнения пропущен.
+        """
+        if self.last_done_on is None or today - self.last_done_on > timedelta(
+            days=self.habit.periodicity
+        ):
+            return 0
+        return self.current_streak
+
+    @property
+    def completion_rate(self):
+        """
+        Доля выполнений от наступивших сроков выполнения.
+        """
+        if not self.due_count:
+            return None
+        return min(1.0, self.done_count / self.due_count)
+
+
+class HabitSummary(models.Model):
+    """
+    Модель сводки привычек пользователя для дашборда. Счётчики обновляются
+    инкрементально при изменении привычек (habits.summary).
+    """
+
+    user = models.OneToOneField(
+        "users.User",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="habit_summary",
+        verbose_name="Пользователь",
+    )
+    useful_count = models.IntegerField(default=0, verbose_name="Полезных привычек")
+    pleasant_count = models.IntegerField(default=0, verbose_name="Приятных привычек")
+    public_count = models.IntegerField(default=0, verbose_name="Публичных привычек")
+
+    class Meta:
+        verbose_name = "Сводка привычек"
+        verbose_name_plural = "Сводки привычек"
+
+    def __str__(self):
+        return f"{self.user_id}: {self.useful_count}/{self.pleasant_count}"
+
+
+class ReminderOutbox(models.Model):
+    """
+    Модель исходящего напоминания (transactional outbox).
+    Запись создаётся в одной транзакции со сдвигом даты выполнения привычки
+    и доставляется в Telegram отдельным обработчиком.
+    """
+
+    habit = models.ForeignKey(
+        Habit,
+        on_delete=models.CASCADE,
+        **NULLABLE,
+        verbose_name="Привычка",
+        help_text="Не заполняется у сводного напоминания о нескольких привычках.",
+    )
+    chat_id = models.CharField(max_length=100, verbose_name="ID чата в Telegram")
+    text = models.TextField(verbose_name="Текст напоминания")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создано")
+    available_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="Доступно для отправки с",
+        help_text="Обработчик, забравший запись, сдвигает это время на срок аренды.",
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name="Попытки отправки"
+    )
+    delivered_at = models.DateTimeField(**NULLABLE, verbose_name="Доставлено")
+    failed_at = models.DateTimeField(
+        **NULLABLE,
+        verbose_name="Не доставлено",
+        help_text="Время переноса в недоставленные после исчерпания попыток отправки.",
+    )
+
+    class Meta:
+        verbose_name = "Исходящее напоминание"
+        verbose_name_plural = "Исходящие напоминания"
+        indexes = [
+            # Очередь напоминаний к отправке: доставка, повторы и отложенные
+            # напоминания в порядке времени, с которого они доступны
+            models.Index(
+                fields=["available_at"],
+                condition=models.Q(delivered_at__isnull=True, failed_at__isnull=True),
+                name="outbox_pending_idx",
+            ),
+            # Недоставленные напоминания (dead letter)
+            models.Index(
+                fields=["failed_at"],
+                condition=models.Q(failed_at__isnull=False),
+                name="outbox_failed_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.chat_id}: {self.text}"
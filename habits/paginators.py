@@ -1,7 +1,57 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CustomCursorPagination(CursorPagination):
+    """
+    Курсорная (keyset) пагинация по первичному ключу: без OFFSET и COUNT,
+    время получения любой страницы не зависит от её номера.
+    """
+
+    page_size = 5
+    page_size_query_param = "page_size"
+    max_page_size = 10
+    ordering = "-id"
 
 
 class CustomPagination(PageNumberPagination):
+    """
+    Постраничная пагинация. Параметр pagination=cursor (или переданный курсор)
+    переключает запрос на курсорную пагинацию. Курсорная пагинация
+    упорядочивает строки по id, поэтому с параметрами, задающими свой
+    порядок (поиск по релевантности), она не допускается - ошибка 400.
+    """
+
     page_size = 5
     page_size_query_param = "page_size"
     max_page_size = 10
+    mode_query_param = "pagination"
+    ordering_query_params = ("search",)
+    cursor_paginator = None
+
+    def is_cursor_mode(self, request):
+        cursor_mode = (
+            request.query_params.get(self.mode_query_param) == "cursor"
+            or CustomCursorPagination.cursor_query_param in request.query_params
+        )
+        if cursor_mode and any(
+            request.query_params.get(param) for param in self.ordering_query_params
+        ):
+            raise ValidationError(
+                {
+                    self.mode_query_param: "Результаты поиска упорядочены "
+                    "по релевантности и доступны только постранично."
+                }
+            )
+        return cursor_mode
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.is_cursor_mode(request):
+            self.cursor_paginator = CustomCursorPagination()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,191 @@
+import heapq
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+import redis
+from django.db import close_old_connections
+from django.utils import timezone
+
+from config.settings import (REDIS_URL, REMINDER_SCHEDULER_CHANNEL,
+                             REMINDER_SCHEDULER_HORIZON)
+from habits.models import Habit
+from habits.services import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class ReminderScheduler:
+    """
+    Планировщик напоминаний на основе кучи.
+
+    Хранит пары (время напоминания, id привычки) для привычек, напоминание
+    о которых наступит в пределах горизонта, и передаёт их в dispatch точно
+    ко времени напоминания. Устаревшие записи кучи не удаляются сразу,
+    а пропускаются при извлечении.
+    """
+
+    def __init__(self, dispatch, horizon=REMINDER_SCHEDULER_HORIZON):
+        self.dispatch = dispatch
+        self.horizon = timedelta(seconds=horizon)
+        self.heap = []
+        self.entries = {}
+        self.loaded_until = None
+        self.condition = threading.Condition()
+        self.stopped = threading.Event()
+
+    def load(self, now=None):
+        """
+        Загружает из БД привычки, напоминание о которых наступит до конца горизонта.
+        Отбор идёт по индексу habit_due_idx, вся таблица не просматривается.
+        """
+        now = now or timezone.now()
+        until = now + self.horizon
+        rows = Habit.objects.filter(is_pleasure=False, next_run_at__lt=until)
+        entries = dict(rows.values_list("pk", "next_run_at"))
+        with self.condition:
+            self.entries = entries
+            self.heap = [(run_at, habit_id) for habit_id, run_at in entries.items()]
+            heapq.heapify(self.heap)
+            self.loaded_until = until
+            self.condition.notify()
+        return len(entries)
+
+    def schedule(self, habit_id, run_at):
+        """
+        Добавляет или переносит напоминание о привычке.
+        """
+        with self.condition:
+            if run_at is None or (
+                self.loaded_until is not None and run_at >= self.loaded_until
+            ):
+                # Напоминание за горизонтом будет загружено при следующей сверке
+                self.entries.pop(habit_id, None)
+                return
+            self.entries[habit_id] = run_at
+            heapq.heappush(self.heap, (run_at, habit_id))
+            self.condition.notify()
+
+    def cancel(self, habit_id):
+        """
+        Отменяет напоминание о привычке.
+        """
+        with self.condition:
+            self.entries.pop(habit_id, None)
+
+    def pop_due(self, now):
+        """
+        Извлекает идентификаторы привычек, время напоминания о которых наступило.
+        """
+        due = []
+        with self.condition:
+            while self.heap and self.heap[0][0] <= now:
+                run_at, habit_id = heapq.heappop(self.heap)
+                if self.entries.get(habit_id) == run_at:
+                    del self.entries[habit_id]
+                    due.append(habit_id)
+        return due
+
+    def wait(self):
+        """
+        Ожидает ближайшего напоминания, изменения расписания или остановки.
+        """
+        with self.condition:
+            timeout = self.horizon.total_seconds()
+            if self.heap:
+                timeout = (self.heap[0][0] - timezone.now()).total_seconds()
+            if timeout > 0:
+                self.condition.wait(timeout)
+
+    def run(self, reconcile_interval=None):
+        """
+        Основной цикл: отправляет наступившие напоминания и периодически
+        сверяет расписание с БД.
+        """
+        reconcile_interval = reconcile_interval or self.horizon / 2
+        reconcile_at = timezone.now()
+        while not self.stopped.is_set():
+            now = timezone.now()
+            if now >= reconcile_at:
+                # Как в начале HTTP-запроса: закрываем соединение с БД,
+                # если оно устарело (CONN_MAX_AGE) или не прошло проверку
+                close_old_connections()
+                self.load(now)
+                reconcile_at = now + reconcile_interval
+            due = self.pop_due(now)
+            if due:
+                self.dispatch(due)
+            self.wait()
+
+    def stop(self):
+        self.stopped.set()
+        with self.condition:
+            self.condition.notify()
+
+    def apply_message(self, message):
+        """
+        Применяет к расписанию сообщение об изменении привычки.
+        """
+        data = json.loads(message)
+        if data["next_run_at"] is None:
+            self.cancel(data["id"])
+        else:
+            self.schedule(data["id"], datetime.fromisoformat(data["next_run_at"]))
+
+    def listen(self):
+        """
+        Применяет изменения привычек, опубликованные в канале Redis.
+        Изменения, пропущенные при обрыве соединения, подхватит сверка с БД.
+        """
+        while not self.stopped.is_set():
+            pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(REMINDER_SCHEDULER_CHANNEL)
+                while not self.stopped.is_set():
+                    message = pubsub.get_message(timeout=1)
+                    if message:
+                        self.apply_message(message["data"])
+            except redis.ConnectionError:
+                time.sleep(1)
+            finally:
+                pubsub.close()
+
+
+def publish_habit_changes(changes):
+    """
+    Публикует изменения времени напоминаний о привычках для планировщика:
+    пары (id привычки, время напоминания) одним обращением к Redis.
+    Время None означает, что напоминание нужно отменить.
+    Вызывается после фиксации транзакции, поэтому сбой Redis не должен
+    превращаться в ошибку уже выполненного запроса: пропущенное изменение
+    подхватит периодическая сверка (send_habit_reminder).
+    """
+    if not REDIS_URL or not changes:
+        return
+    pipeline = get_redis().pipeline(transaction=False)
+    for habit_id, next_run_at in changes:
+        message = json.dumps(
+            {
+                "id": habit_id,
+                "next_run_at": next_run_at and next_run_at.isoformat(),
+            }
+        )
+        pipeline.publish(REMINDER_SCHEDULER_CHANNEL, message)
+    try:
+        pipeline.execute()
+    except redis.RedisError:
+        logger.warning(
+            "Не удалось опубликовать изменения напоминаний: %s",
+            len(changes),
+            exc_info=True,
+        )
+
+
+def publish_habit_change(habit_id, next_run_at):
+    """
+    Публикует изменение времени напоминания о привычке для планировщика.
+    next_run_at=None означает, что напоминание нужно отменить.
+    """
+    publish_habit_changes([(habit_id, next_run_at)])
@@ -1,18 +1,60 @@
+from functools import cache
+
 from rest_framework import serializers
 
-from habits.models import Habit
+from habits.models import Habit, HabitStats, HabitSummary
 from habits.validators import (PeriodicityValidator, PleasantHabitValidator,
                                RewardValidator, RuntimeValidator)
 
 
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Поле связанной привычки. При пакетной обработке ищет привычку среди
+    загруженных заранее одним запросом (context["related_habits"]).
+    """
+
+    def to_internal_value(self, data):
+        related_habits = self.context.get("related_habits")
+        if related_habits is None:
+            return super().to_internal_value(data)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if pk not in related_habits:
+            self.fail("does_not_exist", pk_value=data)
+        return related_habits[pk]
+
+
+def get_related_habits(items):
+    """
+    Загружает одним запросом привычки, на которые ссылаются элементы пакета.
+    """
+    ids = set()
+    for item in items:
+        if isinstance(item, dict):
+            try:
+                ids.add(int(item["related_habit"]))
+            except (KeyError, TypeError, ValueError):
+                pass
+    return Habit.objects.in_bulk(ids)
+
+
 class HabitSerializer(serializers.ModelSerializer):
     """
     Сериализатор привычки.
     """
 
+    related_habit = PrefetchedPrimaryKeyRelatedField(
+        queryset=Habit.objects.all(),
+        required=False,
+        allow_null=True,
+        label="Связанная привычка",
+    )
+
     class Meta:
         model = Habit
-        fields = "__all__"
+        exclude = ("reminder_text",)
         validators = [
             RuntimeValidator(),
             PeriodicityValidator(),
@@ -24,3 +66,118 @@ class HabitSerializer(serializers.ModelSerializer):
             "start_at": {"format": "%H:%M"},
             "execute_at": {"format": "%d/%m/%y"},
         }
+
+
+class HabitImportSerializer(HabitSerializer):
+    """
+    Сериализатор строки импорта привычек. Разбирает только поля: правила
+    habits.validators применяются сразу ко всей пачке строк.
+    """
+
+    class Meta(HabitSerializer.Meta):
+        validators = []
+
+
+class HabitStatsSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор статистики привычки.
+    """
+
+    current_streak = serializers.SerializerMethodField(label="Текущая серия")
+    completion_rate = serializers.FloatField(read_only=True, label="Доля выполнений")
+
+    class Meta:
+        model = HabitStats
+        fields = (
+            "habit",
+            "due_count",
+            "done_count",
+            "current_streak",
+            "best_streak",
+            "last_done_on",
+            "completion_rate",
+        )
+
+    def get_current_streak(self, stats):
+        return stats.get_current_streak(self.context["today"])
+
+
+class HabitSummarySerializer(serializers.ModelSerializer):
+    """
+    Сериализатор сводки привычек пользователя.
+    """
+
+    due_today_count = serializers.IntegerField(
+        read_only=True, label="Привычек на сегодня"
+    )
+    next_due_at = serializers.DateTimeField(
+        read_only=True, label="Ближайшее напоминание"
+    )
+
+    class Meta:
+        model = HabitSummary
+        fields = (
+            "useful_count",
+            "pleasant_count",
+            "public_count",
+            "due_today_count",
+            "next_due_at",
+        )
+
+
+class HabitDoneSerializer(serializers.Serializer):
+    """
+    Сериализатор отметки о выполнении привычки.
+    """
+
+    date = serializers.DateField(
+        required=False, label="Дата выполнения", help_text="По умолчанию - сегодня."
+    )
+
+    def validate_date(self, value):
+        if value > self.context["today"]:
+            raise serializers.ValidationError("Нельзя отметить выполнение в будущем.")
+        return value
+
+
+@cache
+def get_habit_row_fields():
+    """
+    Возвращает поля HabitSerializer, пригодные для сериализации строк values():
+    пары (имя поля, поле), у связанных полей - (имя поля, None).
+    """
+    fields = []
+    for name, field in HabitSerializer().fields.items():
+        if isinstance(field, serializers.RelatedField):
+            field = None
+        fields.append((name, field))
+    return tuple(fields)
+
+
+def get_habit_values_fields():
+    """
+    Возвращает имена полей, которые нужно запросить через values().
+    """
+    return [name for name, field in get_habit_row_fields()]
+
+
+def serialize_habit_row(row):
+    """
+    Облегчённая сериализация привычки только для чтения: строка values()
+    преобразуется в то же представление, что и у HabitSerializer,
+    без создания экземпляра модели и без обращения к связанным объектам.
+    """
+    item = {}
+    for name, field in get_habit_row_fields():
+        value = row[name]
+        if field is not None and value is not None:
+            value = field.to_representation(value)
+        item[name] = value
+    return item
+
+
+def serialize_habit_rows(rows):
+    """
+    Сериализует список строк values() через serialize_habit_row().
+    """
+    return [serialize_habit_row(row) for row in rows]
@@ -1,14 +1,299 @@
+import asyncio
+import enum
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import redis
+import redis.asyncio
 import requests
+from requests.adapters import HTTPAdapter
+
+from config.settings import (REDIS_URL, TELEGRAM_CHAT_RATE_LIMIT,
+                             TELEGRAM_MAX_RETRIES, TELEGRAM_RATE_LIMIT,
+                             TELEGRAM_SENDER_WORKERS, TELEGRAM_TIMEOUT,
+                             TELEGRAM_TOKEN, TELEGRAM_URL)
+
+# Максимальная длина текста сообщения Telegram
+TELEGRAM_MESSAGE_LIMIT = 4096
+# Ответы Bot API, после которых сообщение не будет доставлено и повторно:
+# 400 - чат не найден или сообщение некорректно, 403 - бот заблокирован
+TELEGRAM_REJECTED_STATUSES = {400, 403}
+
+
+class SendResult(enum.Enum):
+    """
+    Результат отправки сообщения: доставлено, можно повторить позже
+    или отклонено окончательно. Истинно только для доставленного.
+    """
+
+    SENT = "sent"
+    RETRY = "retry"
+    REJECTED = "rejected"
+
+    def __bool__(self):
+        return self is SendResult.SENT
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты запросов по алгоритму «корзина токенов».
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
 
-from config.settings import TELEGRAM_TOKEN, TELEGRAM_URL
+    def acquire(self):
+        """
+        Забирает один токен, при необходимости дожидаясь его появления.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated_at) * self.rate
+                )
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def is_full(self, now):
+        """
+        Проверяет, накопилась ли корзина к моменту now до полной ёмкости:
+        такую корзину можно удалить и создать заново без потери состояния.
+        """
+        return self.tokens + (now - self.updated_at) * self.rate >= self.capacity
+
+
+class SharedTokenBucket:
+    """
+    Корзина токенов в Redis, общая для всех процессов: лимит соблюдается
+    суммарно, сколько бы воркеров ни отправляли сообщения. Состояние
+    корзины пересчитывается атомарно скриптом Lua по часам сервера Redis.
+    При недоступности Redis используется корзина процесса.
+    """
+
+    script = """
+        local rate = tonumber(ARGV[1])
+        local capacity = tonumber(ARGV[2])
+        local time = redis.call("TIME")
+        local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+        local state = redis.call("HMGET", KEYS[1], "tokens", "updated_at")
+        local tokens = tonumber(state[1]) or capacity
+        local updated_at = tonumber(state[2]) or now
+        tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+        local wait = 0
+        if tokens >= 1 then
+            tokens = tokens - 1
+        else
+            wait = (1 - tokens) / rate
+        end
+        redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "updated_at", tostring(now))
+        redis.call("EXPIRE", KEYS[1], math.ceil(capacity / rate) + 1)
+        return tostring(wait)
+    """
+
+    def __init__(self, client, key, rate, capacity=None):
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.take = client.register_script(self.script)
+        self.fallback = TokenBucket(rate, capacity)
+
+    def acquire(self):
+        """
+        Забирает один токен, при необходимости дожидаясь его появления.
+        """
+        while True:
+            try:
+                wait = float(
+                    self.take(keys=[self.key], args=[self.rate, self.capacity])
+                )
+            except redis.RedisError:
+                self.fallback.acquire()
+                return
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+
+class TelegramSender:
+    """
+    Отправитель сообщений в Telegram.
+    Переиспользует пул HTTP-соединений, отправляет сообщения параллельно,
+    соблюдает общий лимит и лимит на чат, повторяет запрос при ответах 429 и 5xx.
+    С Redis общий лимит делится между всеми процессами.
+    """
+
+    backoff = 0.5
+    # Число корзин чатов, после которого удаляются накопившиеся корзины
+    max_chat_buckets = 10000
+
+    def __init__(
+        self,
+        base_url=TELEGRAM_URL,
+        token=TELEGRAM_TOKEN,
+        workers=TELEGRAM_SENDER_WORKERS,
+        rate=TELEGRAM_RATE_LIMIT,
+        chat_rate=TELEGRAM_CHAT_RATE_LIMIT,
+        max_retries=TELEGRAM_MAX_RETRIES,
+        timeout=TELEGRAM_TIMEOUT,
+    ):
+        self.url = f"{base_url}{token}"
+        self.workers = workers
+        self.chat_rate = chat_rate
+        self.max_retries = max_retries
+        self.timeout = timeout
+        if REDIS_URL:
+            self.bucket = SharedTokenBucket(get_redis(), "telegram:rate", rate)
+        else:
+            self.bucket = TokenBucket(rate)
+        self.chat_buckets = {}
+        self.chat_buckets_lock = threading.Lock()
+        self.prune_chat_buckets_at = self.max_chat_buckets
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get_chat_bucket(self, chat_id):
+        with self.chat_buckets_lock:
+            bucket = self.chat_buckets.get(chat_id)
+            if bucket is None:
+                if len(self.chat_buckets) >= self.prune_chat_buckets_at:
+                    self.prune_chat_buckets()
+                bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, 1)
+            return bucket
+
+    def prune_chat_buckets(self):
+        """
+        Удаляет корзины чатов, в которые давно не отправлялись сообщения.
+        Если почти все чаты активны, следующая очистка откладывается
+        до удвоения числа корзин, чтобы не перебирать их на каждое сообщение.
+        """
+        now = time.monotonic()
+        self.chat_buckets = {
+            chat_id: bucket
+            for chat_id, bucket in self.chat_buckets.items()
+            if not bucket.is_full(now)
+        }
+        self.prune_chat_buckets_at = max(
+            self.max_chat_buckets, 2 * len(self.chat_buckets)
+        )
+
+    def send(self, chat_id, text, reply_markup=None):
+        """
+        Отправляет сообщение в чат, reply_markup - кнопки под сообщением.
+        Возвращает SendResult: REJECTED, если Telegram окончательно отказал
+        (TELEGRAM_REJECTED_STATUSES), RETRY при прочих ошибках.
+        """
+        message = {"chat_id": chat_id, "text": text}
+        if reply_markup is not None:
+            message["reply_markup"] = reply_markup
+        chat_bucket = self.get_chat_bucket(chat_id)
+        for attempt in range(self.max_retries + 1):
+            chat_bucket.acquire()
+            self.bucket.acquire()
+            delay = self.backoff * 2**attempt
+            try:
+                response = self.session.post(
+                    f"{self.url}/sendMessage",
+                    json=message,
+                    timeout=self.timeout,
+                )
+            except requests.RequestException:
+                pass
+            else:
+                if response.status_code == 429:
+                    delay = self.get_retry_after(response, delay)
+                elif response.ok:
+                    return SendResult.SENT
+                elif response.status_code in TELEGRAM_REJECTED_STATUSES:
+                    return SendResult.REJECTED
+                elif response.status_code < 500:
+                    return SendResult.RETRY
+            if attempt < self.max_retries:
+                time.sleep(delay)
+        return SendResult.RETRY
+
+    @staticmethod
+    def get_retry_after(response, default):
+        """
+        Возвращает паузу из ответа 429. Ответ может прийти не от Bot API
+        (например, от прокси) и не содержать JSON.
+        """
+        try:
+            return float(response.json()["parameters"]["retry_after"])
+        except (ValueError, KeyError, TypeError):
+            return default
+
+    def send_many(self, messages):
+        """
+        Параллельно отправляет сообщения, заданные кортежами
+        (chat_id, text) или (chat_id, text, reply_markup).
+        Возвращает список результатов отправки (SendResult) в том же порядке.
+        """
+        messages = list(messages)
+        if not messages:
+            return []
+        with ThreadPoolExecutor(min(self.workers, len(messages))) as executor:
+            return list(executor.map(lambda message: self.send(*message), messages))
+
+
+_sender = None
+
+
+def get_telegram_sender():
+    """
+    Возвращает общий для процесса отправитель сообщений.
+    """
+    global _sender
+    if _sender is None:
+        _sender = TelegramSender()
+    return _sender
 
 
 def send_telegram_message(chat_id, message):
     """
     Отправляет сообщение в телеграм чат с указанным chat_id
     """
-    params = {
-        "text": message,
-        "chat_id": chat_id,
-    }
-    requests.get(f"{TELEGRAM_URL}{TELEGRAM_TOKEN}/sendMessage", params=params)
+    return get_telegram_sender().send(chat_id, message)
+
+
+_redis = None
+
+
+def get_redis():
+    """
+    Возвращает общий для процесса клиент Redis.
+    """
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(REDIS_URL)
+    return _redis
+
+
+_async_redis = weakref.WeakKeyDictionary()
+
+
+def get_async_redis():
+    """
+    Возвращает асинхронный клиент Redis для текущего цикла событий.
+    Предназначен для долгоживущего цикла событий ASGI-воркера: в синхронном
+    сервере каждый асинхронный запрос выполняется в новом цикле событий,
+    и на каждый запрос создавался бы новый пул соединений.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_redis.get(loop)
+    if client is None:
+        client = _async_redis[loop] = redis.asyncio.Redis.from_url(REDIS_URL)
+    return client
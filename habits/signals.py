@@ -0,0 +1,84 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from habits.caching import affects_public_habits, invalidate_public_habits
+from habits.models import Habit
+from habits.scheduler import publish_habit_change, publish_habit_changes
+from habits.summary import change_summary, get_flag_changes
+from users.models import User
+
+
+@receiver(post_save, sender=Habit)
+def habit_saved(sender, instance, created, **kwargs):
+    """
+    Сообщает планировщику напоминаний новое время напоминания о привычке,
+    обновляет сводку пользователя и сбрасывает кеш публичных привычек,
+    если привычка публичная или была ею.
+    """
+    invalidate = affects_public_habits(instance)
+    if created:
+        instance._loaded_flags = instance.flags
+        change_summary(instance.user_id, added=[instance.flags])
+    else:
+        change_summary(instance.user_id, *get_flag_changes([instance]))
+    next_run_at = None if instance.is_pleasure else instance.next_run_at
+    transaction.on_commit(lambda: publish_habit_change(instance.pk, next_run_at))
+    if invalidate:
+        transaction.on_commit(invalidate_public_habits)
+
+
+@receiver(post_delete, sender=Habit)
+def habit_deleted(sender, instance, **kwargs):
+    """
+    Отменяет напоминание об удалённой привычке, обновляет сводку пользователя
+    и сбрасывает кеш публичных привычек, если привычка была публичной.
+    """
+    change_summary(instance.user_id, removed=[instance._loaded_flags or instance.flags])
+    habit_id = instance.pk
+    transaction.on_commit(lambda: publish_habit_change(habit_id, None))
+    if affects_public_habits(instance):
+        transaction.on_commit(invalidate_public_habits)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    """
+    Пересчитывает время напоминаний о привычках пользователя
+    при смене его часового пояса.
+    """
+    if instance.timezone_changed:
+        tz = instance.tzinfo
+        habits = list(
+            Habit.objects.filter(user=instance).only(
+                "pk", "start_at", "execute_at", "is_pleasure", "is_public"
+            )
+        )
+        for habit in habits:
+            habit.schedule(habit.execute_at, tz)
+        Habit.objects.bulk_update(habits, ["next_run_at"], batch_size=1000)
+        notify_habits_changed(habits)
+    instance._loaded_timezone = instance.timezone
+
+
+def notify_habits_changed(habits=(), deleted_ids=(), public=None):
+    """
+    Оповещает планировщик напоминаний и сбрасывает кеш публичных привычек
+    после пакетных изменений, при которых сигналы моделей не отправляются.
+    Кеш сбрасывается, если среди привычек есть публичные сейчас или при
+    загрузке (или если public=True); вызывается до get_flag_changes,
+    которая перезаписывает загруженные признаки.
+    """
+    changes = [
+        (habit.pk, None if habit.is_pleasure else habit.next_run_at) for habit in habits
+    ]
+    changes += [(habit_id, None) for habit_id in deleted_ids]
+    if public is None:
+        public = bool(deleted_ids) or any(map(affects_public_habits, habits))
+
+    def notify():
+        publish_habit_changes(changes)
+        if public:
+            invalidate_public_habits()
+
+    transaction.on_commit(notify)
@@ -0,0 +1,75 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import F
+
+from habits.models import HabitEvent, HabitStats
+
+
+def get_habit_stats(habit):
+    """
+    Возвращает статистику привычки. Для привычки без событий - пустую
+    несохранённую статистику.
+    """
+    try:
+        return habit.stats
+    except HabitStats.DoesNotExist:
+        return HabitStats(habit=habit)
+
+
+def record_due(occurrences):
+    """
+    Записывает наступление сроков выполнения привычек: пары (привычка, дата).
+    Уже записанные сроки пропускаются и не учитываются в статистике повторно.
+    Вызывается в транзакции постановки напоминаний.
+    """
+    occurrences = {(habit.pk, date): habit for habit, date in occurrences}
+    if not occurrences:
+        return
+    recorded = set(
+        HabitEvent.objects.filter(
+            habit_id__in={habit_id for habit_id, _ in occurrences},
+            kind=HabitEvent.DUE,
+            date__in={date for _, date in occurrences},
+        ).values_list("habit_id", "date")
+    )
+    new = [key for key in occurrences if key not in recorded]
+    if not new:
+        return
+    HabitEvent.objects.bulk_create(
+        [
+            HabitEvent(habit_id=habit_id, kind=HabitEvent.DUE, date=date)
+            for habit_id, date in new
+        ],
+        ignore_conflicts=True,
+    )
+    counts = Counter(habit_id for habit_id, _ in new)
+    HabitStats.objects.bulk_create(
+        [HabitStats(habit_id=habit_id) for habit_id in counts], ignore_conflicts=True
+    )
+    by_count = defaultdict(list)
+    for habit_id, count in counts.items():
+        by_count[count].append(habit_id)
+    for count, habit_ids in by_count.items():
+        HabitStats.objects.filter(habit_id__in=habit_ids).update(
+            due_count=F("due_count") + count
+        )
+
+
+def mark_done(habit, done_on):
+    """
+    Отмечает выполнение привычки в дату done_on и обновляет её статистику.
+    Строка статистики блокируется, поэтому одновременные отметки не теряют
+    обновлений серии. Повторная отметка той же даты ничего не меняет.
+    Возвращает статистику и признак новой отметки.
+    """
+    with transaction.atomic():
+        stats, _ = HabitStats.objects.select_for_update().get_or_create(habit=habit)
+        _, created = HabitEvent.objects.get_or_create(
+            habit=habit, kind=HabitEvent.DONE, date=done_on
+        )
+        if created:
+            stats.add_done(done_on, habit.periodicity)
+            stats.save()
+    stats.habit = habit
+    return stats, created
@@ -0,0 +1,129 @@
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from habits.models import Habit, HabitSummary
+
+_batch = threading.local()
+
+
+def get_summary_delta(added=(), removed=()):
+    """
+    Возвращает изменения счётчиков сводки по признакам (приятная, публичная)
+    добавленных и удалённых привычек.
+    """
+    delta = Counter()
+    for sign, flags in ((1, added), (-1, removed)):
+        for is_pleasure, is_public in flags:
+            delta["pleasant_count" if is_pleasure else "useful_count"] += sign
+            if is_public:
+                delta["public_count"] += sign
+    return delta
+
+
+def change_summary(user_id, added=(), removed=()):
+    """
+    Обновляет счётчики сводки пользователя. Внутри batched_summary()
+    изменения накапливаются и применяются при выходе из блока.
+    """
+    delta = get_summary_delta(added, removed)
+    deltas = getattr(_batch, "deltas", None)
+    if deltas is not None:
+        deltas.setdefault(user_id, Counter()).update(delta)
+    else:
+        apply_summary_delta(user_id, delta)
+
+
+@contextmanager
+def batched_summary():
+    """
+    Собирает изменения сводок внутри блока (например, от сигналов при
+    удалении пачки привычек) и применяет их одним запросом на пользователя.
+    """
+    _batch.deltas = {}
+    try:
+        yield
+        deltas = _batch.deltas
+    finally:
+        _batch.deltas = None
+    for user_id, delta in deltas.items():
+        apply_summary_delta(user_id, delta)
+
+
+def apply_summary_delta(user_id, delta):
+    """
+    Применяет изменения счётчиков одним запросом. Если сводки ещё нет,
+    она строится по привычкам пользователя (при удалении привычек - не
+    строится: её построит первое чтение).
+    """
+    delta = {field: value for field, value in delta.items() if value}
+    if not delta:
+        return
+    updated = HabitSummary.objects.filter(user_id=user_id).update(
+        **{field: F(field) + value for field, value in delta.items()}
+    )
+    if not updated and any(value > 0 for value in delta.values()):
+        rebuild_summary(user_id)
+
+
+def get_flag_changes(habits):
+    """
+    Возвращает признаки (добавленные, удалённые) изменённых привычек
+    и запоминает новые признаки как загруженные.
+    """
+    added, removed = [], []
+    for habit in habits:
+        loaded, flags = habit._loaded_flags, habit.flags
+        if loaded is not None and None not in loaded and loaded != flags:
+            added.append(flags)
+            removed.append(loaded)
+        habit._loaded_flags = flags
+    return added, removed
+
+
+def rebuild_summary(user_id):
+    """
+    Пересчитывает сводку пользователя по всем его привычкам.
+    """
+    counts = Habit.objects.filter(user_id=user_id).aggregate(
+        useful_count=Count("pk", filter=Q(is_pleasure=False)),
+        pleasant_count=Count("pk", filter=Q(is_pleasure=True)),
+        public_count=Count("pk", filter=Q(is_public=True)),
+    )
+    summary, _ = HabitSummary.objects.update_or_create(user_id=user_id, defaults=counts)
+    return summary
+
+
+def get_summary(user):
+    """
+    Возвращает сводку пользователя одним запросом: счётчики читаются
+    из строки сводки, количество привычек на сегодня и ближайшее
+    напоминание - по индексу habit_user_due_idx.
+    """
+    tz = user.tzinfo
+    tomorrow = datetime.combine(
+        timezone.localdate(timezone=tz) + timedelta(days=1), time.min, tzinfo=tz
+    )
+    useful = Habit.objects.filter(user_id=OuterRef("user_id"), is_pleasure=False)
+    queryset = HabitSummary.objects.annotate(
+        due_today_count=Coalesce(
+            Subquery(
+                useful.filter(next_run_at__lt=tomorrow)
+                .values("user_id")
+                .annotate(count=Count("pk"))
+                .values("count")
+            ),
+            0,
+        ),
+        next_due_at=Subquery(useful.order_by("next_run_at").values("next_run_at")[:1]),
+    )
+    try:
+        return queryset.get(user_id=user.pk)
+    except HabitSummary.DoesNotExist:
+        rebuild_summary(user.pk)
+        return queryset.get(user_id=user.pk)
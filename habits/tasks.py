@@ -1,49 +1,421 @@
 from datetime import timedelta
+from itertools import islice
 
-from celery import shared_task
+from celery import group, shared_task
+from django.db import transaction
+from django.db.models import Count, F, Min, Q
 from django.utils import timezone
 
-from habits.models import Habit
-from habits.services import send_telegram_message
+from config import metrics
+from config.settings import (OUTBOX_BATCH_SIZE, OUTBOX_LEASE,
+                             OUTBOX_MAX_ATTEMPTS, OUTBOX_RETENTION_DAYS,
+                             OUTBOX_RETRY_DELAY, OUTBOX_RETRY_MAX_DELAY,
+                             OUTBOX_SEND_CHUNK_SIZE)
+from habits.bot import get_reminder_markup
+from habits.models import Habit, ReminderOutbox
+from habits.services import (TELEGRAM_MESSAGE_LIMIT, SendResult,
+                             get_telegram_sender)
+from habits.stats import record_due
 
+# Количество привычек, обрабатываемых за один проход (чтение, отправка, обновление)
+REMINDER_CHUNK_SIZE = 1000
 
-@shared_task
-def send_habit_reminder():
+# Сколько привычек пришло к сроку и сколько сообщений о них поставлено в outbox:
+# в режиме сводки сообщений меньше, чем привычек
+REMINDER_HABITS = metrics.counter("reminders.habits")
+REMINDER_MESSAGES = metrics.counter("reminders.messages")
+
+# Количество доставленных напоминаний, удаляемых за один запрос
+OUTBOX_PURGE_CHUNK_SIZE = 5000
+
+# Повторные попытки отправки и напоминания, перенесённые в недоставленные
+OUTBOX_RETRIES = metrics.counter("outbox.retries")
+OUTBOX_DEAD_LETTERS = metrics.counter("outbox.dead_letters")
+
+
+def get_due_habits(now):
     """
-    Направляет напоминание о привычке в Telegram.
+    Возвращает полезные привычки, срок выполнения которых наступил.
+    Отбор идёт по частичному индексу habit_due_idx, пользователь
+    и связанная привычка подгружаются тем же запросом.
     """
-
-    # Отбираем полезные привычки, срок выполнения которых наступил
-    habits = Habit.objects.filter(
-        start_at__lte=timezone.now().time(),
-        execute_at__lte=timezone.now().date(),
-        is_pleasure=False,
+    return (
+        Habit.objects.filter(next_run_at__lte=now, is_pleasure=False)
+        .select_related("user", "related_habit")
+        .order_by("pk")
     )
 
-    # Отправляем напоминания в Telegram
-    for habit in habits:
-        user = habit.user
-        message = f"Я буду {habit.action} в {habit.start_at} {habit.place}."
-        related_habit = habit.related_habit
 
-        # Дополняем текст уведомления, если у полезной привычки есть связанная привычка или вознаграждение.
+def build_reminder_message(habit):
+    """
+    Формирует текст напоминания о привычке из закешированных текстов
+    привычки и связанной с ней привычки.
+    """
+    return habit.get_reminder_message()
 
-        if habit.reward:
-            message += f" А сразу после этого могу {habit.reward}."
-        elif related_habit:
-            message += f" {related_habit}"
 
+def build_digest_messages(messages, limit=TELEGRAM_MESSAGE_LIMIT):
+    """
+    Собирает напоминания о нескольких привычках в сводные сообщения,
+    каждое не длиннее limit символов.
+    """
+    header = "Пора выполнить привычки:"
+    digests = []
+    digest = header
+    for message in messages:
+        line = f"\n\n• {message}"
+        if len(digest) + len(line) > limit and digest != header:
+            digests.append(digest)
+            digest = header
+        digest += line
+    digests.append(digest)
+    return digests
+
+
+def chunked(iterable, size):
+    """
+    Разбивает итерируемый объект на списки длиной не более size.
+    """
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def enqueue_reminders(habits, now):
+    """
+    Сдвигает дату следующего выполнения у пачки привычек и у связанных
+    с ними привычек, записывает напоминания в outbox и наступление сроков
+    выполнения в статистику. Пользователям в режиме сводки наступившие
+    привычки пачки приходят одним сообщением на чат. Дата отсчитывается
+    от сегодняшнего дня в часовом поясе пользователя.
+    Вызывается в транзакции, в которой привычки заблокированы.
+    Возвращает количество поставленных в очередь напоминаний.
+    """
+    messages = {}
+    to_update = {}
+    occurrences = []
+
+    for habit in habits:
+        occurrences.append((habit, habit.execute_at))
+        user = habit.user
         if user.tg_chat_id:
-            send_telegram_message(user.tg_chat_id, message)
-            print(f"Напоминание отправлено пользователю {user.email}.")
+            # Напоминания в режиме сводки группируются по чату,
+            # остальные отправляются по одному на привычку
+            chat = user.tg_chat_id if user.reminder_digest else None
+            messages.setdefault(chat, []).append(
+                (habit, user.tg_chat_id, build_reminder_message(habit))
+            )
         else:
             print(f"Не удалось отправить напоминание пользователю {user.email}.")
 
         # Обновляем дату следующего выполнения привычки
-        habit.execute_at = timezone.now().date() + timedelta(days=habit.periodicity)
-        habit.save()
+        tz = user.tzinfo
+        today = timezone.localdate(now, tz)
+        habit.schedule(today + timedelta(days=habit.periodicity), tz)
+        to_update[habit.pk] = habit
+        related_habit = habit.related_habit
         if related_habit:
-            related_habit.execute_at = timezone.now().date() + timedelta(
-                days=related_habit.periodicity
+            related_habit.schedule(
+                today + timedelta(days=related_habit.periodicity), tz
             )
-            related_habit.save()
+            to_update[related_habit.pk] = related_habit
+
+    Habit.objects.bulk_update(
+        to_update.values(),
+        ["execute_at", "next_run_at"],
+        batch_size=REMINDER_CHUNK_SIZE,
+    )
+    reminders = []
+    for chat, chat_messages in messages.items():
+        if chat is None or len(chat_messages) == 1:
+            reminders += [
+                ReminderOutbox(
+                    habit=habit, chat_id=chat_id, text=text, available_at=now
+                )
+                for habit, chat_id, text in chat_messages
+            ]
+        else:
+            texts = [text for _, _, text in chat_messages]
+            reminders += [
+                ReminderOutbox(chat_id=chat, text=text, available_at=now)
+                for text in build_digest_messages(texts)
+            ]
+    ReminderOutbox.objects.bulk_create(reminders, batch_size=REMINDER_CHUNK_SIZE)
+    record_due(occurrences)
+
+    reminded = sum(len(chat_messages) for chat_messages in messages.values())
+    queued = len(reminders)
+
+    def count():
+        metrics.incr(REMINDER_HABITS, reminded)
+        metrics.incr(REMINDER_MESSAGES, queued)
+
+    transaction.on_commit(count)
+    return queued
+
+
+def get_pending_outbox():
+    """
+    Возвращает напоминания, ожидающие отправки (по частичному индексу
+    outbox_pending_idx).
+    """
+    return ReminderOutbox.objects.filter(
+        delivered_at__isnull=True, failed_at__isnull=True
+    )
+
+
+def claim_outbox(now, size=OUTBOX_BATCH_SIZE):
+    """
+    Забирает пачку напоминаний, время отправки которых наступило,
+    на срок аренды. Записи, заблокированные другими обработчиками,
+    пропускаются, поэтому несколько обработчиков работают без ожидания
+    друг друга.
+    """
+    with transaction.atomic():
+        reminders = list(
+            get_pending_outbox()
+            .filter(available_at__lte=now)
+            .order_by("available_at")
+            .select_for_update(skip_locked=True)[:size]
+        )
+        ReminderOutbox.objects.filter(pk__in=[r.pk for r in reminders]).update(
+            available_at=now + timedelta(seconds=OUTBOX_LEASE),
+            attempts=F("attempts") + 1,
+        )
+    for reminder in reminders:
+        reminder.attempts += 1
+    return reminders
+
+
+def get_retry_delay(attempts):
+    """
+    Возвращает задержку в секундах перед повторной отправкой напоминания
+    после attempts неудачных попыток: экспоненциальный рост
+    от OUTBOX_RETRY_DELAY до OUTBOX_RETRY_MAX_DELAY.
+    """
+    return min(OUTBOX_RETRY_DELAY * 2 ** (attempts - 1), OUTBOX_RETRY_MAX_DELAY)
+
+
+def retry_outbox(reminders, now, rejected=()):
+    """
+    Откладывает недоставленные напоминания до повторной попытки,
+    после OUTBOX_MAX_ATTEMPTS попыток переносит их в недоставленные.
+    Отклонённые Telegram окончательно (rejected) переносятся
+    в недоставленные сразу. Возвращает количество перенесённых
+    в недоставленные напоминаний.
+    """
+    retries = {}
+    failed = [reminder.pk for reminder in rejected]
+    for reminder in reminders:
+        if reminder.attempts >= OUTBOX_MAX_ATTEMPTS:
+            failed.append(reminder.pk)
+        else:
+            retries.setdefault(reminder.attempts, []).append(reminder.pk)
+
+    for attempts, ids in retries.items():
+        ReminderOutbox.objects.filter(pk__in=ids).update(
+            available_at=now + timedelta(seconds=get_retry_delay(attempts))
+        )
+    ReminderOutbox.objects.filter(pk__in=failed).update(failed_at=now)
+
+    retried = sum(map(len, retries.values()))
+    if retried:
+        metrics.incr(OUTBOX_RETRIES, retried)
+    if failed:
+        metrics.incr(OUTBOX_DEAD_LETTERS, len(failed))
+    return len(failed)
+
+
+def renew_outbox_lease(reminders, now):
+    """
+    Продлевает аренду ещё не отправленных напоминаний пачки.
+    """
+    ReminderOutbox.objects.filter(pk__in=[r.pk for r in reminders]).update(
+        available_at=now + timedelta(seconds=OUTBOX_LEASE)
+    )
+
+
+def send_outbox(sender, reminders):
+    """
+    Отправляет порцию напоминаний: доставленные отмечаются, недоставленные
+    откладываются до повторной попытки (retry_outbox), отклонённые
+    Telegram окончательно сразу переносятся в недоставленные.
+    Возвращает количество доставленных напоминаний.
+    """
+    results = sender.send_many(
+        (r.chat_id, r.text, get_reminder_markup(r.habit_id) if r.habit_id else None)
+        for r in reminders
+    )
+    outcomes = {result: [] for result in SendResult}
+    for reminder, result in zip(reminders, results):
+        outcomes[result].append(reminder)
+    ids = [r.pk for r in outcomes[SendResult.SENT]]
+    ReminderOutbox.objects.filter(pk__in=ids).update(delivered_at=timezone.now())
+    retry_outbox(
+        outcomes[SendResult.RETRY], timezone.now(), outcomes[SendResult.REJECTED]
+    )
+    return len(ids)
+
+
+def drain_outbox(sender=None, size=OUTBOX_BATCH_SIZE):
+    """
+    Отправляет напоминания из outbox, пока есть доступные записи.
+    Под напоминанием о привычке - кнопки «Выполнено» и «Отложить».
+    Пачка отправляется порциями по OUTBOX_SEND_CHUNK_SIZE (send_outbox):
+    после каждой порции аренда оставшихся записей продлевается, поэтому
+    другой обработчик не заберёт их, пока пачка отправляется.
+    Записи упавшего обработчика снова станут доступны по истечении срока аренды.
+    Возвращает количество доставленных напоминаний.
+    """
+    sender = sender or get_telegram_sender()
+    delivered = 0
+    while reminders := claim_outbox(timezone.now(), size):
+        for start in range(0, len(reminders), OUTBOX_SEND_CHUNK_SIZE):
+            end = start + OUTBOX_SEND_CHUNK_SIZE
+            delivered += send_outbox(sender, reminders[start:end])
+            if end < len(reminders):
+                renew_outbox_lease(reminders[end:], timezone.now())
+        if len(reminders) < size:
+            break
+    return delivered
+
+
+def purge_outbox(now, days=OUTBOX_RETENTION_DAYS, size=OUTBOX_PURGE_CHUNK_SIZE):
+    """
+    Удаляет напоминания, доставленные более days дней назад, пачками
+    по size записей, чтобы не держать долгих блокировок. Недоставленные
+    напоминания не удаляются. Возвращает количество удалённых записей.
+    """
+    delivered = ReminderOutbox.objects.filter(
+        delivered_at__lt=now - timedelta(days=days)
+    )
+    deleted = 0
+    while True:
+        # Старые записи в начале первичного ключа: пачка находится
+        # по индексу первичного ключа без отдельного индекса delivered_at
+        ids = list(delivered.order_by("pk").values_list("pk", flat=True)[:size])
+        if ids:
+            deleted += ReminderOutbox.objects.filter(pk__in=ids).delete()[0]
+        if len(ids) < size:
+            return deleted
+
+
+def get_outbox_stats(now):
+    """
+    Возвращает состояние очереди напоминаний: сколько ожидает отправки,
+    сколько из них уже доступно, сколько секунд ждёт самое давнее доступное
+    напоминание и сколько напоминаний не доставлено.
+    """
+    is_due = Q(available_at__lte=now)
+    stats = get_pending_outbox().aggregate(
+        depth=Count("pk"),
+        due=Count("pk", filter=is_due),
+        oldest_due_at=Min("available_at", filter=is_due),
+    )
+    oldest_due_at = stats.pop("oldest_due_at")
+    stats["oldest_due_age"] = (
+        round((now - oldest_due_at).total_seconds(), 3) if oldest_due_at else None
+    )
+    stats["failed"] = ReminderOutbox.objects.filter(failed_at__isnull=False).count()
+    return stats
+
+
+def get_shards(now, size=REMINDER_CHUNK_SIZE):
+    """
+    Разбивает привычки, срок выполнения которых наступил, на диапазоны
+    идентификаторов пользователей (первый, последний) примерно по size
+    привычек. Привычки одного пользователя попадают в один шард, чтобы
+    сводка собиралась в одно сообщение. Пользователи перебираются
+    по частичному индексу habit_user_due_idx.
+    """
+    user_ids = get_due_habits(now).order_by("user_id").values_list("user_id", flat=True)
+    first_id = last_id = None
+    count = 0
+    for user_id in user_ids.iterator(chunk_size=size):
+        if user_id != last_id and count >= size:
+            yield first_id, last_id
+            first_id, count = None, 0
+        if first_id is None:
+            first_id = user_id
+        last_id = user_id
+        count += 1
+    if first_id is not None:
+        yield first_id, last_id
+
+
+def send_due_reminders(**filters):
+    """
+    Ставит в outbox напоминания по наступившим привычкам, отобранным по filters.
+
+    Привычки блокируются, сдвигаются на следующую дату и записываются
+    в outbox в одной транзакции, поэтому повторный запуск (например, после
+    падения воркера) не поставит напоминание второй раз, а сбой отправки
+    не потеряет его. Доставку выполняет drain_reminder_outbox.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        habits = list(
+            get_due_habits(now)
+            .filter(**filters)
+            .select_for_update(skip_locked=True, of=("self",))
+        )
+        queued = enqueue_reminders(habits, now)
+        if queued:
+            transaction.on_commit(drain_reminder_outbox.delay)
+    return queued
+
+
+@shared_task
+def send_habit_reminder_shard(first_id, last_id):
+    """
+    Направляет напоминания по привычкам пользователей из диапазона
+    идентификаторов.
+    """
+    queued = send_due_reminders(user__pk__range=(first_id, last_id))
+    print(f"Поставлено напоминаний: {queued} (пользователи {first_id}-{last_id}).")
+    return queued
+
+
+@shared_task
+def send_habit_reminders(habit_ids):
+    """
+    Направляет напоминания по привычкам с указанными идентификаторами.
+    Ставится планировщиком напоминаний точно ко времени начала привычек.
+    """
+    queued = send_due_reminders(pk__in=habit_ids)
+    print(f"Поставлено напоминаний: {queued}.")
+    return queued
+
+
+@shared_task
+def send_habit_reminder():
+    """
+    Направляет напоминание о привычке в Telegram.
+    Привычки делятся на шарды, которые параллельно обрабатываются воркерами.
+    При работающем планировщике напоминаний задача лишь досылает то,
+    что он пропустил.
+    """
+    shards = list(get_shards(timezone.now()))
+    if shards:
+        group(send_habit_reminder_shard.s(*shard) for shard in shards).apply_async()
+    return len(shards)
+
+
+@shared_task
+def drain_reminder_outbox():
+    """
+    Доставляет напоминания из outbox в Telegram.
+    """
+    delivered = drain_outbox()
+    print(f"Отправлено напоминаний: {delivered}.")
+    return delivered
+
+
+@shared_task
+def purge_reminder_outbox():
+    """
+    Удаляет давно доставленные напоминания из outbox.
+    """
+    deleted = purge_outbox(timezone.now())
+    print(f"Удалено доставленных напоминаний: {deleted}.")
+    return deleted
@@ -1,11 +1,75 @@
+import csv
+import io
+import json
+import threading
+import time
+from datetime import date, datetime
+from datetime import time as dt_time
 from datetime import timedelta
+from datetime import timezone as dt_timezone
+from unittest import skipUnless
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
 
+import redis
+import requests
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.backends.sqlite3 import base as sqlite3_base
+from django.db.models.functions import Length
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.translation import gettext_lazy
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.exceptions import ParseError, ValidationError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import (APIRequestFactory, APITestCase,
+                                 APITransactionTestCase)
+from rest_framework_simplejwt.tokens import AccessToken
 
-from habits.models import Habit
+from config import metrics
+from config.celery import app as celery_app
+from config.db import DB_CONNECT_TIME, DB_CONNECTIONS, TimedConnectionMixin
+from config.metrics import get_counters
+from config.parsers import ORJSONParser
+from config.renderers import ORJSONRenderer
+from config.settings import OUTBOX_LEASE, REDIS_URL
+from habits.async_views import (HabitListAsyncAPIView,
+                                HabitRetrieveAsyncAPIView,
+                                PublicHabitListAsyncAPIView,
+                                telegram_webhook_application)
+from habits.bot import (TELEGRAM_DUPLICATES, TELEGRAM_UPDATES,
+                        get_reminder_markup)
+from habits.caching import (PUBLIC_HABITS_HITS, PUBLIC_HABITS_MISSES,
+                            PUBLIC_HABITS_NOT_MODIFIED)
+from habits.export import iter_habit_rows
+from habits.fake_telegram import FakeTelegramServer
+from habits.filters import PublicHabitFilter
+from habits.imports import HabitImporter, validate_batch
+from habits.management.commands.bench_reminders import NullSender
+from habits.models import (Habit, HabitEvent, HabitStats, HabitSummary,
+                           ReminderOutbox)
+from habits.scheduler import ReminderScheduler, publish_habit_changes
+from habits.serializers import HabitSerializer
+from habits.services import (SendResult, SharedTokenBucket, TelegramSender,
+                             TokenBucket)
+from habits.stats import record_due
+from habits.summary import rebuild_summary
+from habits.tasks import (OUTBOX_DEAD_LETTERS, OUTBOX_RETRIES, REMINDER_HABITS,
+                          REMINDER_MESSAGES, build_digest_messages,
+                          build_reminder_message, drain_outbox, get_due_habits,
+                          get_outbox_stats, get_pending_outbox,
+                          get_retry_delay, get_shards, purge_outbox,
+                          send_due_reminders, send_habit_reminder,
+                          send_habit_reminder_shard)
+from habits.views import (HabitListAPIView, HabitRetrieveAPIView,
+                          PublicHabitListAPIView)
+from users.caching import user_lru
 from users.models import User
 
 
@@ -58,6 +122,7 @@ class HabitTestCase(APITestCase):
             is_public=True,
         )
         self.client.force_authenticate(user=self.user1)
+        cache.clear()
 
     def test_str_habit(self):
         """
@@ -84,7 +149,7 @@ class HabitTestCase(APITestCase):
         """
         url = reverse("habits:habit", args=(self.good_habit2.pk,))
         response = self.client.get(url)
-        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
     def test_habit_create(self):
         """
@@ -248,7 +313,7 @@ class HabitTestCase(APITestCase):
         }
 
         response = self.client.patch(url, data=data)
-        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         habit = Habit.objects.get(pk=self.good_habit2.pk)
         self.assertNotEqual(habit.action, data["action"])
 
@@ -269,7 +334,7 @@ class HabitTestCase(APITestCase):
         url = reverse("habits:habit-delete", args=(self.good_habit2.pk,))
 
         response = self.client.delete(url)
-        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertTrue(Habit.objects.filter(pk=self.good_habit2.pk).exists())
 
     def test_habit_list(self):
@@ -306,3 +371,2160 @@ class HabitTestCase(APITestCase):
         data = response.json()
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(data["results"]), 5)
+
+
+class HabitReminderTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email="user1@example.com", tg_chat_id="1")
+        self.user_without_chat = User.objects.create(email="user2@example.com")
+        self.pleasant_habit = Habit.objects.create(
+            place="дома",
+            start_at=datetime.min.time(),
+            action="выпить чай",
+            user=self.user,
+            runtime=timedelta(minutes=1),
+            is_pleasure=True,
+            periodicity=2,
+        )
+        self.habits = [
+            Habit.objects.create(
+                place="дома",
+                start_at=datetime.min.time(),
+                action=f"сделать зарядку {i}",
+                user=self.user if i % 2 else self.user_without_chat,
+                runtime=timedelta(minutes=1),
+                related_habit=self.pleasant_habit,
+            )
+            for i in range(10)
+        ]
+
+    def test_send_habit_reminder(self):
+        """
+        Тестирование рассылки напоминаний и сдвига даты выполнения
+        """
+        today = timezone.now().date()
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, "task_always_eager", False)
+        with FakeTelegramServer() as server:
+            sender = TelegramSender(base_url=server.url, token="test", chat_rate=1000)
+            with patch("habits.tasks.get_telegram_sender", return_value=sender):
+                with self.captureOnCommitCallbacks(execute=True):
+                    shards = send_habit_reminder()
+
+        self.assertEqual(shards, 1)
+        self.assertEqual(len(server.messages), 5)
+        self.assertIn(
+            {
+                "chat_id": "1",
+                "text": build_reminder_message(self.habits[-1]),
+                "reply_markup": get_reminder_markup(self.habits[-1].pk),
+            },
+            server.messages,
+        )
+        self.assertEqual(
+            Habit.objects.filter(
+                is_pleasure=False, execute_at=today + timedelta(days=1)
+            ).count(),
+            10,
+        )
+        self.pleasant_habit.refresh_from_db()
+        self.assertEqual(self.pleasant_habit.execute_at, today + timedelta(days=2))
+
+    def test_next_run_at(self):
+        """
+        Тестирование пересчета времени следующего напоминания
+        """
+        habit = self.habits[0]
+        self.assertEqual(
+            habit.next_run_at,
+            datetime.combine(habit.execute_at, habit.start_at, tzinfo=dt_timezone.utc),
+        )
+
+        habit.start_at = datetime.max.time()
+        habit.save(update_fields=["start_at"])
+        habit.refresh_from_db()
+        self.assertEqual(habit.next_run_at.time(), datetime.max.time())
+        self.assertNotIn(habit, get_due_habits(timezone.now()))
+
+    def test_get_shards(self):
+        """
+        Тестирование разбиения привычек на шарды по пользователям
+        """
+        user = User.objects.create(email="user3@example.com")
+        for i in range(2):
+            Habit.objects.create(
+                place="дома",
+                start_at=datetime.min.time(),
+                action=f"гулять {i}",
+                user=user,
+                runtime=timedelta(minutes=1),
+            )
+        # Привычки одного пользователя не разделяются между шардами
+        ids = [self.user.pk, self.user_without_chat.pk, user.pk]
+        shards = list(get_shards(timezone.now(), size=4))
+        self.assertEqual(shards, [(ids[0], ids[0]), (ids[1], ids[1]), (ids[2], ids[2])])
+        shards = list(get_shards(timezone.now(), size=6))
+        self.assertEqual(shards, [(ids[0], ids[1]), (ids[2], ids[2])])
+
+    def test_shard_retry(self):
+        """
+        Тестирование повторного запуска шарда без повторной отправки
+        """
+        first_id, last_id = self.user.pk, self.user_without_chat.pk
+        # Выборка, сдвиг дат, outbox и четыре запроса статистики в транзакции
+        with self.assertNumQueries(9):
+            self.assertEqual(send_habit_reminder_shard(first_id, last_id), 5)
+        self.assertEqual(send_habit_reminder_shard(first_id, last_id), 0)
+        self.assertEqual(ReminderOutbox.objects.count(), 5)
+
+    def test_drain_outbox(self):
+        """
+        Тестирование доставки напоминаний из outbox
+        """
+        send_habit_reminder_shard(self.user.pk, self.user_without_chat.pk)
+        with FakeTelegramServer(fail_first=1, fail_status=401) as server:
+            sender = TelegramSender(base_url=server.url, token="test", chat_rate=1000)
+            self.assertEqual(drain_outbox(sender, size=2), 4)
+            # Недоставленное напоминание ждёт окончания срока аренды
+            self.assertEqual(drain_outbox(sender), 0)
+            later = timezone.now() + timedelta(hours=1)
+            with patch("django.utils.timezone.now", return_value=later):
+                self.assertEqual(drain_outbox(sender), 1)
+
+        self.assertEqual(len(server.messages), 5)
+        self.assertFalse(
+            ReminderOutbox.objects.filter(delivered_at__isnull=True).exists()
+        )
+        self.assertEqual(
+            sorted(ReminderOutbox.objects.values_list("attempts", flat=True)),
+            [1, 1, 1, 1, 2],
+        )
+
+
+class TelegramSenderTestCase(TestCase):
+
+    def test_send_many(self):
+        """
+        Тестирование параллельной отправки сообщений
+        """
+        messages = [(str(i % 3), f"Сообщение {i}") for i in range(30)]
+        with FakeTelegramServer() as server:
+            sender = TelegramSender(base_url=server.url, token="test", chat_rate=1000)
+            result = sender.send_many(messages)
+
+        self.assertEqual(result, [SendResult.SENT] * 30)
+        self.assertCountEqual(
+            [(message["chat_id"], message["text"]) for message in server.messages],
+            messages,
+        )
+
+    def test_send_retry(self):
+        """
+        Тестирование повторной отправки после ответов 429 и 5xx
+        """
+        with FakeTelegramServer(fail_first=2) as server:
+            sender = TelegramSender(base_url=server.url, token="test", chat_rate=1000)
+            self.assertTrue(sender.send("1", "Сообщение"))
+        self.assertEqual(len(server.messages), 1)
+
+        with FakeTelegramServer(fail_first=10, fail_status=502) as server:
+            sender = TelegramSender(
+                base_url=server.url, token="test", chat_rate=1000, max_retries=1
+            )
+            sender.backoff = 0
+            self.assertEqual(sender.send("1", "Сообщение"), SendResult.RETRY)
+        self.assertEqual(server.messages, [])
+
+        with FakeTelegramServer(fail_first=10, fail_status=403) as server:
+            sender = TelegramSender(base_url=server.url, token="test", chat_rate=1000)
+            self.assertEqual(sender.send("1", "Сообщение"), SendResult.REJECTED)
+        # Отклонённое сообщение не отправляется повторно
+        self.assertEqual(server.fail_first, 9)
+
+    def test_send_retry_not_json(self):
+        """
+        Тестирование повтора после ответа 429 без JSON
+        """
+        too_many = requests.Response()
+        too_many.status_code = 429
+        too_many._content = b"<html>Too Many Requests</html>"
+        ok = requests.Response()
+        ok.status_code = 200
+        ok._content = b'{"ok": true}'
+
+        sender = TelegramSender(base_url="http://telegram", token="test")
+        sender.backoff = 0
+        with patch.object(sender.session, "post", side_effect=[too_many, ok]) as post:
+            self.assertTrue(sender.send("1", "Сообщение"))
+        self.assertEqual(post.call_count, 2)
+
+    def test_chat_buckets_pruned(self):
+        """
+        Тестирование удаления корзин неактивных чатов
+        """
+        sender = TelegramSender(base_url="http://telegram", token="test")
+        sender.max_chat_buckets = sender.prune_chat_buckets_at = 10
+        for i in range(10):
+            sender.get_chat_bucket(str(i)).acquire()
+        # Во все чаты, кроме "0", сообщения отправлялись 10 секунд назад
+        for chat_id, bucket in sender.chat_buckets.items():
+            if chat_id != "0":
+                bucket.updated_at -= 10
+        busy = sender.get_chat_bucket("0")
+
+        sender.get_chat_bucket("new")
+        self.assertEqual(set(sender.chat_buckets), {"0", "new"})
+        self.assertIs(sender.get_chat_bucket("0"), busy)
+
+    def test_token_bucket(self):
+        """
+        Тестирование ограничения частоты отправки
+        """
+        bucket = TokenBucket(rate=100, capacity=1)
+        started = time.monotonic()
+        for _ in range(11):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+
+    def test_shared_token_bucket_fallback(self):
+        """
+        Тестирование общей корзины токенов при недоступном Redis
+        """
+        client = redis.Redis(port=1, socket_connect_timeout=0.1)
+        bucket = SharedTokenBucket(client, "telegram:rate", rate=100, capacity=1)
+        started = time.monotonic()
+        for _ in range(11):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+
+    @skipUnless(REDIS_URL, "Нужен Redis (REDIS_URL)")
+    def test_shared_token_bucket(self):
+        """
+        Тестирование общего лимита для нескольких отправителей
+        """
+        client = redis.Redis.from_url(REDIS_URL)
+        key = f"test:rate:{time.time_ns()}"
+        buckets = [
+            SharedTokenBucket(client, key, rate=100, capacity=1) for _ in range(2)
+        ]
+        started = time.monotonic()
+        for _ in range(10):
+            for bucket in buckets:
+                bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.18)
+        client.delete(key)
+
+
+class ReminderSchedulerTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email="user1@example.com", tg_chat_id="1")
+        self.now = timezone.now()
+        self.dispatched = []
+        self.scheduler = ReminderScheduler(dispatch=self.dispatched.extend, horizon=60)
+
+    def create_habit(self, run_at, **kwargs):
+        return Habit.objects.create(
+            place="дома",
+            start_at=run_at.time(),
+            action="сделать зарядку",
+            user=self.user,
+            runtime=timedelta(minutes=1),
+            **kwargs,
+        )
+
+    def test_load(self):
+        """
+        Тестирование загрузки расписания в пределах горизонта
+        """
+        soon = self.create_habit(self.now + timedelta(seconds=30))
+        self.create_habit(self.now + timedelta(seconds=30), is_pleasure=True)
+        later = self.create_habit(self.now)
+        later.schedule(self.now.date() + timedelta(days=1))
+        later.save()
+
+        self.assertEqual(self.scheduler.load(self.now), 1)
+        self.assertEqual(self.scheduler.pop_due(self.now), [])
+        self.assertEqual(
+            self.scheduler.pop_due(self.now + timedelta(seconds=31)), [soon.pk]
+        )
+
+    def test_schedule_and_cancel(self):
+        """
+        Тестирование переноса и отмены напоминаний
+        """
+        self.scheduler.load(self.now)
+        self.scheduler.schedule(1, self.now + timedelta(seconds=10))
+        self.scheduler.schedule(1, self.now + timedelta(seconds=20))
+        self.scheduler.schedule(2, self.now + timedelta(seconds=5))
+        self.scheduler.schedule(3, self.now + timedelta(hours=2))
+        self.scheduler.apply_message('{"id": 2, "next_run_at": null}')
+
+        self.assertEqual(self.scheduler.pop_due(self.now + timedelta(seconds=15)), [])
+        self.assertEqual(self.scheduler.pop_due(self.now + timedelta(hours=3)), [1])
+
+    def test_run(self):
+        """
+        Тестирование отправки напоминания точно ко времени начала привычки
+        """
+        run_at = timezone.now() + timedelta(seconds=0.3)
+        dispatched_at = []
+        self.scheduler.dispatch = lambda habit_ids: dispatched_at.append(
+            (habit_ids, timezone.now())
+        )
+        # Сверка с БД в этом тесте не нужна: расписание задаётся вручную
+        with patch.object(self.scheduler, "load"):
+            thread = threading.Thread(target=self.scheduler.run)
+            thread.start()
+            self.scheduler.schedule(1, run_at)
+            time.sleep(0.5)
+            self.scheduler.stop()
+            thread.join()
+
+        [(habit_ids, moment)] = dispatched_at
+        self.assertEqual(habit_ids, [1])
+        self.assertLess(moment - run_at, timedelta(seconds=0.1))
+
+    def test_signals(self):
+        """
+        Тестирование оповещения планировщика об изменении привычек
+        """
+        with patch("habits.signals.publish_habit_change") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                habit = self.create_habit(self.now)
+            publish.assert_called_once_with(habit.pk, habit.next_run_at)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                habit_id = habit.pk
+                habit.delete()
+            publish.assert_called_with(habit_id, None)
+
+    @patch("habits.scheduler.REDIS_URL", "redis://localhost")
+    def test_publish_pipeline(self):
+        """
+        Тестирование публикации пачки изменений одним обращением к Redis
+        """
+        with patch("habits.scheduler.get_redis") as get_redis:
+            publish_habit_changes([(1, self.now), (2, None)])
+        pipeline = get_redis.return_value.pipeline.return_value
+        self.assertEqual(pipeline.publish.call_count, 2)
+        pipeline.execute.assert_called_once_with()
+
+    @patch("habits.scheduler.REDIS_URL", "redis://localhost")
+    def test_redis_unavailable(self):
+        """
+        Тестирование изменения привычки при недоступном Redis: ошибки
+        оповещения после фиксации транзакции не доходят до запроса
+        """
+        client = redis.Redis(port=1, socket_connect_timeout=0.1)
+        cache_down = patch.object(cache, "incr", side_effect=redis.ConnectionError)
+        with patch("habits.scheduler.get_redis", return_value=client), cache_down:
+            with self.assertLogs("habits", "WARNING") as logs:
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.create_habit(self.now, is_public=True)
+        self.assertEqual(len(logs.records), 2)
+
+
+class HabitTimezoneTestCase(TestCase):
+
+    def setUp(self):
+        self.tz = ZoneInfo("Asia/Vladivostok")
+        self.user = User.objects.create(email="user1@example.com", timezone=self.tz.key)
+        self.habit = Habit.objects.create(
+            place="дома",
+            start_at=datetime.strptime("09:00", "%H:%M").time(),
+            action="сделать зарядку",
+            user=self.user,
+            runtime=timedelta(minutes=1),
+        )
+
+    def test_next_run_at(self):
+        """
+        Тестирование времени напоминания в часовом поясе пользователя
+        """
+        self.assertEqual(self.habit.execute_at, timezone.localdate(timezone=self.tz))
+        run_at = datetime.combine(self.habit.execute_at, self.habit.start_at, self.tz)
+        self.assertEqual(self.habit.next_run_at, run_at)
+
+        due = get_due_habits(run_at + timedelta(minutes=1))
+        self.assertIn(self.habit, due)
+        due = get_due_habits(run_at - timedelta(minutes=1))
+        self.assertNotIn(self.habit, due)
+
+    def test_timezone_change(self):
+        """
+        Тестирование пересчета напоминаний при смене часового пояса
+        """
+        user = User.objects.get(pk=self.user.pk)
+        user.timezone = "America/New_York"
+        with self.assertNumQueries(3):
+            user.save()
+
+        self.habit.refresh_from_db()
+        self.assertEqual(
+            self.habit.next_run_at,
+            datetime.combine(
+                self.habit.execute_at,
+                self.habit.start_at,
+                ZoneInfo("America/New_York"),
+            ),
+        )
+
+    def test_invalid_timezone(self):
+        """
+        Тестирование регистрации с неизвестным часовым поясом
+        """
+        url = reverse("users:register")
+        data = {"email": "user2@example.com", "password": "test", "timezone": "Mars"}
+        response = self.client.post(url, data=data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.json()["timezone"], ["Неизвестный часовой пояс: Mars."]
+        )
+
+
+class PublicHabitCacheTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email="user1@example.com")
+        for i in range(3):
+            Habit.objects.create(
+                place="здесь",
+                start_at=timezone.now().time(),
+                action=f"улыбаться {i}",
+                user=self.user,
+                runtime=timedelta(minutes=1),
+                is_public=True,
+            )
+        self.url = reverse("habits:public-habits")
+
+    def test_cache(self):
+        """
+        Тестирование кеширования списка публичных привычек
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.json()["results"]), 3)
+        etag = response["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.json()["results"]), 3)
+        self.assertEqual(response["ETag"], etag)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+        response = self.client.get(self.url, {"page_size": 2})
+        self.assertEqual(len(response.json()["results"]), 2)
+
+        counters = get_counters()
+        self.assertEqual(counters[PUBLIC_HABITS_HITS], 2)
+        self.assertEqual(counters[PUBLIC_HABITS_MISSES], 2)
+        self.assertEqual(counters[PUBLIC_HABITS_NOT_MODIFIED], 1)
+
+        self.client.force_authenticate(
+            User.objects.create(email="admin@example.com", is_staff=True)
+        )
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.json()["hit_ratio"]["public_habits_cache"], 0.5)
+
+    def test_invalidation(self):
+        """
+        Тестирование сброса кеша при изменении привычек
+        """
+        etag = self.client.get(self.url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Habit.objects.filter(is_public=True).first().delete()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["results"]), 2)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_private_habits_keep_cache(self):
+        """
+        Тестирование сохранения кеша при изменении непубличных привычек
+        """
+        etag = self.client.get(self.url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            habit = Habit.objects.create(
+                place="дома",
+                start_at=timezone.now().time(),
+                action="читать",
+                user=self.user,
+                runtime=timedelta(minutes=1),
+            )
+            habit = Habit.objects.get(pk=habit.pk)
+            habit.action = "читать книгу"
+            habit.save()
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                reverse("habits:habit-bulk-update"),
+                [{"id": habit.pk, "place": "в парке"}],
+                format="json",
+            )
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            habit = Habit.objects.get(pk=habit.pk)
+            habit.is_public = True
+            habit.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["results"]), 4)
+
+
+class DatabaseConnectionTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_connect_metrics(self):
+        """
+        Тестирование замера времени установки соединения с БД
+        """
+        wrapper_class = type(
+            "DatabaseWrapper",
+            (TimedConnectionMixin, sqlite3_base.DatabaseWrapper),
+            {},
+        )
+        wrapper = wrapper_class({**connection.settings_dict, "NAME": ":memory:"})
+        try:
+            wrapper.ensure_connection()
+            wrapper.ensure_connection()
+        finally:
+            wrapper.close()
+
+        counters = get_counters()
+        self.assertEqual(counters[DB_CONNECTIONS], 1)
+        self.assertGreater(counters[DB_CONNECT_TIME], 0)
+
+        self.client.force_authenticate(
+            User.objects.create(email="admin@example.com", is_staff=True)
+        )
+        response = self.client.get(reverse("metrics"))
+        self.assertGreater(response.json()["db_connect_ms_avg"], 0)
+
+    def test_connect_cache_outage(self):
+        """
+        Тестирование установки соединения с БД при недоступном кеше метрик:
+        счётчики отправляются в кеш позже
+        """
+        wrapper_class = type(
+            "DatabaseWrapper",
+            (TimedConnectionMixin, sqlite3_base.DatabaseWrapper),
+            {},
+        )
+        wrapper = wrapper_class({**connection.settings_dict, "NAME": ":memory:"})
+        error = ConnectionError("Redis недоступен")
+        with patch.object(cache, "incr", side_effect=error) as incr:
+            try:
+                wrapper.ensure_connection()
+            finally:
+                wrapper.close()
+            incr.assert_not_called()
+            with patch.object(cache, "add", side_effect=error):
+                metrics.flush()
+
+        self.assertEqual(get_counters()[DB_CONNECTIONS], 1)
+
+
+class CursorPaginationTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email="user1@example.com")
+        self.habits = [
+            Habit.objects.create(
+                place="здесь",
+                start_at=timezone.now().time(),
+                action=f"улыбаться {i}",
+                user=self.user,
+                runtime=timedelta(minutes=1),
+                is_public=True,
+            )
+            for i in range(12)
+        ]
+        self.client.force_authenticate(user=self.user)
+
+    def test_cursor_pagination(self):
+        """
+        Тестирование курсорной пагинации без подсчета количества записей
+        """
+        url = reverse("habits:habits")
+        ids = []
+        next_url = f"{url}?pagination=cursor"
+        while next_url:
+            with self.assertNumQueries(1):
+                data = self.client.get(next_url).json()
+            self.assertNotIn("count", data)
+            ids.extend(habit["id"] for habit in data["results"])
+            next_url = data["next"]
+
+        self.assertEqual(ids, [habit.pk for habit in reversed(self.habits)])
+
+    def test_public_cursor_pagination(self):
+        """
+        Тестирование курсорной пагинации публичных привычек
+        """
+        url = reverse("habits:public-habits")
+        first_page = self.client.get(url, {"pagination": "cursor"}).json()
+        second_page = self.client.get(first_page["next"]).json()
+        self.assertEqual(len(second_page["results"]), 5)
+        self.assertNotEqual(first_page["results"], second_page["results"])
+
+        # Постраничный режим по-прежнему возвращает количество записей
+        self.assertEqual(self.client.get(url).json()["count"], 12)
+
+
+class HabitBulkTestCase(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email="user1@example.com")
+        self.other_user = User.objects.create(email="user2@example.com")
+        self.pleasant_habit = Habit.objects.create(
+            place="дома",
+            start_at=timezone.now().time(),
+            action="выпить чай",
+            user=self.user,
+            runtime=timedelta(minutes=1),
+            is_pleasure=True,
+        )
+        self.other_habit = Habit.objects.create(
+            place="дома",
+            start_at=timezone.now().time(),
+            action="чужая привычка",
+            user=self.other_user,
+            runtime=timedelta(minutes=1),
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def make_items(self, count):
+        return [
+            {
+                "place": "дома",
+                "start_at": "08:00",
+                "action": f"сделать зарядку {i}",
+                "runtime": "00:01:00",
+                "related_habit": self.pleasant_habit.pk,
+            }
+            for i in range(count)
+        ]
+
+    def test_bulk_create(self):
+        """
+        Тестирование пакетного создания привычек
+        """
+        url = reverse("habits:habit-bulk-create")
+        # Связанные привычки читаются одним запросом, вставка и обновление
+        # сводки - по одному запросу внутри точки сохранения, независимо
+        # от размера пакета
+        with self.assertNumQueries(5):
+            self.client.post(url, data=self.make_items(2), format="json")
+        items = self.make_items(10)
+        items[3]["runtime"] = "00:03:00"
+        with self.assertNumQueries(5):
+            response = self.client.post(url, data=items, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        results = response.json()["results"]
+        self.assertEqual(
+            [result["status"] for result in results], [201] * 3 + [400] + [201] * 6
+        )
+        self.assertEqual(results[0]["data"]["related_habit"], self.pleasant_habit.pk)
+        habit = Habit.objects.get(pk=results[0]["data"]["id"])
+        self.assertEqual(habit.user, self.user)
+        self.assertEqual(habit.next_run_at, habit.get_next_run_at())
+
+    def test_bulk_update(self):
+        """
+        Тестирование пакетного изменения привычек
+        """
+        habits = [
+            Habit.objects.create(
+                place="дома",
+                start_at=timezone.now().time(),
+                action="сделать зарядку",
+                user=self.user,
+                runtime=timedelta(minutes=1),
+            )
+            for _ in range(3)
+        ]
+        items = [{"id": habit.pk, "start_at": "07:30"} for habit in habits]
+        items.append({"id": self.other_habit.pk, "action": "взлом"})
+        items.append({"id": habits[0].pk, "periodicity": 8})
+
+        url = reverse("habits:habit-bulk-update")
+        with self.assertNumQueries(4):
+            response = self.client.patch(url, data=items, format="json")
+
+        results = response.json()["results"]
+        self.assertEqual(
+            [result["status"] for result in results], [200] * 3 + [404, 400]
+        )
+        self.other_habit.refresh_from_db()
+        self.assertEqual(self.other_habit.action, "чужая привычка")
+        for habit in habits:
+            habit.refresh_from_db()
+            self.assertEqual(habit.start_at.strftime("%H:%M"), "07:30")
+            self.assertEqual(habit.next_run_at, habit.get_next_run_at())
+
+    def test_bulk_delete(self):
+        """
+        Тестирование пакетного удаления привычек
+        """
+        url = reverse("habits:habit-bulk-delete")
+        ids = [self.pleasant_habit.pk, self.other_habit.pk]
+        response = self.client.post(url, data=ids, format="json")
+
+        results = response.json()["results"]
+        self.assertEqual([result["status"] for result in results], [204, 404])
+        self.assertFalse(Habit.objects.filter(pk=self.pleasant_habit.pk).exists())
+        self.assertTrue(Habit.objects.filter(pk=self.other_habit.pk).exists())
+
+    def test_bulk_limit(self):
+        """
+        Тестирование ограничения размера пакета
+        """
+        url = reverse("habits:habit-bulk-create")
+        response = self.client.post(url, data=self.make_items(501), format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(url, data={"place": "дома"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class HabitQueryCountTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email="user1@example.com")
+        self.admin = User.objects.create(
+            email="admin@example.com", is_staff=True, is_superuser=True
+        )
+        self.pleasant_habit = Habit.objects.create(
+            place="дома",
+            start_at=timezone.now().time(),
+            action="выпить чай",
+            user=self.user,
+            runtime=timedelta(minutes=1),
+            is_pleasure=True,
+            is_public=True,
+        )
+        self.habits = [
+            Habit.objects.create(
+                place="здесь",
+                start_at=timezone.now().time(),
+                action=f"улыбаться {i}",
+                user=self.user,
+                runtime=timedelta(seconds=90),
+                related_habit=self.pleasant_habit,
+                is_public=True,
+            )
+            for i in range(12)
+        ]
+        self.client.force_authenticate(user=self.user)
+
+    def test_list_queries(self):
+        """
+        Тестирование постоянного числа запросов на страницу списка
+        независимо от ее размера
+        """
+        for name, user, queries in (
+            ("habits:habits", self.user, 2),
+            ("habits:habits", self.admin, 2),
+            ("habits:public-habits", self.user, 2),
+        ):
+            self.client.force_authenticate(user=user)
+            for page_size in (1, 10):
+                cache.clear()
+                with self.subTest(name=name, page_size=page_size):
+                    with self.assertNumQueries(queries):
+                        response = self.client.get(
+                            reverse(name), {"page_size": page_size}
+                        )
+                    self.assertEqual(len(response.json()["results"]), page_size)
+
+    def test_detail_queries(self):
+        """
+        Тестирование числа запросов при получении, изменении и удалении привычки
+        """
+        habit = self.habits[0]
+        with self.assertNumQueries(1):
+            self.client.get(reverse("habits:habit", args=(habit.pk,)))
+        with self.assertNumQueries(3):
+            self.client.patch(
+                reverse("habits:habit-update", args=(habit.pk,)),
+                {"related_habit": self.pleasant_habit.pk},
+            )
+
+    def test_other_user_queries(self):
+        """
+        Тестирование ответа 404 на чужую привычку одним запросом,
+        без загрузки самой привычки
+        """
+        habit = self.habits[0]
+        self.client.force_authenticate(User.objects.create(email="user2@example.com"))
+        for method, name in (
+            ("get", "habits:habit"),
+            ("patch", "habits:habit-update"),
+            ("delete", "habits:habit-delete"),
+        ):
+            with self.subTest(name=name):
+                with self.assertNumQueries(1) as queries:
+                    response = getattr(self.client, method)(
+                        reverse(name, args=(habit.pk,))
+                    )
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+                self.assertIn('"user_id" =', queries.captured_queries[0]["sql"])
+        self.assertTrue(Habit.objects.filter(pk=habit.pk).exists())
+
+    def test_values_representation(self):
+        """
+        Тестирование совпадения облегченной сериализации с HabitSerializer
+        """
+        response = self.client.get(reverse("habits:habits"), {"page_size": 10})
+        habits = Habit.objects.filter(
+            pk__in=[habit["id"] for habit in response.json()["results"]]
+        ).order_by("-id")
+        expected = HabitSerializer(habits, many=True).data
+        self.assertEqual(response.json()["results"], expected)
+        self.assertEqual(expected[0]["runtime"], "00:01:30")
+        self.assertEqual(expected[-1]["related_habit"], self.pleasant_habit.pk)
+
+
+class ORJSONTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email="user1@example.com")
+        self.habit = Habit.objects.create(
+            place="дома\u2028",
+            start_at=dt_time(8, 30),
+            action="сделать зарядку",
+            user=self.user,
+            runtime=timedelta(seconds=90),
+            is_public=True,
+        )
+        self.payloads = [
+            HabitSerializer(Habit.objects.all(), many=True).data,
+            {
+                "date": date(2024, 7, 1),
+                "time": dt_time(8, 30, 15),
+                "datetime": timezone.now(),
+                "runtime": timedelta(minutes=1),
+                "lazy": gettext_lazy("Привычка"),
+                1: None,
+            },
+        ]
+
+    def test_render(self):
+        """
+        Тестирование совпадения ответа orjson-рендерера со стандартным
+        """
+        for data in self.payloads:
+            expected = JSONRenderer().render(data)
+            self.assertEqual(ORJSONRenderer().render(data), expected)
+            with patch("config.renderers.orjson", None):
+                self.assertEqual(ORJSONRenderer().render(data), expected)
+        indented = ORJSONRenderer().render(
+            self.payloads[0], "application/json; indent=4"
+        )
+        self.assertIn(b"\n    ", indented)
+
+    def test_parse(self):
+        """
+        Тестирование разбора запроса orjson-парсером
+        """
+        body = '{"action": "прыгать", "items": [1, 2.5, null]}'.encode()
+        data = ORJSONParser().parse(io.BytesIO(body))
+        self.assertEqual(data, JSONParser().parse(io.BytesIO(body)))
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{"action": NaN}'))
+
+    def test_api(self):
+        """
+        Тестирование API с orjson-рендерером и парсером
+        """
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            reverse("habits:habit-create"),
+            data='{"place": "дома", "start_at": "07:15", "action": "бегать", '
+            '"runtime": "00:01:00"}',
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()["start_at"], "07:15")
+
+        response = self.client.get(reverse("habits:public-habits"))
+        habit = response.json()["results"][0]
+        self.assertEqual(
+            habit["execute_at"], self.habit.execute_at.strftime("%d/%m/%y")
+        )
+        self.assertEqual(habit["runtime"], "00:01:30")
+        self.assertIn(b"\\u2028", response.content)
+
+
+class AsyncHabitViewsTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        user_lru.clear()
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create(email="user1@example.com")
+        self.other_user = User.objects.create(email="user2@example.com")
+        self.habits = [
+            Habit.objects.create(
+                place="здесь",
+                start_at=timezone.now().time(),
+                action=f"улыбаться {i}",
+                user=self.user if i % 2 else self.other_user,
+                runtime=timedelta(minutes=1),
+                is_public=i % 3 == 0,
+            )
+            for i in range(9)
+        ]
+
+    def get(self, view, path, user=None, **kwargs):
+        headers = {}
+        if user is not None:
+            headers["HTTP_AUTHORIZATION"] = f"Bearer {AccessToken.for_user(user)}"
+        request = self.factory.get(path, **headers)
+        if iscoroutinefunction(view):
+            view = async_to_sync(view)
+        response = view(request, **kwargs)
+        if hasattr(response, "render"):
+            response.render()
+        return response
+
+    def assertSameResponse(self, sync_view, async_view, path, user=None, **kwargs):
+        expected = self.get(sync_view, path, user, **kwargs)
+        response = self.get(async_view, path, user, **kwargs)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(json.loads(response.content), json.loads(expected.content))
+        return response
+
+    def test_habit_list(self):
+        """
+        Тестирование совпадения асинхронного списка привычек с синхронным
+        """
+        sync_view = HabitListAPIView.as_view()
+        async_view = HabitListAsyncAPIView.as_view()
+        for path in ("/habits/", "/habits/?page=2&page_size=2", "/habits/?page=9"):
+            self.assertSameResponse(sync_view, async_view, path, self.user)
+        first_page = self.assertSameResponse(
+            sync_view, async_view, "/habits/?pagination=cursor&page_size=2", self.user
+        )
+        self.assertSameResponse(
+            sync_view, async_view, json.loads(first_page.content)["next"], self.user
+        )
+        response = self.assertSameResponse(sync_view, async_view, "/habits/")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response["WWW-Authenticate"], 'Bearer realm="api"')
+
+    def test_habit_retrieve(self):
+        """
+        Тестирование совпадения асинхронного просмотра привычки с синхронным
+        """
+        sync_view = HabitRetrieveAPIView.as_view()
+        async_view = HabitRetrieveAsyncAPIView.as_view()
+        for habit in self.habits[:2]:
+            self.assertSameResponse(sync_view, async_view, "/", self.user, pk=habit.pk)
+        response = self.assertSameResponse(sync_view, async_view, "/", self.user, pk=0)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_public_habit_list(self):
+        """
+        Тестирование асинхронного списка публичных привычек с кешем
+        """
+        sync_view = PublicHabitListAPIView.as_view()
+        async_view = PublicHabitListAsyncAPIView.as_view()
+        expected = self.get(sync_view, "/habits/public/")
+        cache.clear()
+        response = self.get(async_view, "/habits/public/")
+        self.assertEqual(json.loads(response.content), expected.data)
+        self.assertEqual(response["ETag"], expected["ETag"])
+
+        with self.assertNumQueries(0):
+            response = self.get(async_view, "/habits/public/")
+        request = self.factory.get(
+            "/habits/public/", HTTP_IF_NONE_MATCH=expected["ETag"]
+        )
+        response = async_to_sync(async_view)(request)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_jwt(self):
+        """
+        Тестирование JWT-аутентификации асинхронных контроллеров
+        """
+        view = HabitListAsyncAPIView.as_view()
+        token = AccessToken.for_user(self.user)
+        request = self.factory.get("/habits/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        response = async_to_sync(view)(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content)["count"], 4)
+
+        request = self.factory.get("/habits/", HTTP_AUTHORIZATION="Bearer invalid")
+        response = async_to_sync(view)(request)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(json.loads(response.content)["code"], "token_not_valid")
+
+
+class HabitExportTestCase(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email="user1@example.com")
+        self.other_user = User.objects.create(email="user2@example.com")
+        self.habits = [
+            Habit.objects.create(
+                place="дома, на кухне",
+                start_at=timezone.now().time(),
+                action=f"улыбаться {i}",
+                user=self.user if i < 5 else self.other_user,
+                runtime=timedelta(minutes=1),
+            )
+            for i in range(7)
+        ]
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("habits:habit-export")
+
+    def export(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_asgi(self):
+        """
+        Тестирование асинхронной потоковой выгрузки под ASGI
+        """
+        token = AccessToken.for_user(self.user)
+
+        async def export():
+            response = await self.async_client.get(
+                self.url, {"export_format": "csv"}, AUTHORIZATION=f"Bearer {token}"
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(response.is_async)
+            return b"".join([chunk async for chunk in response.streaming_content])
+
+        self.assertEqual(
+            async_to_sync(export)().decode(), self.export(export_format="csv")
+        )
+
+    def test_ndjson(self):
+        """
+        Тестирование выгрузки привычек пользователя в формате NDJSON
+        """
+        lines = self.export().splitlines()
+        expected = HabitSerializer(self.habits[:5], many=True).data
+        self.assertEqual([json.loads(line) for line in lines], expected)
+
+    def test_csv(self):
+        """
+        Тестирование выгрузки привычек пользователя в формате CSV
+        """
+        rows = list(csv.DictReader(io.StringIO(self.export(export_format="csv"))))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]["place"], "дома, на кухне")
+        self.assertEqual(rows[0]["runtime"], "00:01:00")
+        self.assertEqual(rows[0]["related_habit"], "")
+
+        response = self.client.get(self.url, {"export_format": "xml"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_superuser_export(self):
+        """
+        Тестирование выгрузки всех привычек суперпользователем
+        """
+        self.client.force_authenticate(
+            User.objects.create(email="admin@example.com", is_superuser=True)
+        )
+        self.assertEqual(len(self.export().splitlines()), 7)
+
+    def test_keyset_chunks(self):
+        """
+        Тестирование выгрузки пачками по первичному ключу
+        без серверных курсоров
+        """
+        queryset = Habit.objects.all()
+        expected = list(iter_habit_rows(queryset, chunk_size=3))
+        with patch.dict(connection.settings_dict, DISABLE_SERVER_SIDE_CURSORS=True):
+            with self.assertNumQueries(3):
+                rows = list(iter_habit_rows(queryset, chunk_size=3))
+        self.assertEqual(rows, expected)
+        self.assertEqual(
+            [row["id"] for row in rows], [habit.pk for habit in self.habits]
+        )
+
+
+class HabitImportTestCase(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email="user1@example.com")
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("habits:habit-import")
+
+    def post(self, content, content_type="application/x-ndjson", **params):
+        url = self.url
+        if params:
+            url += "?" + "&".join(f"{key}={value}" for key, value in params.items())
+        response = self.client.generic("POST", url, content, content_type)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_ndjson(self):
+        """
+        Тестирование импорта привычек из NDJSON с отчётом об ошибках по строкам
+        """
+        related = Habit.objects.create(
+            place="дома",
+            start_at=timezone.now().time(),
+            action="съесть конфету",
+            user=self.user,
+            runtime=timedelta(minutes=1),
+            is_pleasure=True,
+        )
+        lines = [
+            {
+                "place": "дома",
+                "start_at": "08:00",
+                "action": "зарядка",
+                "runtime": "00:01:00",
+                "related_habit": related.pk,
+            },
+            {
+                "place": "дома",
+                "start_at": "08:00",
+                "action": "зарядка",
+                "runtime": "00:05:00",
+            },
+            "не привычка",
+            {
+                "place": "дома",
+                "start_at": "08:00",
+                "action": "зарядка",
+                "runtime": "00:01:00",
+                "reward": "чай",
+                "related_habit": related.pk,
+            },
+            {"place": "дома", "action": "зарядка", "runtime": "00:01:00"},
+            {
+                "place": "дома",
+                "start_at": "09:00",
+                "action": "бег",
+                "runtime": "00:02:00",
+                "is_public": True,
+            },
+        ]
+        content = "\n".join(json.dumps(line, ensure_ascii=False) for line in lines)
+        report = self.post((content + "\n{не json").encode())
+
+        self.assertEqual(report["created"], 2)
+        self.assertEqual(report["error_count"], 5)
+        self.assertEqual([error["line"] for error in report["errors"]], [2, 3, 4, 5, 7])
+        self.assertIn("start_at", report["errors"][3]["errors"])
+        self.assertIn("non_field_errors", report["errors"][0]["errors"])
+
+        habits = Habit.objects.filter(user=self.user).exclude(pk=related.pk)
+        self.assertEqual(habits.count(), 2)
+        habit = habits.get(action="зарядка")
+        self.assertEqual(habit.related_habit, related)
+        self.assertEqual(habit.execute_at, timezone.localdate())
+        self.assertIsNotNone(habit.next_run_at)
+
+    def test_csv_round_trip(self):
+        """
+        Тестирование импорта CSV, выгруженного другим пользователем
+        """
+        other_user = User.objects.create(email="user2@example.com")
+        for i in range(3):
+            Habit.objects.create(
+                place="дома, на кухне",
+                start_at=timezone.now().time(),
+                action=f"улыбаться {i}",
+                user=other_user,
+                runtime=timedelta(minutes=1),
+                is_public=i == 0,
+            )
+        self.client.force_authenticate(user=other_user)
+        response = self.client.get(
+            reverse("habits:habit-export"), {"export_format": "csv"}
+        )
+        content = b"".join(response.streaming_content)
+
+        self.client.force_authenticate(user=self.user)
+        report = self.post(content, content_type="text/csv")
+        self.assertEqual(report, {"created": 3, "error_count": 0, "errors": []})
+        habits = Habit.objects.filter(user=self.user).order_by("pk")
+        self.assertEqual(
+            [habit.action for habit in habits],
+            ["улыбаться 0", "улыбаться 1", "улыбаться 2"],
+        )
+        self.assertEqual(habits[0].place, "дома, на кухне")
+        self.assertTrue(habits[0].is_public)
+
+    def test_chunks(self):
+        """
+        Тестирование импорта пачками: ошибки не мешают остальным строкам,
+        отчёт ограничен max_errors
+        """
+        rows = [
+            (
+                line,
+                {
+                    "place": "дома",
+                    "start_at": "08:00",
+                    "action": f"зарядка {line}",
+                    "runtime": "00:05:00" if line % 2 else "00:01:00",
+                },
+            )
+            for line in range(1, 11)
+        ]
+        importer = HabitImporter(self.user, chunk_size=3, max_errors=2).run(rows)
+        self.assertEqual(importer.created, 5)
+        self.assertEqual(importer.error_count, 5)
+        self.assertEqual([error["line"] for error in importer.errors], [1, 3])
+
+    def test_batch_rules(self):
+        """
+        Тестирование проверки пачки по столбцам: те же ошибки, что у
+        валидаторов сериализатора, и запрет чужой связанной привычки
+        """
+        pleasant, useful = [
+            Habit.objects.create(
+                place="дома",
+                start_at=timezone.now().time(),
+                action=action,
+                user=self.user,
+                runtime=timedelta(minutes=1),
+                is_pleasure=is_pleasure,
+            )
+            for action, is_pleasure in (("съесть конфету", True), ("бег", False))
+        ]
+        foreign = Habit.objects.create(
+            place="дома",
+            start_at=timezone.now().time(),
+            action="выпить чай",
+            user=User.objects.create(email="user2@example.com"),
+            runtime=timedelta(minutes=1),
+            is_pleasure=True,
+        )
+        rows = [
+            {"runtime": timedelta(minutes=1), "periodicity": 1},
+            {"runtime": timedelta(minutes=5), "periodicity": 8},
+            {"related_habit": pleasant, "reward": "чай"},
+            {"related_habit": useful},
+            {"is_pleasure": True, "reward": "чай"},
+            {"is_pleasure": True, "related_habit": pleasant},
+        ]
+        expected = {}
+        for index, attrs in enumerate(rows):
+            for validator in HabitSerializer.Meta.validators:
+                try:
+                    validator(attrs)
+                except ValidationError as exc:
+                    expected.setdefault(index, []).extend(exc.detail)
+        self.assertEqual(validate_batch(rows, self.user), expected)
+        self.assertEqual(list(expected), [1, 2, 3, 4, 5])
+        self.assertEqual(len(expected[1]), 2)
+
+        errors = validate_batch([{"related_habit": foreign}], self.user)
+        self.assertEqual(
+            errors, {0: ["Связанная привычка должна принадлежать пользователю."]}
+        )
+
+    def test_format(self):
+        """
+        Тестирование проверки формата и наличия файла импорта
+        """
+        response = self.client.generic(
+            "POST", self.url + "?import_format=xml", b"", "text/plain"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        line = {
+            "place": "дома",
+            "start_at": "08:00",
+            "action": "зарядка",
+            "runtime": "00:01:00",
+        }
+        upload = io.BytesIO(json.dumps(line).encode())
+        upload.name = "habits.ndjson"
+        response = self.client.post(self.url, {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["created"], 1)
+
+
+class HabitStatsTestCase(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email="user1@example.com")
+        self.other_user = User.objects.create(email="user2@example.com")
+        self.habit = Habit.objects.create(
+            place="дома",
+            start_at=datetime.min.time(),
+            action="сделать зарядку",
+            user=self.user,
+            runtime=timedelta(minutes=1),
+            periodicity=2,
+        )
+        self.today = timezone.localdate()
+        self.client.force_authenticate(user=self.user)
+
+    def done(self, days_ago=None, habit=None):
+        data = {}
+        if days_ago is not None:
+            data["date"] = str(self.today - timedelta(days=days_ago))
+        url = reverse("habits:habit-done", args=[(habit or self.habit).pk])
+        return self.client.post(url, data)
+
+    def test_streaks(self):
+        """
+        Тестирование серий выполнений с учётом периодичности привычки
+        """
+        for days_ago in (10, 8, 6, 3, 1):
+            self.assertEqual(self.done(days_ago).status_code, status.HTTP_201_CREATED)
+        response = self.done()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            response.json(),
+            {
+                "habit": self.habit.pk,
+                "due_count": 0,
+                "done_count": 6,
+                "current_streak": 3,
+                "best_streak": 3,
+                "last_done_on": str(self.today),
+                "completion_rate": None,
+            },
+        )
+
+        # Повторная отметка и отметка задним числом не меняют серию
+        self.assertEqual(self.done().status_code, status.HTTP_200_OK)
+        response = self.done(days_ago=5)
+        self.assertEqual(response.json()["done_count"], 7)
+        self.assertEqual(response.json()["current_streak"], 3)
+        self.assertEqual(
+            HabitEvent.objects.filter(habit=self.habit, kind=HabitEvent.DONE).count(),
+            7,
+        )
+
+        response = self.done(days_ago=-1)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_broken_streak(self):
+        """
+        Тестирование прерывания серии при пропуске срока выполнения
+        """
+        self.done(days_ago=5)
+        self.done(days_ago=4)
+        response = self.client.get(reverse("habits:habit-stats", args=[self.habit.pk]))
+        self.assertEqual(response.json()["current_streak"], 0)
+        self.assertEqual(response.json()["best_streak"], 2)
+
+    def test_reminder_due(self):
+        """
+        Тестирование учёта сроков выполнения при постановке напоминаний
+        """
+        Habit.objects.filter(pk=self.habit.pk).update(
+            next_run_at=timezone.now() - timedelta(minutes=1)
+        )
+        send_due_reminders()
+        self.done()
+        send_due_reminders(pk=self.habit.pk)
+
+        event = HabitEvent.objects.get(habit=self.habit, kind=HabitEvent.DUE)
+        self.assertEqual(event.date, self.today)
+        stats = HabitStats.objects.get(habit=self.habit)
+        self.assertEqual(stats.due_count, 1)
+        self.assertEqual(stats.completion_rate, 1.0)
+
+    def test_record_due_once(self):
+        """
+        Тестирование повторной записи срока выполнения: счётчик сроков
+        увеличивается только для новых дат
+        """
+        yesterday = self.today - timedelta(days=1)
+        record_due([(self.habit, self.today)])
+        record_due([(self.habit, self.today), (self.habit, yesterday)])
+        record_due([(self.habit, yesterday)])
+
+        stats = HabitStats.objects.get(habit=self.habit)
+        self.assertEqual(stats.due_count, 2)
+        self.assertEqual(
+            HabitEvent.objects.filter(habit=self.habit, kind=HabitEvent.DUE).count(),
+            2,
+        )
+
+    def test_stats_reads(self):
+        """
+        Тестирование чтения статистики: одна строка на привычку
+        без обращения к истории событий
+        """
+        habits = [self.habit] + [
+            Habit.objects.create(
+                place="дома",
+                start_at=datetime.min.time(),
+                action=f"сделать зарядку {i}",
+                user=self.user,
+                runtime=timedelta(minutes=1),
+            )
+            for i in range(3)
+        ]
+        for habit in habits[:2]:
+            self.done(habit=habit)
+
+        url = reverse("habits:habit-stats", args=[habits[-1].pk])
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.json()["done_count"], 0)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("habits:habit-stats-list"))
+        results = response.json()["results"]
+        self.assertEqual([item["done_count"] for item in results], [0, 0, 1, 1])
+
+    def test_other_user(self):
+        """
+        Тестирование недоступности статистики чужой привычки
+        """
+        self.client.force_authenticate(user=self.other_user)
+        self.assertEqual(self.done().status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(reverse("habits:habit-stats", args=[self.habit.pk]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(HabitEvent.objects.exists())
+
+
+class HabitSummaryTestCase(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email="user1@example.com")
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("habits:habit-summary")
+
+    def create_habit(self, **kwargs):
+        return Habit.objects.create(
+            place="дома",
+            start_at=dt_time(23, 59),
+            action="сделать зарядку",
+            user=self.user,
+            runtime=timedelta(minutes=1),
+            **kwargs,
+        )
+
+    def assertSummaryConsistent(self):
+        summary = HabitSummary.objects.get(user=self.user)
+        expected = rebuild_summary(self.user.pk)
+        for field in ("useful_count", "pleasant_count", "public_count"):
+            self.assertEqual(getattr(summary, field), getattr(expected, field))
+        return expected
+
+    def test_summary(self):
+        """
+        Тестирование сводки привычек одним запросом
+        """
+        self.assertEqual(
+            self.client.get(self.url).json(),
+            {
+                "useful_count": 0,
+                "pleasant_count": 0,
+                "public_count": 0,
+                "due_today_count": 0,
+                "next_due_at": None,
+            },
+        )
+
+        today = self.create_habit(is_public=True)
+        later = self.create_habit()
+        later.schedule(timezone.localdate() + timedelta(days=3))
+        later.save()
+        self.create_habit(is_pleasure=True, is_public=True)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        data = response.json()
+        self.assertEqual(data["useful_count"], 2)
+        self.assertEqual(data["pleasant_count"], 1)
+        self.assertEqual(data["public_count"], 2)
+        self.assertEqual(data["due_today_count"], 1)
+        self.assertEqual(
+            data["next_due_at"],
+            HabitSerializer()
+            .fields["next_run_at"]
+            .to_representation(today.next_run_at),
+        )
+
+    def test_incremental_updates(self):
+        """
+        Тестирование инкрементального обновления сводки при изменении,
+        пакетных операциях, импорте и удалении привычек
+        """
+        habits = [self.create_habit() for _ in range(3)]
+        self.client.get(self.url)
+
+        self.client.patch(
+            reverse("habits:habit-update", args=[habits[0].pk]), {"is_public": True}
+        )
+        self.assertEqual(self.assertSummaryConsistent().public_count, 1)
+
+        self.client.post(
+            reverse("habits:habit-bulk-create"),
+            [
+                {
+                    "place": "дома",
+                    "start_at": "08:00",
+                    "action": "выпить чай",
+                    "runtime": "00:01:00",
+                    "is_pleasure": True,
+                    "is_public": True,
+                },
+            ],
+            format="json",
+        )
+        self.client.patch(
+            reverse("habits:habit-bulk-update"),
+            [{"id": habits[1].pk, "is_pleasure": True}],
+            format="json",
+        )
+        self.assertEqual(self.assertSummaryConsistent().pleasant_count, 2)
+
+        HabitImporter(self.user).run(
+            [
+                (
+                    1,
+                    {
+                        "place": "дома",
+                        "start_at": "08:00",
+                        "action": "бег",
+                        "runtime": "00:01:00",
+                        "is_public": True,
+                    },
+                )
+            ]
+        )
+        self.assertSummaryConsistent()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(
+                reverse("habits:habit-bulk-delete"),
+                [habit.pk for habit in habits],
+                format="json",
+            )
+        # Изменения от сигналов удаления применяются одним запросом
+        summary_queries = [query for query in queries if "habitsummary" in query["sql"]]
+        self.assertEqual(len(summary_queries), 1)
+        summary = self.assertSummaryConsistent()
+        self.assertEqual(
+            (summary.useful_count, summary.pleasant_count, summary.public_count),
+            (1, 1, 2),
+        )
+
+
+class PublicHabitFilterTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email="user1@example.com")
+        self.habits = [
+            Habit.objects.create(
+                place=place,
+                start_at=dt_time(hour),
+                action=action,
+                user=self.user,
+                runtime=timedelta(minutes=1),
+                periodicity=periodicity,
+                is_pleasure=is_pleasure,
+                is_public=is_public,
+            )
+            for place, hour, action, periodicity, is_pleasure, is_public in (
+                ("парк", 7, "бегать", 1, False, True),
+                ("дома", 8, "делать зарядку", 2, False, True),
+                ("кухня", 9, "пить чай", 1, True, True),
+                ("дома", 21, "читать книгу", 7, False, True),
+                ("дома", 8, "делать зарядку тайно", 1, False, False),
+            )
+        ]
+        self.url = reverse("habits:public-habits")
+
+    def get_actions(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [habit["action"] for habit in response.json()["results"]]
+
+    def test_search_order(self):
+        """
+        Тестирование сохранения порядка результатов поиска при постраничной
+        пагинации и отказа в курсорной пагинации для поиска
+        """
+
+        def filter_search(filterset, queryset, name, value):
+            # Порядок по релевантности, как у поиска в PostgreSQL
+            return queryset.annotate(rank=Length("action")).order_by("-rank", "-id")
+
+        with patch.object(PublicHabitFilter, "filter_search", filter_search):
+            self.assertEqual(
+                self.get_actions(search="x", page_size=10),
+                ["делать зарядку", "читать книгу", "пить чай", "бегать"],
+            )
+        for params in ({"pagination": "cursor"}, {"cursor": "abc"}):
+            response = self.client.get(self.url, {"search": "чай", **params})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("pagination", response.json())
+
+    def test_filters(self):
+        """
+        Тестирование фильтров списка публичных привычек
+        """
+        self.assertEqual(
+            self.get_actions(is_pleasure=True),
+            ["пить чай"],
+        )
+        self.assertEqual(
+            self.get_actions(periodicity__gte=2),
+            ["читать книгу", "делать зарядку"],
+        )
+        self.assertEqual(
+            self.get_actions(start_at_after="08:00", start_at_before="09:00"),
+            ["пить чай", "делать зарядку"],
+        )
+        self.assertEqual(
+            self.get_actions(search="дома", is_pleasure=False, periodicity=2),
+            ["делать зарядку"],
+        )
+        self.assertEqual(self.get_actions(search="зарядку"), ["делать зарядку"])
+
+        response = self.client.get(self.url, {"periodicity": "каждый день"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("periodicity", response.json())
+
+    def test_async_filters(self):
+        """
+        Тестирование совпадения фильтров асинхронного списка с синхронным
+        """
+        factory = APIRequestFactory()
+        sync_view = PublicHabitListAPIView.as_view()
+        async_view = async_to_sync(PublicHabitListAsyncAPIView.as_view())
+        for query in ("is_pleasure=false&start_at_after=08:00", "periodicity=x"):
+            path = f"{self.url}?{query}"
+            expected = sync_view(factory.get(path)).render()
+            cache.clear()
+            response = async_view(factory.get(path))
+            cache.clear()
+            self.assertEqual(response.status_code, expected.status_code)
+            self.assertEqual(json.loads(response.content), json.loads(expected.content))
+
+    def test_cache_key(self):
+        """
+        Тестирование кеширования страниц с разными фильтрами под разными ключами
+        """
+        self.assertEqual(len(self.get_actions()), 4)
+        self.assertEqual(self.get_actions(is_pleasure=True), ["пить чай"])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_actions(is_pleasure="true"), ["пить чай"])
+
+
+class ReminderDigestTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.digest_user = User.objects.create(
+            email="user1@example.com", tg_chat_id="1", reminder_digest=True
+        )
+        self.user = User.objects.create(email="user2@example.com", tg_chat_id="2")
+        self.habits = [
+            Habit.objects.create(
+                place="дома",
+                start_at=datetime.min.time(),
+                action=f"сделать зарядку {i}",
+                user=self.digest_user if i < 3 else self.user,
+                runtime=timedelta(minutes=1),
+            )
+            for i in range(5)
+        ]
+
+    def test_digest(self):
+        """
+        Тестирование одного сводного сообщения на чат в режиме сводки
+        """
+        with patch("habits.tasks.drain_reminder_outbox") as drain:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(send_due_reminders(), 3)
+        drain.delay.assert_called_once()
+
+        digest = ReminderOutbox.objects.get(chat_id="1")
+        self.assertIsNone(digest.habit)
+        for habit in self.habits[:3]:
+            self.assertIn(build_reminder_message(habit), digest.text)
+        self.assertEqual(
+            sorted(
+                ReminderOutbox.objects.filter(chat_id="2").values_list(
+                    "habit_id", flat=True
+                )
+            ),
+            [habit.pk for habit in self.habits[3:]],
+        )
+
+        counters = get_counters()
+        self.assertEqual(counters[REMINDER_HABITS], 5)
+        self.assertEqual(counters[REMINDER_MESSAGES], 3)
+
+    def test_digest_shards(self):
+        """
+        Тестирование одной сводки, если привычки пользователя
+        не идут подряд по идентификаторам
+        """
+        for i in range(2):
+            Habit.objects.create(
+                place="дома",
+                start_at=datetime.min.time(),
+                action=f"читать {i}",
+                user=self.digest_user,
+                runtime=timedelta(minutes=1),
+            )
+        with patch("habits.tasks.drain_reminder_outbox"):
+            for shard in get_shards(timezone.now(), size=2):
+                send_habit_reminder_shard(*shard)
+        self.assertEqual(ReminderOutbox.objects.filter(chat_id="1").count(), 1)
+        self.assertEqual(ReminderOutbox.objects.filter(chat_id="2").count(), 2)
+
+    def test_single_habit(self):
+        """
+        Тестирование обычного напоминания, если в режиме сводки наступила
+        одна привычка
+        """
+        send_due_reminders(pk=self.habits[0].pk)
+        reminder = ReminderOutbox.objects.get()
+        self.assertEqual(reminder.habit, self.habits[0])
+        self.assertEqual(reminder.text, build_reminder_message(self.habits[0]))
+
+    def test_message_limit(self):
+        """
+        Тестирование разбиения сводки по ограничению длины сообщения
+        """
+        messages = [f"сообщение {i} " + "x" * 30 for i in range(10)]
+        digests = build_digest_messages(messages, limit=150)
+        self.assertGreater(len(digests), 1)
+        self.assertTrue(all(len(digest) <= 150 for digest in digests))
+        text = "".join(digests)
+        self.assertTrue(all(message in text for message in messages))
+
+
+class ReminderTextTestCase(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email="user1@example.com")
+        self.pleasant_habit = Habit.objects.create(
+            place="дома",
+            start_at=dt_time(9, 0),
+            action="выпить чай",
+            user=self.user,
+            runtime=timedelta(minutes=1),
+            is_pleasure=True,
+        )
+        self.habit = Habit.objects.create(
+            place="в парке",
+            start_at=dt_time(8, 0),
+            action="сделать зарядку",
+            user=self.user,
+            runtime=timedelta(minutes=1),
+            related_habit=self.pleasant_habit,
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def get_message(self, habit):
+        return build_reminder_message(get_due_habits(timezone.now()).get(pk=habit.pk))
+
+    def test_reminder_text(self):
+        """
+        Тестирование текста напоминания из закешированных текстов привычек
+        """
+        self.assertEqual(
+            self.habit.reminder_text, "Я буду сделать зарядку в 08:00:00 в парке."
+        )
+        self.assertEqual(
+            self.get_message(self.habit),
+            "Я буду сделать зарядку в 08:00:00 в парке. "
+            "Я буду выпить чай в 09:00:00 дома.",
+        )
+
+        self.habit.related_habit = None
+        self.habit.reward = "съесть конфету"
+        self.habit.save()
+        self.assertEqual(
+            self.get_message(self.habit),
+            "Я буду сделать зарядку в 08:00:00 в парке. "
+            "А сразу после этого могу съесть конфету.",
+        )
+
+    def test_related_habit_change(self):
+        """
+        Тестирование напоминания после изменения связанной привычки:
+        зависящие от неё привычки не пересчитываются
+        """
+        self.pleasant_habit.action = "выпить кофе"
+        with CaptureQueriesContext(connection) as queries:
+            self.pleasant_habit.save(update_fields=["action"])
+        self.assertEqual(len(queries), 1)
+
+        self.assertEqual(
+            self.get_message(self.habit),
+            "Я буду сделать зарядку в 08:00:00 в парке. "
+            "Я буду выпить кофе в 09:00:00 дома.",
+        )
+
+    def test_update(self):
+        """
+        Тестирование пересчёта текста при изменении и пакетном изменении
+        привычки и скрытия текста в API
+        """
+        response = self.client.patch(
+            reverse("habits:habit-update", args=[self.habit.pk]),
+            {"place": "на балконе"},
+            format="json",
+        )
+        self.assertNotIn("reminder_text", response.json())
+        self.habit.refresh_from_db()
+        self.assertEqual(
+            self.habit.reminder_text, "Я буду сделать зарядку в 08:00:00 на балконе."
+        )
+
+        self.client.patch(
+            reverse("habits:habit-bulk-update"),
+            [{"id": self.habit.pk, "start_at": "07:30"}],
+            format="json",
+        )
+        self.habit.refresh_from_db()
+        self.assertEqual(
+            self.habit.reminder_text, "Я буду сделать зарядку в 07:30:00 на балконе."
+        )
+
+    def test_empty_reminder_text(self):
+        """
+        Тестирование напоминания о привычке без закешированного текста
+        """
+        Habit.objects.update(reminder_text=None)
+        self.assertEqual(
+            self.get_message(self.habit),
+            "Я буду сделать зарядку в 08:00:00 в парке. "
+            "Я буду выпить чай в 09:00:00 дома.",
+        )
+
+
+class TelegramWebhookTestCase(APITransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        patcher = patch("habits.bot.TELEGRAM_WEBHOOK_SECRET", "secret")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.telegram = FakeTelegramServer()
+        self.addCleanup(self.telegram.server_close)
+        self.url = reverse("habits:telegram-webhook")
+
+        self.user = User.objects.create(email="user1@example.com", tg_chat_id="100")
+        self.habit = Habit.objects.create(
+            place="дома",
+            start_at=dt_time(8, 0),
+            action="сделать зарядку",
+            user=self.user,
+            runtime=timedelta(minutes=1),
+        )
+
+    def post_update(self, update, secret="secret"):
+        return self.client.post(
+            self.url,
+            update,
+            format="json",
+            HTTP_X_TELEGRAM_BOT_API_SECRET_TOKEN=secret,
+        )
+
+    def test_link_chat(self):
+        """
+        Тестирование привязки чата по ссылке на бота
+        """
+        other_user = User.objects.create(email="user2@example.com", tg_chat_id="200")
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(reverse("users:telegram-link"))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        token = response.json()["url"].rsplit("start=", 1)[1]
+
+        response = self.post_update(
+            self.telegram.message_update(200, f"/start {token}")
+        )
+        self.assertEqual(response.json()["method"], "sendMessage")
+        self.assertEqual(response.json()["chat_id"], "200")
+        self.user.refresh_from_db()
+        other_user.refresh_from_db()
+        self.assertEqual(self.user.tg_chat_id, "200")
+        self.assertIsNone(other_user.tg_chat_id)
+
+        # Токен одноразовый
+        self.post_update(self.telegram.message_update(300, f"/start {token}"))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.tg_chat_id, "200")
+
+    def test_secret(self):
+        """
+        Тестирование отклонения запросов без секрета вебхука
+        """
+        update = self.telegram.callback_update(100, f"done:{self.habit.pk}")
+        response = self.post_update(update, secret="wrong")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(HabitEvent.objects.exists())
+
+    def test_done(self):
+        """
+        Тестирование отметки выполнения кнопкой под напоминанием
+        и отбрасывания повторно доставленного обновления
+        """
+        update = self.telegram.callback_update(100, f"done:{self.habit.pk}")
+        response = self.post_update(update)
+        self.assertEqual(
+            response.json(),
+            {
+                "method": "answerCallbackQuery",
+                "callback_query_id": update["callback_query"]["id"],
+                "text": "Выполнение отмечено.",
+            },
+        )
+        self.assertEqual(HabitStats.objects.get(habit=self.habit).done_count, 1)
+
+        counters = get_counters()
+        response = self.post_update(update)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(
+            get_counters()[TELEGRAM_DUPLICATES], counters[TELEGRAM_DUPLICATES] + 1
+        )
+        self.assertEqual(
+            get_counters()[TELEGRAM_UPDATES], counters[TELEGRAM_UPDATES] + 1
+        )
+
+        response = self.post_update(
+            self.telegram.callback_update(100, f"done:{self.habit.pk}")
+        )
+        self.assertEqual(response.json()["text"], "Выполнение уже отмечено.")
+        self.assertEqual(HabitStats.objects.get(habit=self.habit).done_count, 1)
+
+    def test_snooze(self):
+        """
+        Тестирование откладывания напоминания
+        """
+        text = self.habit.get_reminder_message()
+        self.post_update(
+            self.telegram.callback_update(100, f"snooze:{self.habit.pk}", text)
+        )
+        reminder = ReminderOutbox.objects.get()
+        self.assertEqual(reminder.habit, self.habit)
+        self.assertEqual(reminder.text, text)
+        self.assertGreater(
+            reminder.available_at, timezone.now() + timedelta(minutes=10)
+        )
+
+    def test_foreign_chat(self):
+        """
+        Тестирование нажатия кнопки из чата, не привязанного к владельцу привычки
+        """
+        response = self.post_update(
+            self.telegram.callback_update(200, f"done:{self.habit.pk}")
+        )
+        self.assertEqual(response.json()["text"], "Привычка не найдена.")
+        self.assertFalse(HabitEvent.objects.exists())
+
+    def test_asgi_application(self):
+        """
+        Тестирование ASGI-приложения вебхука без middleware Django
+        """
+
+        async def call(body, method="POST", secret=b"secret"):
+            messages = []
+
+            async def receive():
+                return {"type": "http.request", "body": body}
+
+            async def send(message):
+                messages.append(message)
+
+            scope = {
+                "type": "http",
+                "method": method,
+                "path": self.url,
+                "headers": [(b"x-telegram-bot-api-secret-token", secret)],
+            }
+            await telegram_webhook_application(scope, receive, send)
+            return messages[0]["status"], messages[1]["body"]
+
+        update = self.telegram.callback_update(100, f"done:{self.habit.pk}")
+        body = json.dumps(update).encode()
+        status_code, content = async_to_sync(call)(body)
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(content)["text"], "Выполнение отмечено.")
+        self.assertEqual(async_to_sync(call)(body), (status.HTTP_200_OK, b""))
+        self.assertEqual(
+            async_to_sync(call)(body, secret=b"wrong")[0], status.HTTP_403_FORBIDDEN
+        )
+        self.assertEqual(
+            async_to_sync(call)(b"", method="GET")[0],
+            status.HTTP_405_METHOD_NOT_ALLOWED,
+        )
+        self.assertEqual(HabitStats.objects.get(habit=self.habit).done_count, 1)
+
+
+class OutboxRetryTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        self.reminder = ReminderOutbox.objects.create(
+            chat_id="1", text="Напоминание", available_at=self.now
+        )
+
+    def drain(self, server, now):
+        sender = TelegramSender(
+            base_url=server.url, token="test", chat_rate=1000, max_retries=0
+        )
+        with patch("django.utils.timezone.now", return_value=now):
+            return drain_outbox(sender)
+
+    def test_retry_delay(self):
+        """
+        Тестирование экспоненциального роста задержки повторной отправки
+        """
+        self.assertEqual(
+            [get_retry_delay(attempts) for attempts in range(1, 5)], [30, 60, 120, 240]
+        )
+        self.assertEqual(get_retry_delay(20), 3600)
+
+    @patch("habits.tasks.OUTBOX_MAX_ATTEMPTS", 3)
+    def test_dead_letter(self):
+        """
+        Тестирование повторных попыток отправки, переноса в недоставленные
+        и возврата в очередь
+        """
+        counters = get_counters()
+        with FakeTelegramServer(fail_first=3, fail_status=502) as server:
+            self.assertEqual(self.drain(server, self.now), 0)
+            self.reminder.refresh_from_db()
+            self.assertEqual(
+                self.reminder.available_at, self.now + timedelta(seconds=30)
+            )
+            # До истечения задержки напоминание не забирается
+            self.assertEqual(self.drain(server, self.now + timedelta(seconds=29)), 0)
+            self.assertEqual(self.drain(server, self.now + timedelta(seconds=30)), 0)
+            self.assertEqual(self.drain(server, self.now + timedelta(hours=1)), 0)
+
+            self.reminder.refresh_from_db()
+            self.assertEqual(self.reminder.attempts, 3)
+            self.assertIsNotNone(self.reminder.failed_at)
+            self.assertEqual(self.drain(server, self.now + timedelta(days=1)), 0)
+            stats = get_outbox_stats(self.now + timedelta(days=1))
+            self.assertEqual((stats["depth"], stats["failed"]), (0, 1))
+            self.assertEqual(
+                get_counters()[OUTBOX_RETRIES], counters[OUTBOX_RETRIES] + 2
+            )
+            self.assertEqual(
+                get_counters()[OUTBOX_DEAD_LETTERS], counters[OUTBOX_DEAD_LETTERS] + 1
+            )
+
+            call_command("requeue_reminders", stdout=io.StringIO())
+            self.assertEqual(self.drain(server, timezone.now()), 1)
+        self.assertEqual(len(server.messages), 1)
+
+    def test_rejected(self):
+        """
+        Тестирование немедленного переноса в недоставленные напоминаний,
+        которые Telegram отклонил окончательно (бот заблокирован)
+        """
+        counters = get_counters()
+        with FakeTelegramServer(fail_first=1, fail_status=403) as server:
+            self.assertEqual(self.drain(server, self.now), 0)
+        self.reminder.refresh_from_db()
+        self.assertEqual(self.reminder.attempts, 1)
+        self.assertEqual(self.reminder.failed_at, self.now)
+        self.assertEqual(get_counters()[OUTBOX_RETRIES], counters[OUTBOX_RETRIES])
+        self.assertEqual(
+            get_counters()[OUTBOX_DEAD_LETTERS], counters[OUTBOX_DEAD_LETTERS] + 1
+        )
+
+    def test_purge(self):
+        """
+        Тестирование удаления давно доставленных напоминаний
+        """
+        old = [
+            ReminderOutbox.objects.create(
+                chat_id="1", text="Давно", delivered_at=self.now - timedelta(days=8)
+            )
+            for _ in range(3)
+        ]
+        recent = ReminderOutbox.objects.create(
+            chat_id="1", text="Недавно", delivered_at=self.now - timedelta(days=6)
+        )
+        failed = ReminderOutbox.objects.create(
+            chat_id="1", text="Не доставлено", failed_at=self.now - timedelta(days=8)
+        )
+        self.assertEqual(purge_outbox(self.now, days=7, size=2), len(old))
+        self.assertCountEqual(
+            ReminderOutbox.objects.values_list("pk", flat=True),
+            [self.reminder.pk, recent.pk, failed.pk],
+        )
+
+    @patch("habits.tasks.OUTBOX_SEND_CHUNK_SIZE", 1)
+    def test_send_chunks(self):
+        """
+        Тестирование отправки пачки порциями: доставленные напоминания
+        отмечаются сразу, аренда оставшихся продлевается, поэтому они
+        не освобождаются, даже если пачка отправляется дольше срока аренды
+        """
+        for i in range(2):
+            ReminderOutbox.objects.create(
+                chat_id=str(i + 2), text="Напоминание", available_at=self.now
+            )
+        clock = [self.now]
+        leased = []
+
+        class Sender(NullSender):
+            def send_many(sender, messages):
+                # Каждая порция отправляется почти весь срок аренды
+                clock[0] += timedelta(seconds=OUTBOX_LEASE - 1)
+                leased.append(
+                    get_pending_outbox().filter(available_at__gt=clock[0]).count()
+                )
+                return super().send_many(messages)
+
+        with patch("django.utils.timezone.now", side_effect=lambda: clock[0]):
+            self.assertEqual(drain_outbox(Sender()), 3)
+        self.assertEqual(leased, [3, 2, 1])
+        self.assertFalse(get_pending_outbox().exists())
+
+    def test_null_sender(self):
+        """
+        Тестирование разбора outbox отправителем замера bench_reminders
+        """
+        with patch("django.utils.timezone.now", return_value=self.now):
+            self.assertEqual(drain_outbox(NullSender()), 1)
+        self.reminder.refresh_from_db()
+        self.assertIsNotNone(self.reminder.delivered_at)
+
+        stdout = io.StringIO()
+        call_command("bench_reminders", "--count", "20", stdout=stdout)
+        self.assertIn("20 привычек", stdout.getvalue())
+
+    def test_outbox_stats(self):
+        """
+        Тестирование метрик очереди напоминаний
+        """
+        ReminderOutbox.objects.create(
+            chat_id="1", text="Позже", available_at=self.now + timedelta(minutes=15)
+        )
+        ReminderOutbox.objects.create(
+            chat_id="1", text="Доставлено", delivered_at=self.now
+        )
+        stats = get_outbox_stats(self.now + timedelta(seconds=10))
+        self.assertEqual(
+            stats, {"depth": 2, "due": 1, "oldest_due_age": 10.0, "failed": 0}
+        )
@@ -1,17 +1,46 @@
 from django.urls import path
 
+from config.settings import API_ASYNC_VIEWS
 from habits.apps import HabitsConfig
-from habits.views import (HabitCreateAPIView, HabitDestroyAPIView,
+from habits.async_views import (HabitListAsyncAPIView,
+                                HabitRetrieveAsyncAPIView,
+                                PublicHabitListAsyncAPIView,
+                                TelegramWebhookView)
+from habits.views import (HabitBulkCreateAPIView, HabitBulkDestroyAPIView,
+                          HabitBulkUpdateAPIView, HabitCreateAPIView,
+                          HabitDestroyAPIView, HabitDoneAPIView,
+                          HabitExportAPIView, HabitImportAPIView,
                           HabitListAPIView, HabitRetrieveAPIView,
-                          HabitUpdateAPIView, PublicHabitListAPIView)
+                          HabitStatsAPIView, HabitStatsListAPIView,
+                          HabitSummaryAPIView, HabitUpdateAPIView,
+                          PublicHabitListAPIView)
 
 app_name = HabitsConfig.name
 
+if API_ASYNC_VIEWS:
+    habit_list_view = HabitListAsyncAPIView.as_view()
+    habit_retrieve_view = HabitRetrieveAsyncAPIView.as_view()
+    public_habit_list_view = PublicHabitListAsyncAPIView.as_view()
+else:
+    habit_list_view = HabitListAPIView.as_view()
+    habit_retrieve_view = HabitRetrieveAPIView.as_view()
+    public_habit_list_view = PublicHabitListAPIView.as_view()
+
 urlpatterns = [
-    path("public/", PublicHabitListAPIView.as_view(), name="public-habits"),
+    path("public/", public_habit_list_view, name="public-habits"),
     path("create/", HabitCreateAPIView.as_view(), name="habit-create"),
-    path("", HabitListAPIView.as_view(), name="habits"),
-    path("<int:pk>/", HabitRetrieveAPIView.as_view(), name="habit"),
+    path("export/", HabitExportAPIView.as_view(), name="habit-export"),
+    path("import/", HabitImportAPIView.as_view(), name="habit-import"),
+    path("telegram/webhook/", TelegramWebhookView.as_view(), name="telegram-webhook"),
+    path("", habit_list_view, name="habits"),
+    path("<int:pk>/", habit_retrieve_view, name="habit"),
     path("<int:pk>/update/", HabitUpdateAPIView.as_view(), name="habit-update"),
     path("<int:pk>/delete/", HabitDestroyAPIView.as_view(), name="habit-delete"),
+    path("<int:pk>/done/", HabitDoneAPIView.as_view(), name="habit-done"),
+    path("<int:pk>/stats/", HabitStatsAPIView.as_view(), name="habit-stats"),
+    path("stats/", HabitStatsListAPIView.as_view(), name="habit-stats-list"),
+    path("summary/", HabitSummaryAPIView.as_view(), name="habit-summary"),
+    path("bulk/create/", HabitBulkCreateAPIView.as_view(), name="habit-bulk-create"),
+    path("bulk/update/", HabitBulkUpdateAPIView.as_view(), name="habit-bulk-update"),
+    path("bulk/delete/", HabitBulkDestroyAPIView.as_view(), name="habit-bulk-delete"),
 ]
@@ -8,12 +8,13 @@ class RuntimeValidator:
     Валидатор времени выполнения привычки.
     """
 
+    max_runtime = timedelta(minutes=2)
+    message = "Время на выполнение должно быть не более 120 секунд."
+
     def __call__(self, attrs):
         runtime = attrs.get("runtime")
-        if runtime and runtime > timedelta(minutes=2):
-            raise ValidationError(
-                "Время на выполнение должно быть не более 120 секунд."
-            )
+        if runtime and runtime > self.max_runtime:
+            raise ValidationError(self.message)
 
 
 class PeriodicityValidator:
@@ -21,12 +22,13 @@ class PeriodicityValidator:
     Валидатор периодичности выполнения привычки.
     """
 
+    max_periodicity = 7
+    message = "Промежуток между выполнениями привычки не может превышать 7 дней."
+
     def __call__(self, attrs):
         periodicity = attrs.get("periodicity")
-        if periodicity and periodicity > 7:
-            raise ValidationError(
-                "Промежуток между выполнениями привычки не может превышать 7 дней."
-            )
+        if periodicity and periodicity > self.max_periodicity:
+            raise ValidationError(self.message)
 
 
 class RewardValidator:
@@ -34,14 +36,17 @@ class RewardValidator:
     Валидатор вознаграждения полезной привычки.
     """
 
+    reward_message = (
+        "Нельзя указывать вознаграждение и связанную привычку одновременно."
+    )
+    pleasure_message = "Связанная привычка должна быть приятной."
+
     def __call__(self, attrs):
         related_habit = attrs.get("related_habit")
         if related_habit and attrs.get("reward"):
-            raise ValidationError(
-                "Нельзя указывать вознаграждение и связанную привычку одновременно."
-            )
+            raise ValidationError(self.reward_message)
         if related_habit and not related_habit.is_pleasure:
-            raise ValidationError("Связанная привычка должна быть приятной.")
+            raise ValidationError(self.pleasure_message)
 
 
 class PleasantHabitValidator:
@@ -49,9 +54,9 @@ class PleasantHabitValidator:
     Валидатор приятной привычки.
     """
 
+    message = "У приятной привычки не может быть связанной привычки или вознаграждения."
+
     def __call__(self, attrs):
         is_pleasure = attrs.get("is_pleasure")
         if is_pleasure and (attrs.get("related_habit") or attrs.get("reward")):
-            raise ValidationError(
-                "У приятной привычки не может быть связанной привычки или вознаграждения."
-            )
+            raise ValidationError(self.message)
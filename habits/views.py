@@ -1,12 +1,41 @@
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import parse_etags
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import (CreateAPIView, DestroyAPIView,
-                                     ListAPIView, RetrieveAPIView,
-                                     UpdateAPIView)
+                                     GenericAPIView, ListAPIView,
+                                     RetrieveAPIView, UpdateAPIView)
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from config import metrics
+from config.settings import PUBLIC_HABITS_CACHE_TTL
+from habits.caching import (PUBLIC_HABITS_HITS, PUBLIC_HABITS_MISSES,
+                            PUBLIC_HABITS_NOT_MODIFIED, get_etag,
+                            get_public_habits_key)
+from habits.export import EXPORT_FORMATS, aiter_chunks, iter_habit_rows
+from habits.filters import PublicHabitFilter, get_filters_key
+from habits.imports import IMPORT_FORMATS, HabitImporter, get_import_format
 from habits.models import Habit
-from habits.paginators import CustomPagination
+from habits.paginators import CustomCursorPagination, CustomPagination
 from habits.permissions import IsOwner
-from habits.serializers import HabitSerializer
+from habits.serializers import (HabitDoneSerializer, HabitSerializer,
+                                HabitStatsSerializer, HabitSummarySerializer,
+                                get_habit_values_fields, get_related_habits,
+                                serialize_habit_rows)
+from habits.signals import notify_habits_changed
+from habits.stats import get_habit_stats, mark_done
+from habits.summary import (batched_summary, change_summary, get_flag_changes,
+                            get_summary)
+
+# Максимальное количество привычек в одном пакетном запросе
+BULK_MAX_ITEMS = 500
 
 
 class HabitCreateAPIView(CreateAPIView):
@@ -24,7 +53,22 @@ class HabitCreateAPIView(CreateAPIView):
         serializer.save(user=self.request.user)
 
 
-class HabitListAPIView(ListAPIView):
+class HabitValuesListMixin:
+    """
+    Отдаёт список привычек из строк values() через облегчённую сериализацию:
+    страница читается одним запросом, экземпляры модели не создаются.
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = queryset.values(*get_habit_values_fields())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serialize_habit_rows(page))
+        return Response(serialize_habit_rows(queryset))
+
+
+class HabitListAPIView(HabitValuesListMixin, ListAPIView):
     """
     Контроллер получения списка привычек пользователя.
     """
@@ -39,16 +83,185 @@ class HabitListAPIView(ListAPIView):
     def get_queryset(self):
         user = self.request.user
         if not user.is_superuser:
-            return Habit.objects.filter(user=user)
-        return Habit.objects.all()
+            return Habit.objects.filter(user=user).order_by("-id")
+        return Habit.objects.order_by("-id")
+
+
+class OwnedHabitMixin:
+    """
+    Ограничивает выборку привычками текущего пользователя: одним запросом
+    по индексу проверяются права и загружается привычка, на чужую
+    привычку отвечаем 404.
+    """
+
+    def get_queryset(self):
+        return Habit.objects.filter(user_id=self.request.user.pk)
+
+    def get_object(self):
+        habit = super().get_object()
+        # Владелец уже загружен при аутентификации
+        habit.user = self.request.user
+        return habit
+
+
+class HabitExportAPIView(APIView):
+    """
+    Контроллер потоковой выгрузки привычек пользователя (суперпользователь
+    выгружает все привычки) в формате NDJSON или CSV. Под ASGI поток
+    отдаётся асинхронным итератором, чтобы не читать выгрузку в память.
+    Формат задаётся параметром export_format, по умолчанию - NDJSON.
+    """
+
+    permission_classes = (IsAuthenticated,)
+    format_query_param = "export_format"
+
+    def get(self, request):
+        export_format = request.query_params.get(self.format_query_param, "ndjson")
+        if export_format not in EXPORT_FORMATS:
+            formats = ", ".join(EXPORT_FORMATS)
+            raise ValidationError(
+                {self.format_query_param: f"Допустимые форматы: {formats}."}
+            )
+        render, content_type, filename = EXPORT_FORMATS[export_format]
+        queryset = Habit.objects.all()
+        if not request.user.is_superuser:
+            queryset = queryset.filter(user_id=request.user.pk)
+        content = render(iter_habit_rows(queryset))
+        if isinstance(request._request, ASGIRequest):
+            content = aiter_chunks(content)
+        return StreamingHttpResponse(
+            content,
+            content_type=content_type,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+
+
+class HabitImportAPIView(APIView):
+    """
+    Контроллер потоковой загрузки привычек пользователя из NDJSON или CSV.
+    Файл передаётся телом запроса или полем file формы. Формат задаётся
+    параметром import_format, иначе определяется по типу содержимого.
+    В ответе - количество созданных привычек и ошибки по номерам строк.
+    """
+
+    permission_classes = (IsAuthenticated,)
+    format_query_param = "import_format"
+
+    def post(self, request):
+        import_format = request.query_params.get(
+            self.format_query_param, get_import_format(request.content_type)
+        )
+        if import_format not in IMPORT_FORMATS:
+            formats = ", ".join(IMPORT_FORMATS)
+            raise ValidationError(
+                {self.format_query_param: f"Допустимые форматы: {formats}."}
+            )
+        if request.content_type.startswith("multipart/form-data"):
+            stream = request.FILES.get("file")
+        else:
+            stream = request.stream
+        if stream is None:
+            raise ValidationError("Файл привычек не передан.")
+
+        importer = HabitImporter(request.user)
+        importer.run(IMPORT_FORMATS[import_format](stream))
+        return Response(importer.report)
+
 
+class HabitStatsMixin(OwnedHabitMixin):
+    """
+    Общая логика контроллеров статистики: привычки текущего пользователя
+    вместе со строкой статистики и сегодняшняя дата в его часовом поясе.
+    """
+
+    permission_classes = (
+        IsAuthenticated,
+        IsOwner,
+    )
 
-class HabitRetrieveAPIView(RetrieveAPIView):
+    def get_queryset(self):
+        return super().get_queryset().select_related("stats")
+
+    def get_serializer_context(self):
+        return {
+            **super().get_serializer_context(),
+            "today": timezone.localdate(timezone=self.request.user.tzinfo),
+        }
+
+
+class HabitDoneAPIView(HabitStatsMixin, GenericAPIView):
+    """
+    Контроллер отметки о выполнении привычки. Дата выполнения передаётся
+    в поле date, по умолчанию - сегодня в часовом поясе пользователя.
+    Повторная отметка той же даты не меняет статистику (ответ 200).
+    """
+
+    serializer_class = HabitDoneSerializer
+
+    def post(self, request, *args, **kwargs):
+        habit = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        context = serializer.context
+        stats, created = mark_done(
+            habit, serializer.validated_data.get("date", context["today"])
+        )
+        return Response(
+            HabitStatsSerializer(stats, context=context).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+
+class HabitStatsAPIView(HabitStatsMixin, GenericAPIView):
+    """
+    Контроллер получения статистики привычки: выполнения, доля выполнений
+    и серии читаются из заранее посчитанной строки статистики.
+    """
+
+    serializer_class = HabitStatsSerializer
+
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(get_habit_stats(self.get_object()))
+        return Response(serializer.data)
+
+
+class HabitStatsListAPIView(HabitStatsMixin, GenericAPIView):
+    """
+    Контроллер получения статистики всех привычек пользователя.
+    """
+
+    serializer_class = HabitStatsSerializer
+    pagination_class = CustomPagination
+
+    def get_queryset(self):
+        return super().get_queryset().order_by("-id")
+
+    def get(self, request, *args, **kwargs):
+        stats = []
+        for habit in self.paginate_queryset(self.get_queryset()):
+            habit.user = request.user
+            stats.append(get_habit_stats(habit))
+        return self.get_paginated_response(self.get_serializer(stats, many=True).data)
+
+
+class HabitSummaryAPIView(APIView):
+    """
+    Контроллер сводки привычек пользователя для дашборда: количество
+    полезных, приятных и публичных привычек, привычек на сегодня
+    и время ближайшего напоминания.
+    """
+
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        return Response(HabitSummarySerializer(get_summary(request.user)).data)
+
+
+class HabitRetrieveAPIView(OwnedHabitMixin, RetrieveAPIView):
     """
     Контроллер получения информации о привычке.
     """
 
-    queryset = Habit.objects.all()
     serializer_class = HabitSerializer
     permission_classes = (
         IsAuthenticated,
@@ -56,12 +269,11 @@ class HabitRetrieveAPIView(RetrieveAPIView):
     )
 
 
-class HabitUpdateAPIView(UpdateAPIView):
+class HabitUpdateAPIView(OwnedHabitMixin, UpdateAPIView):
     """
     Контроллер изменения информации о привычке.
     """
 
-    queryset = Habit.objects.all()
     serializer_class = HabitSerializer
     permission_classes = (
         IsAuthenticated,
@@ -69,12 +281,11 @@ class HabitUpdateAPIView(UpdateAPIView):
     )
 
 
-class HabitDestroyAPIView(DestroyAPIView):
+class HabitDestroyAPIView(OwnedHabitMixin, DestroyAPIView):
     """
     Контроллер удаления привычки.
     """
 
-    queryset = Habit.objects.all()
     serializer_class = HabitSerializer
     permission_classes = (
         IsAuthenticated,
@@ -82,12 +293,232 @@ class HabitDestroyAPIView(DestroyAPIView):
     )
 
 
-class PublicHabitListAPIView(ListAPIView):
+def get_page_params(request, paginator):
     """
-    Контроллер получения списка публичных привычек.
+    Возвращает параметры запрошенной страницы списка и фильтров для ключа кеша.
     """
+    if paginator.is_cursor_mode(request):
+        cursor_param = CustomCursorPagination.cursor_query_param
+        position = {"cursor": request.query_params.get(cursor_param, "")}
+    else:
+        position = {"page": request.query_params.get(paginator.page_query_param, 1)}
+    return {
+        "host": request.get_host(),
+        "page_size": paginator.get_page_size(request),
+        "filters": get_filters_key(request.query_params),
+        **position,
+    }
 
-    queryset = Habit.objects.filter(is_public=True)
+
+def is_not_modified(request, etag):
+    """
+    Проверяет, совпадает ли ETag с заголовком If-None-Match запроса.
+    """
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        metrics.incr(PUBLIC_HABITS_NOT_MODIFIED)
+        return True
+    return False
+
+
+class PublicHabitListAPIView(HabitValuesListMixin, ListAPIView):
+    """
+    Контроллер получения списка публичных привычек с фильтрами
+    и поиском (PublicHabitFilter).
+    """
+
+    queryset = Habit.objects.filter(is_public=True).order_by("-id")
     serializer_class = HabitSerializer
     permission_classes = (AllowAny,)
     pagination_class = CustomPagination
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = PublicHabitFilter
+
+    def list(self, request, *args, **kwargs):
+        """
+        Отдаёт страницу из кеша Redis, при совпадении ETag - ответ 304.
+        Кеш сбрасывается при изменении или удалении любой привычки.
+        """
+        key = get_public_habits_key(**get_page_params(request, self.paginator))
+        cached = cache.get(key)
+        if cached is None:
+            metrics.incr(PUBLIC_HABITS_MISSES)
+            data = super().list(request, *args, **kwargs).data
+            cached = (data, get_etag(data))
+            cache.set(key, cached, PUBLIC_HABITS_CACHE_TTL)
+        else:
+            metrics.incr(PUBLIC_HABITS_HITS)
+
+        data, etag = cached
+        if is_not_modified(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        return Response(data, headers={"ETag": etag})
+
+
+class HabitBulkMixin:
+    """
+    Общая логика пакетных контроллеров: проверка тела запроса
+    и сборка результатов по каждому элементу пакета.
+    """
+
+    permission_classes = (IsAuthenticated,)
+
+    def get_items(self):
+        items = self.request.data
+        if not isinstance(items, list):
+            raise ValidationError("Ожидается список привычек.")
+        if len(items) > BULK_MAX_ITEMS:
+            raise ValidationError(
+                f"В одном запросе можно передать не более {BULK_MAX_ITEMS} привычек."
+            )
+        return items
+
+    def get_owned_habits(self, ids):
+        """
+        Загружает одним запросом привычки пользователя с указанными id.
+        """
+        habits = Habit.objects.filter(user_id=self.request.user.pk).in_bulk(ids)
+        for habit in habits.values():
+            habit.user = self.request.user
+        return habits
+
+    @staticmethod
+    def get_ids(items):
+        ids = []
+        for item in items:
+            try:
+                ids.append(int(item["id"] if isinstance(item, dict) else item))
+            except (KeyError, TypeError, ValueError):
+                ids.append(None)
+        return ids
+
+    @staticmethod
+    def result(index, status_code, **kwargs):
+        return {"index": index, "status": status_code, **kwargs}
+
+    def get_serializer_context(self, items):
+        return {
+            "request": self.request,
+            "view": self,
+            "related_habits": get_related_habits(items),
+        }
+
+
+class HabitBulkCreateAPIView(HabitBulkMixin, APIView):
+    """
+    Контроллер пакетного создания привычек.
+    """
+
+    def post(self, request):
+        items = self.get_items()
+        context = self.get_serializer_context(items)
+        tz = request.user.tzinfo
+        today = timezone.localdate(timezone=tz)
+
+        results = [None] * len(items)
+        created = []
+        for index, item in enumerate(items):
+            serializer = HabitSerializer(data=item, context=context)
+            if not serializer.is_valid():
+                results[index] = self.result(
+                    index, status.HTTP_400_BAD_REQUEST, errors=serializer.errors
+                )
+                continue
+            habit = Habit(**serializer.validated_data, user=request.user)
+            habit.schedule(today, tz)
+            habit.render_reminder()
+            created.append((index, habit))
+
+        with transaction.atomic():
+            habits = [habit for _, habit in created]
+            Habit.objects.bulk_create(habits)
+            change_summary(request.user.pk, added=[habit.flags for habit in habits])
+            notify_habits_changed(habits)
+
+        for index, habit in created:
+            results[index] = self.result(
+                index,
+                status.HTTP_201_CREATED,
+                data=HabitSerializer(habit, context=context).data,
+            )
+        return Response({"results": results}, status=status.HTTP_207_MULTI_STATUS)
+
+
+class HabitBulkUpdateAPIView(HabitBulkMixin, APIView):
+    """
+    Контроллер пакетного изменения привычек. Каждый элемент пакета
+    содержит id привычки и изменяемые поля.
+    """
+
+    def patch(self, request):
+        items = self.get_items()
+        ids = self.get_ids(items)
+        habits = self.get_owned_habits([pk for pk in ids if pk is not None])
+        context = self.get_serializer_context(items)
+        tz = request.user.tzinfo
+
+        results = [None] * len(items)
+        updated = {}
+        fields = {"next_run_at", "reminder_text"}
+        for index, (pk, item) in enumerate(zip(ids, items)):
+            habit = habits.get(pk)
+            if habit is None:
+                results[index] = self.result(
+                    index, status.HTTP_404_NOT_FOUND, errors="Привычка не найдена."
+                )
+                continue
+            serializer = HabitSerializer(
+                habit, data=item, partial=True, context=context
+            )
+            if not serializer.is_valid():
+                results[index] = self.result(
+                    index, status.HTTP_400_BAD_REQUEST, errors=serializer.errors
+                )
+                continue
+            for field, value in serializer.validated_data.items():
+                setattr(habit, field, value)
+            habit.schedule(habit.execute_at, tz)
+            habit.render_reminder()
+            fields.update(serializer.validated_data)
+            updated[index] = habit
+
+        with transaction.atomic():
+            Habit.objects.bulk_update(updated.values(), fields)
+            notify_habits_changed(updated.values())
+            change_summary(request.user.pk, *get_flag_changes(updated.values()))
+
+        for index, habit in updated.items():
+            results[index] = self.result(
+                index,
+                status.HTTP_200_OK,
+                data=HabitSerializer(habit, context=context).data,
+            )
+        return Response({"results": results}, status=status.HTTP_207_MULTI_STATUS)
+
+
+class HabitBulkDestroyAPIView(HabitBulkMixin, APIView):
+    """
+    Контроллер пакетного удаления привычек. Тело запроса - список id.
+    """
+
+    def post(self, request):
+        ids = self.get_ids(self.get_items())
+        owned = set(
+            Habit.objects.filter(user_id=request.user.pk, pk__in=ids).values_list(
+                "pk", flat=True
+            )
+        )
+        with transaction.atomic(), batched_summary():
+            Habit.objects.filter(pk__in=owned).delete()
+
+        results = [
+            self.result(
+                index,
+                (
+                    status.HTTP_204_NO_CONTENT
+                    if pk in owned
+                    else status.HTTP_404_NOT_FOUND
+                ),
+            )
+            for index, pk in enumerate(ids)
+        ]
+        return Response({"results": results}, status=status.HTTP_207_MULTI_STATUS)
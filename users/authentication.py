@@ -0,0 +1,70 @@
+from django.contrib.auth.models import AnonymousUser
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from users.caching import aget_cached_user, get_cached_user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT-аутентификация, которая берёт пользователя из кеша (в памяти процесса
+    и в Redis) вместо запроса к БД на каждый запрос к API.
+    Кеш сбрасывается при сохранении и удалении пользователя.
+    """
+
+    def get_user(self, validated_token):
+        return self.check_user(
+            get_cached_user(self.get_user_id(validated_token)), validated_token
+        )
+
+    @staticmethod
+    def get_user_id(validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    @staticmethod
+    def check_user(user, validated_token):
+        """
+        Проверяет пользователя так же, как JWTAuthentication.get_user().
+        """
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+        return user
+
+
+class AsyncJWTAuthentication(CachedJWTAuthentication):
+    """
+    JWT-аутентификация для асинхронных контроллеров: токен проверяется так же,
+    как в JWTAuthentication, а пользователь загружается из кеша
+    или асинхронным ORM.
+    """
+
+    async def aauthenticate(self, request):
+        """
+        Возвращает пользователя запроса или AnonymousUser, если токена нет.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return AnonymousUser()
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return AnonymousUser()
+        return await self.aget_user(self.get_validated_token(raw_token))
+
+    async def aget_user(self, validated_token):
+        user = await aget_cached_user(self.get_user_id(validated_token))
+        return self.check_user(user, validated_token)
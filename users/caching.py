@@ -0,0 +1,117 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+from config import metrics
+from config.settings import (AUTH_USER_CACHE_TTL, AUTH_USER_LRU_SIZE,
+                             AUTH_USER_LRU_TTL)
+from users.models import User
+
+AUTH_USER_HITS = metrics.counter("auth_user_cache.hits")
+AUTH_USER_MISSES = metrics.counter("auth_user_cache.misses")
+
+
+class LRUCache:
+    """
+    Потокобезопасный LRU-кеш в памяти процесса с ограниченным временем жизни
+    записей.
+    """
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+user_lru = LRUCache(AUTH_USER_LRU_SIZE, AUTH_USER_LRU_TTL)
+
+
+def get_user_key(user_id):
+    return f"users:auth:{user_id}"
+
+
+def get_cached_user(user_id):
+    """
+    Возвращает пользователя по id: из кеша процесса, из Redis или из БД.
+    Возвращает None, если пользователя нет.
+    """
+    key = get_user_key(user_id)
+    user = user_lru.get(key)
+    if user is None:
+        user = cache.get(key)
+        if user is None:
+            metrics.incr(AUTH_USER_MISSES)
+            user = User.objects.filter(pk=user_id).first()
+            if user is None:
+                return None
+            cache.set(key, user, AUTH_USER_CACHE_TTL)
+        else:
+            metrics.incr(AUTH_USER_HITS)
+        user_lru.set(key, user)
+    else:
+        metrics.incr(AUTH_USER_HITS)
+    # Каждый запрос получает свою копию: изменения request.user не попадают в кеш
+    return copy.copy(user)
+
+
+async def aget_cached_user(user_id):
+    """
+    Асинхронная версия get_cached_user().
+    """
+    key = get_user_key(user_id)
+    user = user_lru.get(key)
+    if user is None:
+        user = await cache.aget(key)
+        if user is None:
+            metrics.incr(AUTH_USER_MISSES)
+            user = await User.objects.filter(pk=user_id).afirst()
+            if user is None:
+                return None
+            await cache.aset(key, user, AUTH_USER_CACHE_TTL)
+        else:
+            metrics.incr(AUTH_USER_HITS)
+        user_lru.set(key, user)
+    else:
+        metrics.incr(AUTH_USER_HITS)
+    return copy.copy(user)
+
+
+def invalidate_user(user_id):
+    """
+    Удаляет пользователя из кеша Redis и из кеша текущего процесса.
+    Кеши других процессов устаревают не позже чем через AUTH_USER_LRU_TTL.
+    """
+    key = get_user_key(user_id)
+    user_lru.delete(key)
+    cache.delete(key)
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.7 on 2026-10-18 13:21
+
+import users.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="timezone",
+            field=models.CharField(
+                default="UTC",
+                help_text="Название часового пояса IANA, например Europe/Moscow.",
+                max_length=63,
+                validators=[users.validators.validate_timezone],
+                verbose_name="Часовой пояс",
+            ),
+        ),
+    ]
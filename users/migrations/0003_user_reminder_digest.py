@@ -0,0 +1,22 @@
+# Generated by Django 5.0.7 on 2026-10-18 13:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_user_timezone"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="reminder_digest",
+            field=models.BooleanField(
+                default=False,
+                help_text="Привычки, наступившие одновременно, приходят в Telegram одним сообщением.",
+                verbose_name="Напоминания одним сообщением",
+            ),
+        ),
+    ]
@@ -1,6 +1,10 @@
+from zoneinfo import ZoneInfo
+
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from users.validators import validate_timezone
+
 NULLABLE = {"blank": True, "null": True}
 
 
@@ -15,6 +19,21 @@ class User(AbstractUser):
     tg_chat_id = models.CharField(
         max_length=100, verbose_name="ID чата в Telegram", **NULLABLE
     )
+    timezone = models.CharField(
+        max_length=63,
+        default="UTC",
+        validators=[validate_timezone],
+        verbose_name="Часовой пояс",
+        help_text="Название часового пояса IANA, например Europe/Moscow.",
+    )
+    reminder_digest = models.BooleanField(
+        default=False,
+        verbose_name="Напоминания одним сообщением",
+        help_text="Привычки, наступившие одновременно, приходят в Telegram "
+        "одним сообщением.",
+    )
+
+    _loaded_timezone = None
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
@@ -26,3 +45,20 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.email}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запоминаем загруженный часовой пояс, чтобы заметить его изменение
+        instance._loaded_timezone = instance.__dict__.get("timezone")
+        return instance
+
+    @property
+    def tzinfo(self):
+        return ZoneInfo(self.timezone)
+
+    @property
+    def timezone_changed(self):
+        return (
+            self._loaded_timezone is not None and self._loaded_timezone != self.timezone
+        )
+
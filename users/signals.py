@@ -0,0 +1,17 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.caching import invalidate_user
+from users.models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """
+    Сбрасывает кеш пользователя JWT-аутентификации после изменения,
+    деактивации или удаления пользователя.
+    """
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_user(user_id))
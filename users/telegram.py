@@ -0,0 +1,55 @@
+import secrets
+
+from django.core.cache import cache
+from django.db import transaction
+
+from config.settings import TELEGRAM_BOT_NAME, TELEGRAM_LINK_TTL
+from users.models import User
+
+
+def get_link_key(token):
+    return f"users:telegram-link:{token}"
+
+
+def create_link_token(user):
+    """
+    Создаёт одноразовый токен привязки чата Telegram к пользователю.
+    Токен передаётся боту параметром команды /start и действует
+    TELEGRAM_LINK_TTL секунд.
+    """
+    token = secrets.token_urlsafe(24)
+    cache.set(get_link_key(token), user.pk, TELEGRAM_LINK_TTL)
+    return token
+
+
+def get_link_url(token):
+    """
+    Возвращает ссылку на бота, открывающую чат с командой /start <token>.
+    """
+    return f"https://t.me/{TELEGRAM_BOT_NAME}?start={token}"
+
+
+def link_chat(token, chat_id):
+    """
+    Привязывает чат Telegram к пользователю по токену привязки и погашает
+    токен. Чат привязывается только к одному пользователю: у других
+    пользователей он отвязывается. Возвращает пользователя или None,
+    если токен недействителен.
+    """
+    key = get_link_key(token)
+    user_id = cache.get(key)
+    # Токен погашает только тот запрос, который его удалил: при одновременных
+    # /start с одним токеном остальные получат отказ
+    if user_id is None or not cache.delete(key):
+        return None
+
+    with transaction.atomic():
+        user = User.objects.select_for_update().filter(pk=user_id).first()
+        if user is None:
+            return None
+        for other in User.objects.filter(tg_chat_id=chat_id).exclude(pk=user_id):
+            other.tg_chat_id = None
+            other.save(update_fields=["tg_chat_id"])
+        user.tg_chat_id = chat_id
+        user.save(update_fields=["tg_chat_id"])
+    return user
@@ -1,8 +1,14 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
 
+from users.caching import LRUCache, user_lru
 from users.models import User
+from users.telegram import create_link_token, link_chat
 
 
 class UserTestCase(APITestCase):
@@ -31,3 +37,93 @@ class UserTestCase(APITestCase):
         user = User.objects.get(email="user2@example.com")
         self.assertEqual(user.tg_chat_id, data["tg_chat_id"])
         self.assertTrue(user.check_password("test123"))
+
+
+class CachedJWTAuthenticationTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        user_lru.clear()
+        self.user = User.objects.create(email="user1@example.com")
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+        self.url = reverse("habits:habits")
+
+    def test_user_cache(self):
+        """
+        Тестирование кеширования пользователя при JWT-аутентификации
+        """
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Пользователь берется из кеша процесса, затем из общего кеша
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+        user_lru.clear()
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+    def test_invalidation(self):
+        """
+        Тестирование сброса кеша пользователя при его деактивации
+        """
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_lru(self):
+        """
+        Тестирование вытеснения и устаревания записей LRU-кеша
+        """
+        lru = LRUCache(size=2, ttl=60)
+        lru.set("a", 1)
+        lru.set("b", 2)
+        lru.get("a")
+        lru.set("c", 3)
+        self.assertEqual((lru.get("a"), lru.get("b"), lru.get("c")), (1, None, 3))
+
+        lru = LRUCache(size=2, ttl=0)
+        lru.set("a", 1)
+        self.assertIsNone(lru.get("a"))
+
+
+class TelegramLinkTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email="user1@example.com")
+        self.url = reverse("users:telegram-link")
+
+    def test_telegram_link(self):
+        """
+        Тестирование получения одноразовой ссылки привязки чата Telegram
+        """
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        token = response.json()["url"].rsplit("start=", 1)[1]
+        self.assertLessEqual(len(token), 64)
+
+        self.assertEqual(link_chat(token, "100"), self.user)
+        self.assertIsNone(link_chat(token, "200"))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.tg_chat_id, "100")
+
+    def test_telegram_link_consumed_once(self):
+        """
+        Тестирование одновременного использования одной ссылки привязки:
+        токен погашает только запрос, который удалил его из кеша
+        """
+        token = create_link_token(self.user)
+        # Другой запрос успел удалить токен между чтением и удалением
+        with patch.object(cache, "delete", return_value=False):
+            self.assertIsNone(link_chat(token, "100"))
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.tg_chat_id)
@@ -0,0 +1,17 @@
+from functools import lru_cache
+from zoneinfo import available_timezones
+
+from django.core.exceptions import ValidationError
+
+
+@lru_cache(maxsize=None)
+def get_timezones():
+    return frozenset(available_timezones())
+
+
+def validate_timezone(value):
+    """
+    Валидатор часового пояса пользователя.
+    """
+    if value not in get_timezones():
+        raise ValidationError(f"Неизвестный часовой пояс: {value}.")
@@ -1,7 +1,12 @@
+from rest_framework import status
 from rest_framework.generics import CreateAPIView
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from config.settings import TELEGRAM_LINK_TTL
 from users.serializers import UserSerializer
+from users.telegram import create_link_token, get_link_url
 
 
 class UserCreateAPIView(CreateAPIView):
@@ -17,3 +22,19 @@ class UserCreateAPIView(CreateAPIView):
         user.set_password(user.password)
         user.save()
 
+
+class TelegramLinkAPIView(APIView):
+    """
+    Контроллер получения ссылки на бота для привязки чата Telegram.
+    После перехода по ссылке и нажатия «Старт» бот запоминает чат
+    пользователя, и напоминания начинают приходить в него.
+    """
+
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request):
+        token = create_link_token(request.user)
+        return Response(
+            {"url": get_link_url(token), "expires_in": TELEGRAM_LINK_TTL},
+            status=status.HTTP_201_CREATED,
+        )